@@ -1,11 +1,18 @@
 from abc import ABC, abstractmethod 
 from typing import List
+import sys
+
+#Només es mostren els primers caràcters de la descripció dels videojocs, no cal guardar-la sencera
+LONGITUD_DESCRIPCIO = 20
 
 
 class Item(ABC):
     """
     Classe abstracta base per representar un element (item) genèric.
 
+    Les classes d'ítems fan servir __slots__ (sense __dict__ per objecte) i els camps que es repeteixen
+    molt entre ítems (gèneres, categories, editorials) es guarden internats, així cada valor és a memòria un sol cop.
+
     Attributes
     ----------
     _id : str
@@ -13,6 +20,7 @@ class Item(ABC):
     _title : str
         Títol de l'ítem.
     """
+    __slots__ = ("_id", "_title")
     _id: str
     _title: str
 
@@ -67,6 +75,23 @@ class Item(ABC):
         """
         raise NotImplementedError
     
+    @abstractmethod
+    def camps(self) -> list:
+        """
+        Retorna els arguments del constructor que permeten tornar a crear l'ítem.
+
+        Returns
+        -------
+        list
+            Valors dels camps, en l'ordre del constructor.
+
+        Raises
+        ------
+        NotImplementedError
+            Si la subclasse no implementa aquest mètode.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def get_genres(self):
         """
@@ -96,6 +121,7 @@ class Movie(Item):
     _genres : list of str
         Gèneres associats a la pel·lícula.
     """
+    __slots__ = ("_any_movie", "_genres")
     _any_movie: str
     _genres: List[str]
     
@@ -121,7 +147,7 @@ class Movie(Item):
         """
         try:
             self._any_movie= any_mov
-            self._genres = generes
+            self._genres = sys.intern(generes) if isinstance(generes, str) else generes
             super().__init__(movie_id,titol)
         except:
             raise ValueError
@@ -136,6 +162,17 @@ class Movie(Item):
             Descripció de la pel·lícula.
         """
         return f"{self._title} ({self._any_movie}). Generes: {self._genres} [ID: {self._id}] "
+
+    def camps(self) -> list:
+        """
+        Retorna els arguments del constructor de la pel·lícula.
+
+        Returns
+        -------
+        list
+            [movie_id, titol, any_mov, generes].
+        """
+        return [self._id, self._title, self._any_movie, self._genres]
     
     def get_genres(self):
         """
@@ -163,6 +200,7 @@ class Book(Item):
     """
 
     #isbn = _id
+    __slots__ = ("_author", "_any_publicacio", "_publisher")
     _author: str
     _any_publicacio: int
     _publisher: str
@@ -192,7 +230,7 @@ class Book(Item):
         try:
             self._author = str(author)
             self._any_publicacio = int(any_pub)
-            self._publisher = str(publisher)
+            self._publisher = sys.intern(str(publisher))
             super().__init__(isbn,titol)
         except:
             raise ValueError
@@ -207,6 +245,17 @@ class Book(Item):
             Descripció del llibre.
         """
         return f"{self._title} de {self._author}. Publicat per {self._publisher} a l'any {self._any_publicacio}. [ISBN: {self._id}] "
+
+    def camps(self) -> list:
+        """
+        Retorna els arguments del constructor del llibre.
+
+        Returns
+        -------
+        list
+            [isbn, titol, author, any_pub, publisher].
+        """
+        return [self._id, self._title, self._author, self._any_publicacio, self._publisher]
     
     def get_genres(self):
         """
@@ -231,10 +280,11 @@ class VideoGame(Item):
     _price : str
         Preu del videojoc.
     _description : str
-        Descripció del videojoc.
+        Inici de la descripció del videojoc (els primers LONGITUD_DESCRIPCIO caràcters, que són els que es mostren).
     """
 
     #asin = _id
+    __slots__ = ("_categories", "_brand", "_price", "_description")
     _categories: list
     _brand: str
     _price: str
@@ -257,7 +307,7 @@ class VideoGame(Item):
         brand : str, optional
             Marca del videojoc (default és "Unknown").
         description : str, optional
-            Descripció (default és "...").
+            Descripció; només se'n guarden els primers LONGITUD_DESCRIPCIO caràcters (default és "...").
 
         Raises
         ------
@@ -267,12 +317,12 @@ class VideoGame(Item):
         try:
             if isinstance(categories, list):
                 flat = [str(x) for cat in categories for x in (cat if isinstance(cat, list) else [cat])]
-                self._categories = "|".join(flat)
+                self._categories = sys.intern("|".join(flat))
             else:
-                self._categories = str(categories)
-            self._brand = brand
+                self._categories = sys.intern(str(categories))
+            self._brand = sys.intern(brand) if isinstance(brand, str) else brand
             self._price = price
-            self._description = description
+            self._description = description[:LONGITUD_DESCRIPCIO]
             super().__init__(asin,titol)
         except:
             raise ValueError(f"Error al inicialitzar les dades del objecte VideoGame {asin}")
@@ -286,7 +336,18 @@ class VideoGame(Item):
         str
             Descripció del videojoc amb preu i categories.
         """
-        return f"{self._title}, Preu: {'No disponible' if self._price is None else f'${self._price:.2f}'}. Categories: {self._categories} [ID: {self._id}] Descripció: {self._description[:20]}..."
+        return f"{self._title}, Preu: {'No disponible' if self._price is None else f'${self._price:.2f}'}. Categories: {self._categories} [ID: {self._id}] Descripció: {self._description}..."
+
+    def camps(self) -> list:
+        """
+        Retorna els arguments del constructor del videojoc.
+
+        Returns
+        -------
+        list
+            [asin, titol, categories, price, brand, description].
+        """
+        return [self._id, self._title, self._categories, self._price, self._brand, self._description]
 
     def get_genres(self):
         """
@@ -1,9 +1,13 @@
+import sys
+
+
 class User:
     """
     Representa un usuari dins del sistema de recomanació.
 
     Aquesta classe encapsula informació bàsica sobre l'usuari com l'identificador,
-    la localització, l'edat i el nom.
+    la localització, l'edat i el nom. Fa servir __slots__ i guarda la localització internada,
+    ja que molts usuaris comparteixen la mateixa.
 
     Attributes
     ----------
@@ -17,6 +21,7 @@ class User:
         Nom de l'usuari (pot ser 'Unknown').
     """
 
+    __slots__ = ("_id", "_location", "_age", "_name")
     _id:str
     _location:str
     _age: int
@@ -38,7 +43,7 @@ class User:
             Nom de l'usuari (per defecte és 'Unknown').
         """
         self._id = user_id
-        self._location = location
+        self._location = sys.intern(location) if isinstance(location, str) else location
         self._age = age
         self._name = name
     
@@ -66,3 +71,14 @@ class User:
             ID de l'usuari.
         """
         return self._id
+
+    def camps(self) -> list:
+        """
+        Retorna els arguments del constructor que permeten tornar a crear l'usuari.
+
+        Returns
+        -------
+        list
+            [user_id, location, age, name].
+        """
+        return [self._id, self._location, self._age, self._name]
@@ -0,0 +1,79 @@
+import numpy as np
+
+#Paràmetres per defecte de l'índex aproximat
+MAX_LLISTA_DEFECTE = 64 #Usuaris guardats per ítem a l'índex invertit
+
+
+class IndexInvertit:
+    """
+    Índex aproximat de veïns: fitxer invertit ítem -> usuaris amb les llistes limitades.
+
+    La similitud entre usuaris només té en compte els ítems valorats pels dos, de manera que els únics
+    veïns amb similitud no nul·la són els usuaris que comparteixen algun ítem. L'índex guarda, per a cada
+    ítem, una mostra aleatòria de com a molt max_llista dels usuaris que l'han valorat; els candidats d'un
+    usuari són la unió de les llistes dels seus ítems. Així el nombre de candidats està fitat per
+    (ítems de l'usuari x max_llista) i no creix amb el nombre d'usuaris del dataset.
+
+    Parameters
+    ----------
+    ratings : MatriuRatings
+        Matriu de valoracions.
+    max_llista : int, optional
+        Usuaris com a molt per ítem; més gran dona més recall i més candidats (default és MAX_LLISTA_DEFECTE).
+    llavor : int, optional
+        Llavor de la mostra d'usuaris de cada ítem (default és 0).
+
+    Attributes
+    ----------
+    _max_llista : int
+        Usuaris com a molt per ítem.
+    _indptr : np.ndarray
+        Inici de la llista de cada ítem a _usuaris (com l'indptr d'una matriu CSC).
+    _usuaris : np.ndarray
+        Files dels usuaris de totes les llistes, una llista rere l'altra.
+    """
+
+    def __init__(self, ratings, max_llista: int = MAX_LLISTA_DEFECTE, llavor: int = 0):
+        csc = ratings.csc()
+        n_items = csc.shape[1]
+        columnes = np.repeat(np.arange(n_items), np.diff(csc.indptr))
+
+        # Ordre aleatori dins de cada ítem i ens quedem els max_llista primers de cadascun
+        ordre = np.lexsort((np.random.default_rng(llavor).random(csc.nnz), columnes))
+        posicio = np.arange(csc.nnz) - csc.indptr[columnes]
+        guardats = ordre[posicio < max_llista]
+
+        self._max_llista = max_llista
+        self._usuaris = csc.indices[guardats].astype(np.int64)
+        self._indptr = np.concatenate(([0], np.cumsum(np.minimum(np.diff(csc.indptr), max_llista))))
+
+    def get_max_llista(self) -> int:
+        """
+        Retorna el nombre màxim d'usuaris per ítem.
+
+        Returns
+        -------
+        int
+            Mida màxima de les llistes.
+        """
+        return self._max_llista
+
+    def candidats(self, columnes: np.ndarray) -> np.ndarray:
+        """
+        Retorna els usuaris de les llistes dels ítems valorats per un usuari.
+
+        Parameters
+        ----------
+        columnes : np.ndarray
+            Columnes dels ítems valorats per l'usuari.
+
+        Returns
+        -------
+        np.ndarray
+            Files dels candidats ordenades.
+        """
+        inicis = self._indptr[columnes]
+        mides = self._indptr[columnes + 1] - inicis
+        # Posicions de totes les llistes alhora: l'inici de cada llista repetit més el desplaçament dins seu
+        desplacaments = np.arange(mides.sum()) - np.repeat(np.cumsum(mides) - mides, mides)
+        return np.unique(self._usuaris[np.repeat(inicis, mides) + desplacaments])
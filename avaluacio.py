@@ -0,0 +1,164 @@
+# Avaluació offline de tot el dataset (o d'una mostra d'usuaris) amb diversos processos
+
+import argparse, logging, os, random, time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+from avaluador import AvaluadorGlobal
+from recomenador import MIDA_BLOC, Colaboratiu, Factoritzacio
+from main import DATASETS, METODES, carrega_recomanador, limit, nom_snapshot
+from dataset import MAX_ITEMS_DEFECTE, MAX_USERS_DEFECTE
+
+"""
+Script per avaluar un algorisme de recomanació sobre tots els usuaris d'un dataset.
+
+Els usuaris es reparteixen en blocs entre un conjunt de processos que comparteixen el
+recomanador (i la matriu de valoracions) només de lectura. Es mostren el MAE i RMSE globals,
+la distribució per usuari i el rendiment en usuaris per segon.
+
+Usage
+-----
+python avaluacio.py {MovieLens100k, Books, VideoGames} {Simple, Col·laboratiu, Col·laboratiu-ítems, Factorització, Contingut} [--usuaris N] [--workers W] [--index-veins K] [--ann N]
+"""
+
+_RECOMANADOR = None  # Recomanador del procés (heretat amb fork o rebut a l'inicialitzador)
+
+
+def _inicialitza_worker(recomanador):
+    """
+    Inicialitza un procés treballador amb el recomanador compartit.
+
+    Parameters
+    ----------
+    recomanador : Recomenador or None
+        Recomanador a utilitzar; None si ja s'ha heretat del procés pare (fork).
+    """
+    global _RECOMANADOR
+    if recomanador is not None:
+        _RECOMANADOR = recomanador
+
+
+def _avalua_bloc(files: np.ndarray):
+    """
+    Avalua un bloc d'usuaris dins d'un procés treballador.
+
+    Parameters
+    ----------
+    files : np.ndarray
+        Files dels usuaris del bloc.
+
+    Returns
+    -------
+    tuple of np.ndarray or None
+        Errors per usuari retornats per Recomenador.errors_batch.
+    """
+    return _RECOMANADOR.errors_batch(files)
+
+
+def avalua(recomanador, user_ids: list, workers: int = 1, mida_bloc: int = MIDA_BLOC) -> AvaluadorGlobal:
+    """
+    Avalua el recomanador sobre una llista d'usuaris, repartint els blocs entre processos.
+
+    Parameters
+    ----------
+    recomanador : Recomenador
+        Recomanador a avaluar.
+    user_ids : list
+        Identificadors dels usuaris a avaluar.
+    workers : int, optional
+        Nombre de processos (default és 1, sense pool).
+    mida_bloc : int, optional
+        Usuaris per bloc (default és MIDA_BLOC).
+
+    Returns
+    -------
+    AvaluadorGlobal
+        Resultats acumulats de tots els usuaris.
+
+    Raises
+    ------
+    ValueError
+        Si l'algoritme no es pot aplicar al dataset o algun usuari no hi és.
+    """
+    global _RECOMANADOR
+    dataset = recomanador._dataset
+    files = dataset.get_users().rows_for(user_ids)
+    if np.any(files < 0):
+        raise ValueError("Hi ha usuaris que no són al dataset.")
+    blocs = [files[i:i + mida_bloc] for i in range(0, len(files), mida_bloc)]
+
+    resultat = AvaluadorGlobal()
+    inici = time.perf_counter()
+    if workers <= 1:
+        resultat_blocs = [recomanador.errors_batch(bloc) for bloc in blocs]
+    else:
+        # Amb fork els processos hereten el recomanador sense copiar-lo; si no, es passa un cop a cada procés
+        # (si la matriu està mapada a memòria, el pickle només conté el directori dels fitxers)
+        _RECOMANADOR = recomanador
+        heretat = mp.get_start_method() == "fork"
+        with ProcessPoolExecutor(max_workers=workers, initializer=_inicialitza_worker,
+                                 initargs=(None if heretat else recomanador,)) as pool:
+            resultat_blocs = list(pool.map(_avalua_bloc, blocs))
+
+    for errors in resultat_blocs:
+        if errors is None:
+            raise ValueError("L'algoritme no es pot aplicar a aquest dataset.")
+        resultat.afegeix(*errors)
+    resultat.set_temps(time.perf_counter() - inici)
+
+    return resultat
+
+
+def main():
+    """
+    Executa l'avaluació offline des de la línia de comandes.
+    """
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s | %(name)s | %(levelname)s | %(message)s')
+
+    parser = argparse.ArgumentParser(description="Avaluar un algorisme de recomanació sobre tots els usuaris d'un dataset.")
+    parser.add_argument("dataset", choices=DATASETS, help="Conjunt de dades a utilitzar.")
+    parser.add_argument("method", choices=METODES, help="Algoritme de recomanació a avaluar.")
+    parser.add_argument("--usuaris", type=int, default=None, help="Nombre d'usuaris de la mostra aleatòria (per defecte tots).")
+    parser.add_argument("--llavor", type=int, default=0, help="Llavor per a la mostra d'usuaris.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Nombre de processos treballadors.")
+    parser.add_argument("--mida-bloc", type=int, default=MIDA_BLOC, help="Usuaris processats alhora per cada procés.")
+    parser.add_argument("--k", type=int, default=None, help="Nombre de veïns (Col·laboratiu).")
+    parser.add_argument("--min-vots", type=int, default=None, help="Vots mínims (Simple).")
+    parser.add_argument("--mmap", action="store_true", help="Mapar la matriu de valoracions a memòria: els processos comparteixen les pàgines.")
+    parser.add_argument("--max-items", type=limit, default=MAX_ITEMS_DEFECTE, help="Nombre màxim d'ítems de Books i VideoGames (0 = sense límit).")
+    parser.add_argument("--max-usuaris", type=limit, default=MAX_USERS_DEFECTE, help="Nombre màxim d'usuaris de Books i VideoGames (0 = sense límit).")
+    parser.add_argument("--index-veins", type=int, default=None, metavar="K", help="Precalcular els K veïns més similars de cada usuari (Col·laboratiu).")
+    parser.add_argument("--ann", type=int, default=None, metavar="N", help="Cerca aproximada de veïns amb N usuaris com a molt per ítem (Col·laboratiu); mostra el recall respecte la cerca exacta.")
+    parser.add_argument("--rang", type=int, default=None, help="Dimensió dels factors (Factorització).")
+    parser.add_argument("--iteracions", type=int, default=None, help="Iteracions d'ALS (Factorització).")
+    args = parser.parse_args()
+
+    r = carrega_recomanador(args.dataset, args.method, nom_snapshot(args.dataset, args.method, args.max_items, args.max_usuaris),
+                            args.mmap, args.max_items, args.max_usuaris)
+    if args.k is not None:
+        r._k = args.k
+    if args.min_vots is not None:
+        r._min_vots = args.min_vots
+    if args.index_veins and isinstance(r, Colaboratiu):
+        r.construeix_index(args.index_veins)
+
+    user_ids = sorted(r._dataset.get_users())
+    if args.usuaris is not None and args.usuaris < len(user_ids):
+        user_ids = random.Random(args.llavor).sample(user_ids, args.usuaris)
+
+    if isinstance(r, Factoritzacio):
+        r.configura(args.rang, args.iteracions)
+    if args.ann and isinstance(r, Colaboratiu):
+        r.construeix_ann(args.ann)
+        recall = r.recall_ann(r._dataset.get_users().rows_for(user_ids), mida_bloc=args.mida_bloc)
+        print(f"Cerca aproximada ({args.ann} usuaris per ítem): recall@{r.get_k(interactiu=False)} {recall['recall']:.3f} | "
+              f"{recall['candidats']:.0f} candidats de {recall['usuaris']} usuaris | "
+              f"veïns en {recall['temps_ann']:.2f}s (exacte {recall['temps_exacte']:.2f}s)")
+
+    r.assegura_model()  # Abans de repartir els blocs, així els processos reben el model ja calculat en lloc d'ajustar-lo cadascun
+    print(f"Avaluant {args.method} a {args.dataset}: {len(user_ids)} usuaris amb {args.workers} processos...")
+    print(avalua(r, user_ids, args.workers, args.mida_bloc))
+
+
+if __name__ == '__main__':
+    main()
@@ -110,3 +110,121 @@ class Avaluador():
             raise ValueError("Les prediccions i els valors reals han de tenir la mateixa mida.")
         self._rmse = np.sqrt(np.mean((prediccions - valors_reals) ** 2))
         return True
+
+
+class AvaluadorGlobal():
+    """
+    Classe per acumular l'avaluació d'un sistema de recomanació sobre molts usuaris.
+
+    Attributes
+    ----------
+    _num : list of np.ndarray
+        Nombre de prediccions avaluades per usuari (per blocs).
+    _suma_abs : list of np.ndarray
+        Suma dels errors absoluts per usuari (per blocs).
+    _suma_quadrats : list of np.ndarray
+        Suma dels errors quadràtics per usuari (per blocs).
+    _temps : float or None
+        Temps total de l'avaluació en segons.
+    """
+
+    def __init__(self):
+        """
+        Inicialitza un avaluador global buit.
+        """
+        self._num = []
+        self._suma_abs = []
+        self._suma_quadrats = []
+        self._temps = None
+
+    def afegeix(self, num: np.ndarray, suma_abs: np.ndarray, suma_quadrats: np.ndarray):
+        """
+        Afegeix els errors d'un bloc d'usuaris.
+
+        Parameters
+        ----------
+        num : np.ndarray
+            Nombre de prediccions avaluades de cada usuari.
+        suma_abs : np.ndarray
+            Suma d'errors absoluts de cada usuari.
+        suma_quadrats : np.ndarray
+            Suma d'errors quadràtics de cada usuari.
+        """
+        self._num.append(np.asarray(num))
+        self._suma_abs.append(np.asarray(suma_abs))
+        self._suma_quadrats.append(np.asarray(suma_quadrats))
+
+    def set_temps(self, temps: float):
+        """
+        Estableix el temps total de l'avaluació.
+
+        Parameters
+        ----------
+        temps : float
+            Temps en segons.
+        """
+        self._temps = temps
+
+    def metriques(self) -> dict:
+        """
+        Calcula les mètriques globals i la distribució per usuari.
+
+        El MAE i RMSE globals agrupen totes les prediccions; la distribució per usuari només
+        inclou els usuaris amb alguna predicció avaluada.
+
+        Returns
+        -------
+        dict
+            Mètriques calculades.
+        """
+        num = np.concatenate(self._num) if self._num else np.zeros(0)
+        suma_abs = np.concatenate(self._suma_abs) if self._suma_abs else np.zeros(0)
+        suma_quadrats = np.concatenate(self._suma_quadrats) if self._suma_quadrats else np.zeros(0)
+        total = num.sum()
+
+        avaluats = num > 0
+        mae_usuaris = suma_abs[avaluats] / num[avaluats]
+        rmse_usuaris = np.sqrt(suma_quadrats[avaluats] / num[avaluats])
+
+        metriques = {
+            "usuaris": len(num),
+            "usuaris_avaluats": int(avaluats.sum()),
+            "prediccions": int(total),
+            "mae": suma_abs.sum() / total if total > 0 else None,
+            "rmse": np.sqrt(suma_quadrats.sum() / total) if total > 0 else None,
+            "temps": self._temps,
+            "usuaris_per_segon": len(num) / self._temps if self._temps else None,
+        }
+        for nom, valors in (("mae_usuaris", mae_usuaris), ("rmse_usuaris", rmse_usuaris)):
+            if len(valors) > 0:
+                metriques[nom] = {
+                    "mitjana": float(np.mean(valors)),
+                    "p10": float(np.percentile(valors, 10)),
+                    "mediana": float(np.median(valors)),
+                    "p90": float(np.percentile(valors, 90)),
+                }
+        return metriques
+
+    def __str__(self) -> str:
+        """
+        Retorna una cadena amb els resultats de l'avaluació global.
+
+        Returns
+        -------
+        str
+            Mètriques globals, distribució per usuari i rendiment.
+        """
+        m = self.metriques()
+        if m["mae"] is None:
+            return "No s'han pogut calcular les mètriques. Cap usuari té prediccions sobre valoracions reals."
+
+        cad = f"Resultats d'avaluació global ({m['usuaris_avaluats']}/{m['usuaris']} usuaris, {m['prediccions']} prediccions):\n"
+        cad += f"  MAE  (Mean Absolute Error):     {m['mae']:.3f}\n"
+        cad += f"  RMSE (Root Mean Squared Error): {m['rmse']:.3f}\n"
+        for nom, etiqueta in (("mae_usuaris", "MAE per usuari "), ("rmse_usuaris", "RMSE per usuari")):
+            d = m[nom]
+            cad += f"  {etiqueta}: mitjana {d['mitjana']:.3f} | p10 {d['p10']:.3f} | mediana {d['mediana']:.3f} | p90 {d['p90']:.3f}\n"
+        if m["usuaris_per_segon"] is not None:
+            cad += f"  Temps: {m['temps']:.2f}s ({m['usuaris_per_segon']:.1f} usuaris/s)\n"
+        return cad
+
@@ -0,0 +1,141 @@
+import numpy as np
+import json, os, logging
+
+#Versió del format de la cache binària; si canvia, les caches antigues s'ignoren
+VERSIO_CACHE = 3
+
+
+def signatura_fonts(fitxers, parametres: dict = None) -> str:
+    """
+    Retorna una signatura dels fitxers font a partir de la seva mida i data de modificació.
+
+    Parameters
+    ----------
+    fitxers : iterable of str
+        Paths dels fitxers font del dataset.
+    parametres : dict, optional
+        Paràmetres de càrrega que també determinen el contingut de la cache (default és None).
+
+    Returns
+    -------
+    str
+        Cadena JSON amb (path, mida, mtime) de cada fitxer, els paràmetres i la versió del format.
+    """
+    fonts = []
+    for path in fitxers:
+        estat = os.stat(path)
+        fonts.append([path, estat.st_size, estat.st_mtime_ns])
+    return json.dumps({"versio": VERSIO_CACHE, "fonts": fonts, "parametres": parametres or {}}, sort_keys=True)
+
+
+def empaqueta_registres(registres) -> tuple:
+    """
+    Codifica una llista de registres (valors JSON) en un únic bloc de bytes amb offsets.
+
+    Parameters
+    ----------
+    registres : iterable
+        Registres a codificar (str, llistes, números o None).
+
+    Returns
+    -------
+    tuple of np.ndarray
+        (bloc uint8 amb tots els registres, offsets int64 de mida len(registres) + 1).
+    """
+    codificats = [json.dumps(registre, ensure_ascii=False).encode("utf-8") for registre in registres]
+    offsets = np.zeros(len(codificats) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(c) for c in codificats])
+    bloc = np.frombuffer(b"".join(codificats), dtype=np.uint8)
+    return bloc, offsets
+
+
+def desempaqueta_registre(bloc: np.ndarray, offsets: np.ndarray, i: int):
+    """
+    Descodifica el registre i d'un bloc creat amb empaqueta_registres.
+
+    Parameters
+    ----------
+    bloc : np.ndarray
+        Bloc uint8 amb els registres.
+    offsets : np.ndarray
+        Offsets de cada registre dins del bloc.
+    i : int
+        Posició del registre.
+
+    Returns
+    -------
+    object
+        Registre descodificat.
+    """
+    return json.loads(bloc[offsets[i]:offsets[i + 1]].tobytes().decode("utf-8"))
+
+
+def desempaqueta_registres(bloc: np.ndarray, offsets: np.ndarray) -> list:
+    """
+    Descodifica tots els registres d'un bloc creat amb empaqueta_registres.
+
+    Parameters
+    ----------
+    bloc : np.ndarray
+        Bloc uint8 amb els registres.
+    offsets : np.ndarray
+        Offsets de cada registre dins del bloc.
+
+    Returns
+    -------
+    list
+        Registres descodificats, en ordre.
+    """
+    dades = bloc.tobytes()
+    return [json.loads(dades[offsets[i]:offsets[i + 1]].decode("utf-8")) for i in range(len(offsets) - 1)]
+
+
+def desa_cache(path: str, signatura: str, arrays: dict):
+    """
+    Desa la cache binària d'un dataset (fitxer .npz sense comprimir).
+
+    S'escriu primer a un fitxer temporal i es reanomena, així una escriptura interrompuda
+    mai deixa una cache corrupta.
+
+    Parameters
+    ----------
+    path : str
+        Path del fitxer de cache.
+    signatura : str
+        Signatura dels fitxers font (vegeu signatura_fonts).
+    arrays : dict
+        Arrays a desar, per nom.
+    """
+    temporal = path + ".tmp"
+    with open(temporal, "wb") as fitxer:
+        np.savez(fitxer, signatura=np.array(signatura), **arrays)
+    os.replace(temporal, path)
+
+
+def carrega_cache(path: str, signatura: str):
+    """
+    Carrega la cache binària d'un dataset si existeix i correspon als fitxers font actuals.
+
+    Parameters
+    ----------
+    path : str
+        Path del fitxer de cache.
+    signatura : str
+        Signatura actual dels fitxers font.
+
+    Returns
+    -------
+    dict or None
+        Arrays de la cache per nom, o None si no hi ha cache vàlida.
+    """
+    if not os.path.isfile(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as dades:
+            if str(dades["signatura"]) != signatura:
+                logging.info(f"Cache {path} invalidada: els fitxers font han canviat")
+                return None
+            return {nom: dades[nom] for nom in dades.files if nom != "signatura"}
+    except Exception as e:
+        logging.warning(f"No s'ha pogut llegir la cache {path}: {e}")
+        return None
@@ -0,0 +1,187 @@
+import sys
+import numpy as np
+from collections import OrderedDict
+
+#Límits per defecte de la cache de resultats d'un recomanador
+MAX_ENTRADES_DEFECTE = 1024
+MAX_BYTES_DEFECTE = 64 * 1024 * 1024
+
+
+def mida_valor(valor) -> int:
+    """
+    Estima els bytes que ocupa un valor de la cache.
+
+    Parameters
+    ----------
+    valor : object
+        Array, tupla d'arrays o qualsevol altre objecte.
+
+    Returns
+    -------
+    int
+        Bytes aproximats (el contingut dels arrays més la mida de l'objecte).
+    """
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, tuple):
+        return sum(mida_valor(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """
+    Cache LRU acotada per nombre d'entrades i per memòria, amb comptadors d'encerts i fallades.
+
+    Quan s'afegeix una entrada i se supera algun dels dos límits, s'expulsen les entrades menys
+    usades recentment. El contingut no es desa amb el pickle (només els límits), de manera que un
+    snapshot no arrossega resultats antics.
+
+    Parameters
+    ----------
+    max_entrades : int, optional
+        Nombre màxim d'entrades (default és MAX_ENTRADES_DEFECTE).
+    max_bytes : int, optional
+        Memòria màxima aproximada de les entrades (default és MAX_BYTES_DEFECTE).
+
+    Attributes
+    ----------
+    _entrades : OrderedDict
+        clau -> (valor, bytes), de la menys a la més usada recentment.
+    _bytes : int
+        Bytes ocupats per totes les entrades.
+    _encerts : int
+        Consultes que han trobat la clau.
+    _fallades : int
+        Consultes que no l'han trobada.
+    _expulsades : int
+        Entrades expulsades per falta d'espai.
+    """
+
+    def __init__(self, max_entrades: int = MAX_ENTRADES_DEFECTE, max_bytes: int = MAX_BYTES_DEFECTE):
+        self._max_entrades = max_entrades
+        self._max_bytes = max_bytes
+        self.neteja()
+
+    def __len__(self) -> int:
+        return len(self._entrades)
+
+    def __contains__(self, clau) -> bool:
+        return clau in self._entrades
+
+    def get(self, clau, defecte=None):
+        """
+        Retorna el valor d'una clau i la marca com a usada recentment.
+
+        Parameters
+        ----------
+        clau : hashable
+            Clau de l'entrada.
+        defecte : optional
+            Valor si la clau no hi és (default és None).
+
+        Returns
+        -------
+        object
+            Valor guardat, o defecte.
+        """
+        entrada = self._entrades.get(clau)
+        if entrada is None:
+            self._fallades += 1
+            return defecte
+        self._encerts += 1
+        self._entrades.move_to_end(clau)
+        return entrada[0]
+
+    def put(self, clau, valor):
+        """
+        Guarda un valor i expulsa les entrades menys usades si cal.
+
+        Un valor més gran que max_bytes no es guarda.
+
+        Parameters
+        ----------
+        clau : hashable
+            Clau de l'entrada.
+        valor : object
+            Valor a guardar (preferiblement arrays, vegeu mida_valor).
+        """
+        self.invalida(clau)
+        mida = mida_valor(valor)
+        if mida > self._max_bytes or self._max_entrades <= 0:
+            return
+        self._entrades[clau] = (valor, mida)
+        self._bytes += mida
+        while len(self._entrades) > self._max_entrades or self._bytes > self._max_bytes:
+            _, (_, mida_expulsada) = self._entrades.popitem(last=False)
+            self._bytes -= mida_expulsada
+            self._expulsades += 1
+
+    def invalida(self, clau) -> bool:
+        """
+        Esborra una entrada.
+
+        Parameters
+        ----------
+        clau : hashable
+            Clau de l'entrada.
+
+        Returns
+        -------
+        bool
+            True si l'entrada existia.
+        """
+        entrada = self._entrades.pop(clau, None)
+        if entrada is None:
+            return False
+        self._bytes -= entrada[1]
+        return True
+
+    def invalida_si(self, condicio) -> int:
+        """
+        Esborra totes les entrades la clau de les quals compleix una condició.
+
+        Parameters
+        ----------
+        condicio : callable
+            Funció clau -> bool.
+
+        Returns
+        -------
+        int
+            Nombre d'entrades esborrades.
+        """
+        claus = [clau for clau in self._entrades if condicio(clau)]
+        for clau in claus:
+            self.invalida(clau)
+        return len(claus)
+
+    def neteja(self):
+        """
+        Buida la cache i reinicia els comptadors.
+        """
+        self._entrades = OrderedDict()
+        self._bytes = 0
+        self._encerts = 0
+        self._fallades = 0
+        self._expulsades = 0
+
+    def estadistiques(self) -> dict:
+        """
+        Retorna l'ocupació i els comptadors de la cache.
+
+        Returns
+        -------
+        dict
+            'entrades', 'bytes', 'encerts', 'fallades', 'expulsades' i 'taxa_encerts'.
+        """
+        consultes = self._encerts + self._fallades
+        return {"entrades": len(self._entrades), "bytes": self._bytes, "encerts": self._encerts,
+                "fallades": self._fallades, "expulsades": self._expulsades,
+                "taxa_encerts": self._encerts / consultes if consultes else 0.0}
+
+    def __getstate__(self):
+        # Només es desen els límits: els resultats es tornen a calcular després de carregar
+        return {"_max_entrades": self._max_entrades, "_max_bytes": self._max_bytes}
+
+    def __setstate__(self, estat):
+        self.__init__(estat["_max_entrades"], estat["_max_bytes"])
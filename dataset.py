@@ -1,10 +1,14 @@
-from typing import Dict
+from typing import List
 from items import Item, Book, Movie, VideoGame
 from abc import ABC, abstractmethod 
 from user import User
-import csv, os, logging
+import csv, os, heapq, logging
 import numpy as np
-from toolkit import timer, parse, clean_price
+from toolkit import timer, parse, parse_camps, clean_price
+from ratings import MatriuRatings, AcumuladorValoracions
+from ids import TaulaIds
+from cache_dataset import signatura_fonts, empaqueta_registres, desempaqueta_registre, desempaqueta_registres, desa_cache, carrega_cache
+from collections import OrderedDict
 
 #Constants amb els paths pels arxius d'on estreurem la informació
 NOM_FITXER_MOVIES = "dataset\\MovieLens100k\\movies.csv"
@@ -17,6 +21,18 @@ NOM_FITXER_RATING_BOOKS = "dataset\\Books\\Ratings.csv"
 NOM_FITXER_VIDEOGAMES_METADATA = "dataset\\VideoGames\\meta_Video_Games.json.gz"
 NOM_FITXER_RATINGS_VIDEOGAMES = "dataset\\VideoGames\\Video_Games_5.json.gz"
 
+#Caches binàries (es regeneren automàticament si canvien els fitxers font)
+NOM_FITXER_CACHE_MOVIES = "dataset\\MovieLens100k\\cache_movies.npz"
+NOM_FITXER_CACHE_BOOKS = "dataset\\Books\\cache_books.npz"
+NOM_FITXER_CACHE_VIDEOGAMES = "dataset\\VideoGames\\cache_videogames.npz"
+
+#Ítems descodificats que es guarden a memòria quan les metadades es llegeixen sota demanda
+MIDA_LRU_ITEMS = 256
+
+#Límits per defecte de Books i VideoGames (None vol dir sense límit)
+MAX_ITEMS_DEFECTE = 10000
+MAX_USERS_DEFECTE = 10000
+
 
 class Dataset(ABC):
     """
@@ -27,39 +43,50 @@ class Dataset(ABC):
 
     Attributes
     ----------
-    _users : dict[int, User]
-        Diccionari que mapeja una fila (índex) a un objecte User.
-    _items : dict[int, Item]
-        Diccionari que mapeja una columna (índex) a un objecte Item.
-    _pos_users : dict[str, int]
-        Diccionari que mapeja l'identificador de l'usuari a la seva fila (índex).
-    _pos_items : dict[str, int]
-        Diccionari que mapeja l'identificador de l'ítem a la seva columna (índex).
-    _ratings : np.ndarray
-        Matriu de valoracions on files són usuaris i columnes són ítems. Valor -1 indica absència de valoració.
+    _users : list[User]
+        Objecte User de cada fila.
+    _items : list[Item] or None
+        Objecte Item de cada columna, o None si les metadades es llegeixen sota demanda de la cache.
+    _items_bloc : np.ndarray or None
+        Metadades dels ítems codificades (vegeu cache_dataset.empaqueta_registres), en ordre de columna.
+    _items_offsets : np.ndarray or None
+        Offset de cada ítem dins de _items_bloc.
+    _lru_items : OrderedDict
+        Últims ítems descodificats (com a molt MIDA_LRU_ITEMS), per columna.
+    _ids_users : TaulaIds
+        Taula entre identificadors d'usuari i files.
+    _ids_items : TaulaIds
+        Taula entre identificadors d'ítem i columnes.
+    _ratings : MatriuRatings
+        Matriu dispersa de valoracions on files són usuaris i columnes són ítems. Només es guarden les valoracions existents.
     _pmax : int
         Valor màxim possible d’una valoració.
-    _all_users : set
-        Conjunt amb tots els identificadors d’usuaris presents al dataset.
-    _all_items : set
-        Conjunt amb tots els identificadors d’ítems presents al dataset.
+    _mmap : bool
+        Indica si la matriu de valoracions està mapada a memòria des de la cache.
     """
 
-    _users: Dict[int , User] # fila : User
-    _items: Dict[int , Item] # columna : Item
-    _pos_users: Dict[str, int] #id_user : fila
-    _pos_items: Dict[str, int] #id_item : columna
-    _ratings: np.array 
+    _users: List[User] # fila : User
+    _items: List[Item] # columna : Item (None si es llegeixen sota demanda)
+    _ids_users: TaulaIds #id_user <-> fila
+    _ids_items: TaulaIds #id_item <-> columna
+    _ratings: MatriuRatings
     _pmax: int
-    _all_users: set
-    _all_items: set
     
-    def __init__(self) -> bool:
+    def __init__(self, mmap: bool = False) -> bool:
 
         """
         Inicialitza la infraestructura bàsica del dataset, carregant les valoracions i validant la consistència
         entre índexs i identificadors d’usuaris i ítems.
 
+        Si hi ha una cache binària vàlida es carrega d'allà; si no, es llegeixen els fitxers font
+        i es desa la cache per a la propera execució.
+
+        Parameters
+        ----------
+        mmap : bool, optional
+            Si és True, la matriu de valoracions es mapa a memòria (np.memmap) des dels fitxers de la
+            cache, de manera que tots els processos del mateix host comparteixen les pàgines (default és False).
+
         Returns
         -------
         bool
@@ -71,33 +98,37 @@ class Dataset(ABC):
             Si hi ha un error en carregar les valoracions o en assignar posicions.
         """
 
-        self._users = dict()
-        self._items = dict()
-        self._pos_users = dict() #Cambiar "pos" por "row" i "column" (o "fila" i "columna")
-        self._pos_items = dict()
-        self._all_users = set()
-        self._all_items = set()
+        self._users = []
+        self._items = []
+        self._items_bloc = None
+        self._items_offsets = None
+        self._lru_items = OrderedDict()
+        self._ids_users = TaulaIds()
+        self._ids_items = TaulaIds()
         self._pmax = None
+        self._mmap = mmap
 
         try:
-            self._ratings = self.carrega_ratings() 
+            if not self.carrega_cache():
+                self._ratings = self.carrega_ratings() 
+                self.desa_cache()
         except Exception as e:
             raise RuntimeError(f"Error carregant ratings: {e}")
 
         try:
-            for i in range(len(self._all_items)):
-                item_id = self.get_item_id(i)
-                i_retrobat = self.get_col_item(item_id)
-                assert i == i_retrobat, f"Error: idx={i}, idx_retrobat={i_retrobat}"
+            if self._items is not None:
+                cols = self._ids_items.rows_for(item.get_id() for item in self._items)
+                assert len(cols) == len(self._ids_items) and np.array_equal(cols, np.arange(len(cols))), "ítems i columnes no coincideixen"
+            else:
+                assert len(self._items_offsets) - 1 == len(self._ids_items), "ítems i columnes no coincideixen"
+            assert self._ratings.shape[1] == len(self._ids_items), "la matriu i els ítems no coincideixen"
         except Exception as e:
             logging.critical("S'ha detectat un comportament inesperat: assignant posicions als items incorrectes")
             raise RuntimeError(f"Error assignant posicions als items: {e}")
 
         try:
-            for i in range(len(self._all_users)):
-                user_id = self.get_user_id(i)
-                i_retrobat = self.get_row_user(user_id)
-                assert i == i_retrobat, f"Error: idx={i}, idx_retrobat={i_retrobat}"
+            files = self._ids_users.rows_for(user.get_id() for user in self._users)
+            assert len(files) == len(self._ids_users) and np.array_equal(files, np.arange(len(files))), "usuaris i files no coincideixen"
         except Exception as e:
             logging.critical("S'ha detectat un comportament inesperat: assignant posicions als usuaris incorrectes")
             raise RuntimeError(f"Error assignant posicions als usuaris: {e}")
@@ -111,8 +142,8 @@ class Dataset(ABC):
 
         Returns
         -------
-        np.ndarray
-            Matriu de valoracions.
+        MatriuRatings
+            Matriu dispersa de valoracions.
 
         Raises
         ------
@@ -128,8 +159,8 @@ class Dataset(ABC):
 
         Returns
         -------
-        set
-            Conjunt d'identificadors d'usuaris.
+        TaulaIds
+            Identificadors d'usuaris en ordre de fila.
         Raises
         ------
         NotImplementedError
@@ -144,8 +175,8 @@ class Dataset(ABC):
 
         Returns
         -------
-        set
-            Conjunt d'identificadors d'ítems.
+        TaulaIds
+            Identificadors d'ítems en ordre de columna.
         Raises
         ------
         NotImplementedError
@@ -153,6 +184,168 @@ class Dataset(ABC):
         """
         raise NotImplementedError   
 
+    def fitxers_font(self) -> tuple:
+        """
+        Retorna els fitxers font del dataset, que determinen la validesa de la cache.
+
+        Returns
+        -------
+        tuple of str
+            Paths dels fitxers font (buit si el dataset no té cache).
+        """
+        return ()
+
+    def fitxer_cache(self):
+        """
+        Retorna el path de la cache binària del dataset.
+
+        Returns
+        -------
+        str or None
+            Path del fitxer de cache, o None si el dataset no en té.
+        """
+        return None
+
+    def directori_ratings(self):
+        """
+        Retorna el directori on la cache desa els arrays de la matriu de valoracions (.npy).
+
+        Returns
+        -------
+        str or None
+            Directori dels arrays, o None si el dataset no té cache.
+        """
+        path = self.fitxer_cache()
+        return None if path is None else os.path.splitext(path)[0] + "_ratings"
+
+    def parametres_carrega(self) -> dict:
+        """
+        Retorna els paràmetres que determinen el contingut del dataset carregat (per exemple els límits).
+
+        Formen part de la signatura de la cache, així una cache creada amb uns altres paràmetres no es fa servir.
+
+        Returns
+        -------
+        dict
+            Paràmetres de càrrega (buit per defecte).
+        """
+        return {}
+
+    @staticmethod
+    def top_usuaris(comptes: np.ndarray, max_users: int = None) -> np.ndarray:
+        """
+        Selecciona els usuaris amb més valoracions.
+
+        Parameters
+        ----------
+        comptes : np.ndarray
+            Nombre de valoracions de cada codi d'usuari (els codis segueixen l'ordre d'aparició).
+        max_users : int, optional
+            Nombre màxim d'usuaris; None els selecciona tots (default és None).
+
+        Returns
+        -------
+        np.ndarray
+            Codis dels usuaris seleccionats; en cas d'empat es prefereix el que apareix primer.
+        """
+        if max_users is None or max_users >= len(comptes):
+            return np.arange(len(comptes))
+        # nlargest equival a ordenar-ho tot de manera estable i tallar, sense ordenar-ho tot
+        return np.array(heapq.nlargest(max_users, range(len(comptes)), key=comptes.__getitem__), dtype=np.int64)
+
+    def crea_item(self, camps: list) -> Item:
+        """
+        Torna a crear un ítem a partir dels camps desats a la cache.
+
+        Parameters
+        ----------
+        camps : list
+            Arguments del constructor (vegeu Item.camps).
+
+        Returns
+        -------
+        Item
+            Objecte de l'ítem.
+
+        Raises
+        ------
+        NotImplementedError
+            Si la subclasse no implementa aquest mètode.
+        """
+        raise NotImplementedError
+
+    def desa_cache(self) -> bool:
+        """
+        Desa les valoracions, els usuaris i els ítems a la cache binària.
+
+        Els arrays de la matriu es desen com a fitxers .npy (mapables) a directori_ratings() i la resta
+        al fitxer .npz, que s'escriu l'últim i fa de marca de cache completa. Un cop desada, les metadades
+        dels ítems es guarden codificades i es descodifiquen sota demanda (vegeu get_item).
+
+        Returns
+        -------
+        bool
+            True si s'ha desat la cache.
+        """
+        path = self.fitxer_cache()
+        if path is None:
+            return False
+        try:
+            if os.path.exists(path):
+                os.remove(path)  # Invalida la cache anterior mentre es reemplacen els arrays (els mapes oberts no es toquen)
+            self._ratings.desa(self.directori_ratings())
+            users, users_offsets = empaqueta_registres(user.camps() for user in self._users)
+            items, items_offsets = empaqueta_registres(item.camps() for item in self.itera_items())
+            arrays = dict(users=users, users_offsets=users_offsets, items=items, items_offsets=items_offsets,
+                          item_ids=np.array(self._ids_items.ids().tolist(), dtype=str),
+                          pmax=np.array(np.nan if self._pmax is None else self._pmax, dtype=np.float64))
+            desa_cache(path, signatura_fonts(self.fitxers_font(), self.parametres_carrega()), arrays)
+        except Exception as e:
+            logging.warning(f"No s'ha pogut desar la cache {path}: {e}")
+            return False
+        logging.info(f"Cache {path} desada")
+
+        self._items_bloc, self._items_offsets, self._items = items, items_offsets, None
+        self._lru_items.clear()
+        if self._mmap:
+            self._ratings = MatriuRatings.carrega(self.directori_ratings(), mmap=True)
+        return True
+
+    def carrega_cache(self) -> bool:
+        """
+        Carrega el dataset de la cache binària si existeix i els fitxers font no han canviat.
+
+        Returns
+        -------
+        bool
+            True si el dataset s'ha carregat de la cache.
+        """
+        path = self.fitxer_cache()
+        if path is None or not all(os.path.exists(font) for font in self.fitxers_font()):
+            return False
+        arrays = carrega_cache(path, signatura_fonts(self.fitxers_font(), self.parametres_carrega()))
+        if arrays is None:
+            return False
+        try:
+            ratings = MatriuRatings.carrega(self.directori_ratings(), mmap=self._mmap)
+        except Exception as e:
+            logging.warning(f"No s'han pogut llegir les valoracions de la cache {path}: {e}")
+            return False
+
+        #Els ítems no es creen: només es llegeixen els ids, i les metadades es descodifiquen quan es demanen
+        self._users = [User(*camps) for camps in desempaqueta_registres(arrays["users"], arrays["users_offsets"])]
+        self._ids_users = TaulaIds(user.get_id() for user in self._users)
+        self._ids_items = TaulaIds(arrays["item_ids"].tolist())
+        self._items_bloc, self._items_offsets, self._items = arrays["items"], arrays["items_offsets"], None
+        self._lru_items.clear()
+
+        self._ratings = ratings
+        if not np.isnan(arrays["pmax"]):
+            self.set_pmax(arrays["pmax"])
+
+        logging.info(f"Dataset carregat de la cache {path}")
+        return True
+
     def set_pmax(self, puntuacio_maxima):
         """
         Estableix la puntuació màxima.
@@ -193,25 +386,25 @@ class Dataset(ABC):
 
     def get_ratings(self):
         """
-        Retorna la matriu de valoracions.
+        Retorna la matriu dispersa de valoracions.
 
         Returns
         -------
-        np.ndarray
-            Matriu de valoracions.
+        MatriuRatings
+            Matriu de valoracions (CSR per files, vista CSC per columnes).
         """
         return self._ratings
     
     def get_users(self):
         """
-        Retorna el conjunt d'usuaris.
+        Retorna la taula d'usuaris.
 
         Returns
         -------
-        set
-            Identificadors d'usuaris.
+        TaulaIds
+            Identificadors d'usuaris (admet in, len i iteració, i traduccions massives amb rows_for/ids_for).
         """
-        return self._all_users   
+        return self._ids_users
     
     def get_row_user(self, id_user:str):
         """
@@ -232,8 +425,9 @@ class Dataset(ABC):
         ValueError
             Si l'usuari no es troba al dataset.
         """
-        if id_user in self._pos_users.keys():
-            return self._pos_users[id_user]
+        fila = self._ids_users.get(id_user)
+        if fila is not None:
+            return fila
         raise ValueError
 
     def get_user_obj(self, id_user:str):
@@ -272,20 +466,18 @@ class Dataset(ABC):
         KeyError
             Si la posició no existeix.
         """
-        if pos_user in self._users.keys():
-            return self._users[pos_user].get_id()
-        raise KeyError
+        return self._ids_users.id(pos_user)
     
     def get_items(self):
         """
-        Retorna el conjunt d'ítems.
+        Retorna la taula d'ítems.
 
         Returns
         -------
-        set
-            Conjunt d'identificadors d'ítems.
+        TaulaIds
+            Identificadors d'ítems (admet in, len i iteració, i traduccions massives amb rows_for/ids_for).
         """
-        return self._all_items
+        return self._ids_items
     
     def get_col_item(self, id_item:str):
         """
@@ -306,9 +498,7 @@ class Dataset(ABC):
         KeyError
             Si l'ítem no es troba al dataset.
         """
-        if id_item in self._pos_items.keys():
-            return self._pos_items[id_item]
-        raise KeyError
+        return self._ids_items.row(id_item)
     
     def get_item_obj(self, item_id:str):
         """
@@ -325,8 +515,63 @@ class Dataset(ABC):
             Objecte de l'ítem.
         """
         col = self.get_col_item(item_id)
-        return self._items[col]
+        return self.get_item(col)
+
+    def get_item(self, col: int) -> Item:
+        """
+        Retorna l'objecte Item d'una columna.
+
+        Si les metadades són a la cache codificada, l'ítem es descodifica en aquest moment i es guarda
+        en una LRU dels últims MIDA_LRU_ITEMS ítems demanats.
+
+        Parameters
+        ----------
+        col : int
+            Índex de columna.
+
+        Returns
+        -------
+        Item
+            Objecte de l'ítem.
+        """
+        if self._items is not None:
+            return self._items[col]
+        item = self._lru_items.get(col)
+        if item is None:
+            item = self.crea_item(desempaqueta_registre(self._items_bloc, self._items_offsets, col))
+            self._lru_items[col] = item
+            if len(self._lru_items) > MIDA_LRU_ITEMS:
+                self._lru_items.popitem(last=False)
+        else:
+            self._lru_items.move_to_end(col)
+        return item
+
+    def itera_items(self):
+        """
+        Recorre tots els ítems en ordre de columna (sense passar per la LRU).
+
+        Yields
+        ------
+        Item
+            Objecte de cada ítem.
+        """
+        if self._items is not None:
+            yield from self._items
+        else:
+            for camps in desempaqueta_registres(self._items_bloc, self._items_offsets):
+                yield self.crea_item(camps)
     
+    def get_item_ids(self):
+        """
+        Retorna els identificadors de tots els ítems en ordre de columna.
+
+        Returns
+        -------
+        np.ndarray
+            Identificadors d'ítems, on la posició i correspon a la columna i.
+        """
+        return self._ids_items.ids()
+
     def get_item_id(self, pos_item:int):
         """
         Retorna l'identificador d'un ítem a partir de la seva posició.
@@ -346,9 +591,7 @@ class Dataset(ABC):
         KeyError
             Si la posició no existeix.
         """
-        if pos_item in self._items.keys():
-            return self._items[pos_item].get_id()
-        raise KeyError
+        return self._ids_items.id(pos_item)
     
     def get_genres(self):
         """
@@ -375,32 +618,75 @@ class DatasetMovies(Dataset):
 
     Notes
     -----
-    Les valoracions es llegeixen d'un fitxer CSV i es guarden en una matriu NumPy de float16.
-    Els valors inicials de la matriu són -1 per indicar absència de valoració.
+    Les valoracions es llegeixen d'un fitxer CSV i es guarden en una matriu dispersa de float32.
+    Només es guarden les posicions valorades, l'absència de valoració no ocupa memòria.
     """
 
-    def __init__(self):
+    def __init__(self, mmap: bool = False):
         """
         Inicialitza el dataset de pel·lícules i carrega les dades.
 
+        Parameters
+        ----------
+        mmap : bool, optional
+            Si és True, la matriu de valoracions es mapa a memòria des de la cache (default és False).
+
         Raises
         ------
         RuntimeError
             Si hi ha un error en la inicialització del dataset pare.
         """
-        if super().__init__():
-            print("LOADED")
+        if super().__init__(mmap):
+            logging.debug("Dataset carregat de la cache")
         else:
             logging.critical("Error crític: no s'ha carregat correctament l'arxiu, no es pot continuar")
 
-    def carrega_ratings(self) -> np.ndarray:
+    def fitxers_font(self) -> tuple:
+        """
+        Retorna els fitxers font del dataset.
+
+        Returns
+        -------
+        tuple of str
+            Paths dels fitxers font.
+        """
+        return (NOM_FITXER_MOVIES, NOM_FITXER_RATINGS_MOVIES)
+
+    def fitxer_cache(self) -> str:
+        """
+        Retorna el path de la cache binària del dataset.
+
+        Returns
+        -------
+        str
+            Path del fitxer de cache.
+        """
+        return NOM_FITXER_CACHE_MOVIES
+
+    def crea_item(self, camps: list) -> Movie:
+        """
+        Torna a crear una pel·lícula a partir dels camps desats a la cache.
+
+        Parameters
+        ----------
+        camps : list
+            Arguments del constructor.
+
+        Returns
+        -------
+        Movie
+            Objecte de la pel·lícula.
+        """
+        return Movie(*camps)
+
+    def carrega_ratings(self) -> MatriuRatings:
         """
         Carrega les valoracions dels usuaris a les pel·lícules.
 
         Returns
         -------
-        np.ndarray
-            Matriu de valoracions (usuaris x pel·lícules).
+        MatriuRatings
+            Matriu dispersa de valoracions (usuaris x pel·lícules).
 
         Raises
         ------
@@ -415,83 +701,110 @@ class DatasetMovies(Dataset):
             logging.critical(f"Error crític: no s'ha carregat correctament l'arxiu {NOM_FITXER_RATINGS_MOVIES}, no es pot continuar")
             raise FileNotFoundError(f"No es troba l'arxiu: {NOM_FITXER_RATINGS_MOVIES}")
         
-        #Recorrer para saber n i m (el shape de la array)
-        #Carregar usuaris i movies
-        self._all_items = self.carrega_items()
+        #Carregar movies i llegir totes les valoracions d'un cop en arrays tipats (userId, movieId, rating)
+        self._ids_items = self.carrega_items()
         logging.debug("Funciona carrega d'items")
-        self._all_users = self.carrega_users()
-        logging.debug("Funciona carrega d'usuaris")
-
-        #Crear array y llenarla
-        number_of_users = len(self._all_users) #n files
-        number_of_items = len(self._all_items) #m columnes
-        ratings = np.negative( np.ones([number_of_users,number_of_items], dtype=np.float16) )#Hemos escogido este tipo ya que necesariamente tiene que ser float porqué tenemos ratings con coma y 16 bits porqué es el más pequeño que entra nuestro máximo
-        logging.debug("Funciona creació d'array")
-        with open(NOM_FITXER_RATINGS_MOVIES, 'r', encoding="utf-8") as csvfile:   
-            dict_reader = csv.DictReader(csvfile, delimiter=',')
-            for row in dict_reader:
-                user_id = row["userId"]
-                movie_id = row["movieId"]
+        user_ids, movie_ids, valors = self.llegeix_valoracions()
 
-                if user_id in self._pos_users.keys() and movie_id in self._pos_items.keys():
-                    ratings[self._pos_users[user_id], self._pos_items[movie_id]] = row["rating"]
-                else:
-                    print(f"User or movie not found: userId={user_id}, movieId={movie_id}") #DEBUG
+        #Factoritzar els ids: cada usuari diferent és una fila (en ordre d'id) i cada movieId la columna de movies.csv
+        usuaris, files = np.unique(user_ids, return_inverse=True)
+        self._ids_users = self.carrega_users(usuaris)
+        logging.debug("Funciona carrega d'usuaris")
+        columnes = self.columnes_items(movie_ids)
+        trobades = columnes >= 0
+        if not trobades.all():
+            logging.warning(f"{np.count_nonzero(~trobades)} valoracions de pel·lícules que no són a {NOM_FITXER_MOVIES}: s'ignoren")
+
+        #Crear la matriu dispersa amb totes les valoracions de cop
+        number_of_users = len(self._ids_users) #n files
+        number_of_items = len(self._ids_items) #m columnes
+        ratings = MatriuRatings(files[trobades], columnes[trobades], valors[trobades], (number_of_users, number_of_items), dtype=np.float32) #Ha de ser float perquè tenim ratings amb coma, i float32 és el més petit que accepta scipy.sparse
         logging.debug("Funciona carrega de ratings")
 
-        self.set_pmax(np.max(ratings)) # = 5
+        self.set_pmax(ratings.max()) # = 5
 
         logging.debug("Funciona assignació puntuació màxima")
 
         return ratings
-                
 
-    def carrega_users(self) -> set:
+    def llegeix_valoracions(self) -> tuple:
         """
-        Carrega els usuaris que han valorat pel·lícules.
+        Llegeix tot el fitxer de valoracions en arrays tipats (una columna per camp).
 
         Returns
         -------
-        set
-            Conjunt d'identificadors d'usuaris.
+        tuple of np.ndarray
+            (userId int64, movieId int64, rating float32), en l'ordre del fitxer.
         """
-        users = set()
+        with open(NOM_FITXER_RATINGS_MOVIES, 'r', encoding="utf-8") as csvfile:
+            capcalera = next(csv.reader(csvfile))
+            columnes = [capcalera.index("userId"), capcalera.index("movieId"), capcalera.index("rating")]
+            dades = np.loadtxt(csvfile, delimiter=',', usecols=columnes, dtype=np.float64, ndmin=2)
+        return dades[:, 0].astype(np.int64), dades[:, 1].astype(np.int64), dades[:, 2].astype(np.float32)
 
-        with open(NOM_FITXER_RATINGS_MOVIES, 'r', encoding="utf-8") as csvfile:   
-            user_reader = csv.DictReader(csvfile, delimiter=',')
-            for row in user_reader:
-                users.add(row["userId"])
+    def columnes_items(self, movie_ids: np.ndarray) -> np.ndarray:
+        """
+        Tradueix movieIds a columnes de la matriu.
 
-        for i,iduser in enumerate(users):
-            self._users[i] = User(iduser) 
-            self._pos_users[iduser] = i
+        Parameters
+        ----------
+        movie_ids : np.ndarray
+            movieIds numèrics.
+
+        Returns
+        -------
+        np.ndarray
+            Columna de cada movieId, o -1 si la pel·lícula no s'ha carregat.
+        """
+        if not len(self._ids_items):
+            return np.full(len(movie_ids), -1, dtype=np.int32)
+        ids = np.fromiter(map(int, self._ids_items), dtype=np.int64, count=len(self._ids_items))
+        cols = np.argsort(ids)
+        ids = ids[cols]
+        posicions = np.minimum(np.searchsorted(ids, movie_ids), len(ids) - 1)
+        return np.where(ids[posicions] == movie_ids, cols[posicions], -1).astype(np.int32)
+
+    def carrega_users(self, usuaris: np.ndarray) -> TaulaIds:
+        """
+        Carrega els usuaris que han valorat pel·lícules.
 
-        return users
+        Parameters
+        ----------
+        usuaris : np.ndarray
+            userIds diferents, en l'ordre de les files.
+
+        Returns
+        -------
+        TaulaIds
+            Identificadors d'usuaris en ordre de fila.
+        """
+        ids = list(map(str, usuaris.tolist()))
+        self._users = [User(iduser) for iduser in ids]
+
+        return TaulaIds(ids)
     
-    def carrega_items(self) -> set:
+    def carrega_items(self) -> TaulaIds:
         """
         Carrega les pel·lícules del fitxer CSV.
 
         Returns
         -------
-        set
-            Conjunt d'identificadors de pel·lícules.
+        TaulaIds
+            Identificadors de pel·lícules en ordre de columna.
         """
-        movies = set()
+        movies = []
 
         with open(NOM_FITXER_MOVIES, 'r', encoding="utf-8") as csvfile:   
             moviesreader = csv.DictReader(csvfile, delimiter=',')
-            for i,row in enumerate(moviesreader):
+            for row in moviesreader:
                 movieid = row["movieId"]
                 titol = " ".join(row["title"].split(" ")[:-1])
                 any_movie = str(row["title"].split(" ")[-1].strip("()"))
                 generes = row["genres"]#.split('|')
-                self._items[i] = Movie(movieid, titol, any_movie, generes) 
-                self._pos_items[movieid] = i
-
-                movies.add(row["movieId"])
+                self._items.append(Movie(movieid, titol, any_movie, generes))
+                movies.append(movieid)
 
-        return movies
+        return TaulaIds(movies)
 
     def get_genres(self):
         """
@@ -503,7 +816,7 @@ class DatasetMovies(Dataset):
             Llista amb els gèneres de cada pel·lícula.
         """
         llista_generes = []
-        for item in self._items.values(): #insertion order (First in first out) meaning we are doing a for in the order of the columns 
+        for item in self.itera_items(): #ordre de les columnes
             llista_generes.append(item.get_genres())
         return llista_generes
 
@@ -515,30 +828,90 @@ class DatasetBooks(Dataset):
 
     Notes
     -----
-    Es filtren els 10.000 llibres i usuaris amb més activitat per millorar el rendiment.
+    Per defecte es filtren els 10.000 primers llibres i els 10.000 usuaris amb més activitat per millorar el rendiment.
     """
-    def __init__(self):
+    def __init__(self, mmap: bool = False, max_items: int = MAX_ITEMS_DEFECTE, max_users: int = MAX_USERS_DEFECTE):
         """
         Inicialitza el dataset de llibres.
 
+        Parameters
+        ----------
+        mmap : bool, optional
+            Si és True, la matriu de valoracions es mapa a memòria des de la cache (default és False).
+        max_items : int, optional
+            Nombre màxim de llibres (els primers del fitxer); None vol dir sense límit (default és 10.000).
+        max_users : int, optional
+            Nombre màxim d'usuaris (els que més valoren); None vol dir sense límit (default és 10.000).
+
         Raises
         ------
         RuntimeError
             Si hi ha un error en la inicialització del dataset pare.
         """
-        if super().__init__():
-            print("LOADED") 
+        self._max_items = max_items
+        self._max_users = max_users
+        if super().__init__(mmap):
+            logging.debug("Dataset carregat de la cache")
         else:
             logging.critical(f"Error crític: no s'ha carregat correctament el dataset Books, no es pot continuar")
 
-    def carrega_ratings(self) -> np.ndarray:
+    def fitxers_font(self) -> tuple:
+        """
+        Retorna els fitxers font del dataset.
+
+        Returns
+        -------
+        tuple of str
+            Paths dels fitxers font.
+        """
+        return (NOM_FITXER_BOOKS, NOM_FITXER_BOOKS_USERS, NOM_FITXER_RATING_BOOKS)
+
+    def parametres_carrega(self) -> dict:
+        """
+        Retorna els límits amb què es carrega el dataset.
+
+        Returns
+        -------
+        dict
+            Nombre màxim de llibres i d'usuaris.
+        """
+        return {"max_items": self._max_items, "max_users": self._max_users}
+
+    def fitxer_cache(self) -> str:
+        """
+        Retorna el path de la cache binària del dataset.
+
+        Returns
+        -------
+        str
+            Path del fitxer de cache.
+        """
+        return NOM_FITXER_CACHE_BOOKS
+
+    def crea_item(self, camps: list) -> Book:
+        """
+        Torna a crear un llibre a partir dels camps desats a la cache.
+
+        Parameters
+        ----------
+        camps : list
+            Arguments del constructor.
+
+        Returns
+        -------
+        Book
+            Objecte del llibre.
+        """
+        return Book(*camps)
+
+    def carrega_ratings(self) -> MatriuRatings:
         """
         Carrega les valoracions dels usuaris als llibres.
 
         Returns
         -------
-        np.ndarray
-            Matriu de valoracions (usuaris x llibres).
+        MatriuRatings
+            Matriu dispersa de valoracions (usuaris x llibres).
 
         Raises
         ------
@@ -556,99 +929,110 @@ class DatasetBooks(Dataset):
             logging.critical(f"Error crític: no s'ha carregat correctament l'arxiu {NOM_FITXER_BOOKS_USERS}, no es pot continuar")
             raise FileNotFoundError(f"No es troba l'arxiu: {NOM_FITXER_BOOKS_USERS}")
         
-        #Recorrer para saber n i m 
-        #Carregar els primer 10.000 books i els 10.000 usuaris més adhients 
-        self._all_items = self.carrega_items()
+        #Carregar els primers llibres i, amb una sola passada pel fitxer de valoracions, els usuaris més adhients 
+        self._ids_items = self.carrega_items()
         logging.debug("Funciona carrega d'items")
-        self._all_users = self.carrega_users()
+        valoracions, ids_usuaris = self.llegeix_valoracions()
+        self._ids_users = self.carrega_users(valoracions.comptes(len(ids_usuaris)), ids_usuaris)
         logging.debug("Funciona carrega d'usuaris")
 
-        #Crear array y llenarla
-        number_of_users = len(self._all_users) #n files
-        number_of_items = len(self._all_items) #m columnes
-        ratings = np.negative( np.ones([number_of_users,number_of_items], dtype=np.int8) )
-        with open(NOM_FITXER_RATING_BOOKS, 'r', encoding="utf-8") as csvfile:
-            dict_reader = csv.DictReader(csvfile, delimiter=',')
-            for row in dict_reader:
-                user_id = row["User-ID"]
-                isbn = row["ISBN"]
-
-                if user_id in self._pos_users.keys() and isbn in self._pos_items.keys(): #Hi haurà molts que no hi estàn
-                    ratings[self._pos_users[user_id], self._pos_items[isbn]] = np.int8(row["Book-Rating"]) 
+        #Crear la matriu dispersa a partir dels triplets guardats, descartant els usuaris no seleccionats
+        number_of_users = len(self._ids_users) #n files
+        number_of_items = len(self._ids_items) #m columnes
+        files, columnes, valors = valoracions.arrays(self._ids_users.rows_for(ids_usuaris))
+        ratings = MatriuRatings(files, columnes, valors, (number_of_users, number_of_items), dtype=np.int8) #Les valoracions 0 es guarden igualment com a valoració existent
         logging.debug("Funciona carrega de ratings")
 
         return ratings
 
+    def llegeix_valoracions(self) -> tuple:
+        """
+        Llegeix en una sola passada les valoracions dels llibres carregats.
+
+        Cada usuari rep un codi enter segons l'ordre d'aparició i les valoracions s'acumulen en trossos
+        d'arrays tipats (vegeu AcumuladorValoracions): uns pocs bytes per valoració dels llibres carregats,
+        en lloc d'objectes de Python.
 
-    def carrega_users(self) -> set:
+        Returns
+        -------
+        tuple
+            AcumuladorValoracions amb (codi d'usuari, columna, valor) en l'ordre del fitxer,
+            i la llista d'IDs d'usuari de cada codi.
+        """
+        codis = dict()
+        valoracions = AcumuladorValoracions(dtype=np.int8)
+        with open(NOM_FITXER_RATING_BOOKS, 'r', encoding="utf-8") as csvfile:
+            reader = csv.reader(csvfile, delimiter=',')
+            capcalera = next(reader)
+            i_user, i_isbn, i_rating = capcalera.index("User-ID"), capcalera.index("ISBN"), capcalera.index("Book-Rating")
+            for row in reader:
+                col = self._ids_items.get(row[i_isbn])
+                if col is not None: #Hi haurà molts que no hi estàn
+                    codi = codis.setdefault(row[i_user], len(codis))
+                    valoracions.afegeix(codi, col, int(row[i_rating]))
+        return valoracions, list(codis)
+
+
+    def carrega_users(self, comptes: np.ndarray, ids_usuaris: list) -> TaulaIds:
         """
-        Carrega els usuaris que han valorat llibres.
+        Carrega els usuaris amb més valoracions de llibres.
+
+        Parameters
+        ----------
+        comptes : np.ndarray
+            Nombre de valoracions de cada codi d'usuari (vegeu llegeix_valoracions).
+        ids_usuaris : list of str
+            ID d'usuari de cada codi.
 
         Returns
         -------
-        set
-            Conjunt d'identificadors d'usuaris seleccionats.
+        TaulaIds
+            Identificadors dels usuaris seleccionats en ordre de fila.
         
         Raises
         ------
         ImportError
             Si no es poden crear tots els objectes User esperats.
         """
-        temp_users = dict()
-        with open(NOM_FITXER_RATING_BOOKS, 'r', encoding="utf-8") as csvfile:   
-            bookreader = csv.DictReader(csvfile, delimiter=',')
-            for row in bookreader:
-                if row["ISBN"] in self._all_items:
-                    if row["User-ID"] in temp_users: # and int(row["Book-Rating"]) > 0: 
-                        temp_users[row["User-ID"]] += 1
-                    else:
-                        temp_users[row["User-ID"]] = 1
-
-        users = set([user_id for user_id, num_relevancia in sorted(temp_users.items(), key=lambda x: x[1], reverse=True)[:10000]])
+        users = set(ids_usuaris[codi] for codi in self.top_usuaris(comptes, self._max_users))
 
         with open(NOM_FITXER_BOOKS_USERS, 'r', encoding="utf-8") as csvfile:  
             dict_reader = csv.DictReader(csvfile)
-            pos = 0
             for row in dict_reader:
                 if row["User-ID"] in users:
-                    self._users[pos] = User(row["User-ID"],row["Location"],row["Age"])
-                    self._pos_users[row["User-ID"]] = pos
-                    pos += 1
+                    self._users.append(User(row["User-ID"],row["Location"],row["Age"]))
 
         if len(users) != len(self._users):
             raise ImportError
 
-        return users
+        return TaulaIds(user.get_id() for user in self._users)
     
 
-    def carrega_items(self) -> set:
+    def carrega_items(self) -> TaulaIds:
         """
-        Carrega els llibres del fitxer CSV.
+        Carrega els llibres del fitxer CSV (com a molt els max_items primers).
 
         Returns
         -------
-        set
-            Conjunt d'identificadors de llibres.
+        TaulaIds
+            Identificadors de llibres en ordre de columna.
         """
-        books = set()
+        books = []
 
         with open(NOM_FITXER_BOOKS, 'r', encoding="utf-8") as csvfile:   
                 bookreader = csv.DictReader(csvfile, delimiter=',') 
                 for i,row in enumerate(bookreader):
+                    if self._max_items is not None and i >= self._max_items:
+                        break
                     isbn = row["ISBN"]
                     titol = row["Book-Title"]
                     autor = row["Book-Author"]
                     year = row["Year-Of-Publication"]
                     publisher = row["Publisher"]
-                    self._items[i] = Book(isbn, titol, autor, year, publisher) 
-                    self._pos_items[isbn] = i
-
-                    books.add(row["ISBN"])
-
-                    if i==10000:
-                        break
+                    self._items.append(Book(isbn, titol, autor, year, publisher))
+                    books.append(isbn)
         
-        return books
+        return TaulaIds(books)
 
 
 
@@ -660,32 +1044,95 @@ class DatasetVideoGames(Dataset):
 
     Notes
     -----
-    Utilitza fitxers JSON compressats (.gz). Limita a 10.000 ítems per rendiment.
+    Utilitza fitxers JSON compressats (.gz). Per defecte limita a 10.000 ítems i usuaris per rendiment.
     """
 
-    def __init__(self):
+    def __init__(self, mmap: bool = False, workers: int = None, max_items: int = MAX_ITEMS_DEFECTE, max_users: int = MAX_USERS_DEFECTE):
         """
         Inicialitza el dataset de videojocs.
 
+        Parameters
+        ----------
+        mmap : bool, optional
+            Si és True, la matriu de valoracions es mapa a memòria des de la cache (default és False).
+        workers : int, optional
+            Processos per descodificar el JSON de les ressenyes; None fa servir tots els nuclis (default és None).
+        max_items : int, optional
+            Nombre màxim de videojocs (els primers del fitxer amb categories); None vol dir sense límit (default és 10.000).
+        max_users : int, optional
+            Nombre màxim d'usuaris (els que més valoren); None vol dir sense límit (default és 10.000).
+
         Raises
         ------
         RuntimeError
             Si hi ha un error en la inicialització del dataset pare.
         """
-        if super().__init__():
-            print("LOADED") 
+        self._workers = workers
+        self._max_items = max_items
+        self._max_users = max_users
+        if super().__init__(mmap):
+            logging.debug("Dataset carregat de la cache")
         else:
             logging.critical(f"Error crític: no s'ha carregat correctament el dataset VideoGames, no es pot continuar")
 
 
-    def carrega_ratings(self) -> np.ndarray:
+    def fitxers_font(self) -> tuple:
+        """
+        Retorna els fitxers font del dataset.
+
+        Returns
+        -------
+        tuple of str
+            Paths dels fitxers font.
+        """
+        return (NOM_FITXER_VIDEOGAMES_METADATA, NOM_FITXER_RATINGS_VIDEOGAMES)
+
+    def parametres_carrega(self) -> dict:
+        """
+        Retorna els límits amb què es carrega el dataset.
+
+        Returns
+        -------
+        dict
+            Nombre màxim de videojocs i d'usuaris.
+        """
+        return {"max_items": self._max_items, "max_users": self._max_users}
+
+    def fitxer_cache(self) -> str:
+        """
+        Retorna el path de la cache binària del dataset.
+
+        Returns
+        -------
+        str
+            Path del fitxer de cache.
+        """
+        return NOM_FITXER_CACHE_VIDEOGAMES
+
+    def crea_item(self, camps: list) -> VideoGame:
+        """
+        Torna a crear un videojoc a partir dels camps desats a la cache.
+
+        Parameters
+        ----------
+        camps : list
+            Arguments del constructor.
+
+        Returns
+        -------
+        VideoGame
+            Objecte del videojoc.
+        """
+        return VideoGame(*camps)
+
+    def carrega_ratings(self) -> MatriuRatings:
         """
         Carrega les valoracions dels usuaris als videojocs.
 
         Returns
         -------
-        np.ndarray
-            Matriu de valoracions (usuaris x videojocs).
+        MatriuRatings
+            Matriu dispersa de valoracions (usuaris x videojocs).
 
         Raises
         ------
@@ -700,98 +1147,107 @@ class DatasetVideoGames(Dataset):
             logging.critical(f"Error crític: no s'ha carregat correctament l'arxiu {NOM_FITXER_RATINGS_VIDEOGAMES}, no es pot continuar")
             raise FileNotFoundError(f"No es troba l'arxiu: {NOM_FITXER_RATINGS_VIDEOGAMES}")
         
-        #Recorrer para saber n i m 
-        #Carregar els primer 10.000 videogames i els 10.000 usuaris més adhients 
-        self._all_items = self.carrega_items() 
+        #Carregar els primers videogames i, amb una sola lectura del fitxer de ressenyes, els usuaris més adhients 
+        self._ids_items = self.carrega_items() 
         logging.debug("Funciona carrega d'items")
-        self._all_users = self.carrega_users()
+        valoracions, ids_usuaris, noms = self.llegeix_valoracions()
+        self._ids_users = self.carrega_users(valoracions.comptes(len(ids_usuaris)), ids_usuaris, noms)
         logging.debug("Funciona carrega d'usuaris")
 
-        #Crear array y llenarla
-        number_of_users = len(self._all_users) #n files
-        number_of_items = len(self._all_items) #m columnes
-        ratings = np.negative( np.ones([number_of_users,number_of_items], dtype=np.float16) )
-        for review in parse(NOM_FITXER_RATINGS_VIDEOGAMES): 
-            user_id = review.get('reviewerID')
-            asin = review.get('asin')
-
-            if user_id in self._pos_users.keys() and asin in self._pos_items.keys(): #Hi haurà molts que no hi estàn
-                    score = review.get('overall')
-                    try:
-                        score_float = float(score)
-                        ratings[self._pos_users[user_id], self._pos_items[asin]] = np.float16(score_float)
-                    except (TypeError, ValueError):
-                        # Si score es None, '', o no convertible, lo ignoras
-                        continue
+        #Crear la matriu dispersa a partir dels triplets guardats, descartant els usuaris no seleccionats i les puntuacions no vàlides
+        number_of_users = len(self._ids_users) #n files
+        number_of_items = len(self._ids_items) #m columnes
+        files, columnes, valors = valoracions.arrays(self._ids_users.rows_for(ids_usuaris))
+        valides = ~np.isnan(valors)
+        ratings = MatriuRatings(files[valides], columnes[valides], valors[valides], (number_of_users, number_of_items), dtype=np.float32)
         logging.debug("Funciona carrega de ratings")
-        valid_ratings = ratings[ratings != -1]
-        if len(valid_ratings) > 0:
-            self.set_pmax(np.max(valid_ratings))
-        else:
-            self.set_pmax(0)
+        self.set_pmax(ratings.max())
         logging.debug("Funciona setter de puntuació màxima")
 
         return ratings
-        
-            
+
+    def llegeix_valoracions(self) -> tuple:
+        """
+        Llegeix en una sola passada el fitxer de ressenyes.
+
+        La descompressió es fa en un sol fil i la descodificació JSON es reparteix entre processos (vegeu toolkit.parse_camps).
+        Les valoracions s'acumulen en trossos d'arrays tipats amb un codi enter per usuari (vegeu AcumuladorValoracions).
+
+        Returns
+        -------
+        tuple
+            AcumuladorValoracions amb (codi d'usuari, columna, puntuació amb NaN si no és vàlida) de les ressenyes
+            dels videojocs carregats en l'ordre del fitxer, la llista d'IDs d'usuari de cada codi i un diccionari
+            amb el nom de cada usuari segons la seva primera ressenya (en ordre d'aparició).
+        """
+        codis = dict()
+        valoracions = AcumuladorValoracions(dtype=np.float32)
+        noms = dict()
+        for user_id, asin, score, user_name in parse_camps(NOM_FITXER_RATINGS_VIDEOGAMES, ("reviewerID", "asin", "overall", "reviewerName"), self._workers):
+            if user_id not in noms:
+                noms[user_id] = user_name
+            col = self._ids_items.get(asin)
+            if col is not None: #Hi haurà molts que no hi estàn
+                try:
+                    score_float = float(score)
+                except (TypeError, ValueError):
+                    # Si score es None, '', o no convertible, compta per triar usuaris però no es guarda
+                    score_float = np.nan
+                valoracions.afegeix(codis.setdefault(user_id, len(codis)), col, score_float)
+        return valoracions, list(codis), noms
     
-    def carrega_users(self) -> set:
+    def carrega_users(self, comptes: np.ndarray, ids_usuaris: list, noms: dict) -> TaulaIds:
         """
-        Carrega els usuaris que han valorat videojocs.
+        Carrega els usuaris amb més valoracions de videojocs.
+
+        Parameters
+        ----------
+        comptes : np.ndarray
+            Nombre de valoracions de cada codi d'usuari (vegeu llegeix_valoracions).
+        ids_usuaris : list of str
+            ID d'usuari de cada codi.
+        noms : dict
+            Nom de cada usuari, en ordre de primera aparició al fitxer.
 
         Returns
         -------
-        set
-            Conjunt d'identificadors d'usuaris seleccionats.
+        TaulaIds
+            Identificadors dels usuaris seleccionats en ordre de fila.
 
         Raises
         ------
         ImportError
             Si no es poden crear tots els objectes User esperats.
         """
-        temp_users = dict()
-        for obj in parse(NOM_FITXER_RATINGS_VIDEOGAMES):
-            item_id = obj.get('asin')
-            if item_id in self._all_items:
-                user_id = obj.get('reviewerID')
-                if user_id in temp_users: 
-                    temp_users[user_id] += 1
-                else:
-                    temp_users[user_id] = 1
-        
-        users = set([user_id for user_id, num_relevancia in sorted(temp_users.items(), key=lambda x: x[1], reverse=True)[:10000]])
+        users = set(ids_usuaris[codi] for codi in self.top_usuaris(comptes, self._max_users))
 
-        pos = 0
-        for obj in parse(NOM_FITXER_RATINGS_VIDEOGAMES):
-            user_id = obj.get('reviewerID')
-            if user_id in users and not user_id in self._pos_users.keys():
-                user_name = obj.get('reviewerName')
-                self._users[pos] = User(user_id,name=user_name)
-                self._pos_users[user_id] = pos
-                pos += 1
+        for user_id, user_name in noms.items():
+            if user_id in users:
+                self._users.append(User(user_id,name=user_name))
 
         if len(users) != len(self._users):
             raise ImportError
-        return users
+        return TaulaIds(user.get_id() for user in self._users)
        
 
-    def carrega_items(self) -> set:
+    def carrega_items(self) -> TaulaIds:
         """
         Carrega els videojocs del fitxer de metadades.
 
         Returns
         -------
-        set
-            Conjunt d'identificadors de videojocs.
+        TaulaIds
+            Identificadors de videojocs en ordre de columna.
         """
-        video_games = set()
+        video_games = []
+        creats = set()
         i=0
         for obj in parse(NOM_FITXER_VIDEOGAMES_METADATA):
             categories = obj.get('categories') or obj.get('category') or obj.get('genres')
             if categories:
                 try:
                     item_id = obj.get('asin')
-                    if item_id in self._pos_items:
+                    if item_id in creats:
                         raise ValueError("Objeto ya creado")
                     titol = obj.get('title')
                     brand = obj.get('brand')
@@ -805,17 +1261,17 @@ class DatasetVideoGames(Dataset):
                         description = str(description)
                     if not item_id or not titol:
                         raise ValueError(f"Missing required field(s) for VideoGame {item_id}")
-                    self._items[i] = VideoGame(item_id, titol, categories, price, brand, description)
-                    self._pos_items[item_id] = i
+                    self._items.append(VideoGame(item_id, titol, categories, price, brand, description))
                 except Exception:
                     continue
 
-                video_games.add(item_id)
+                video_games.append(item_id)
+                creats.add(item_id)
                 i += 1
-                if i==10000:  #Comentar si es vol complet peró sinó és molt lent
+                if i == self._max_items:  #None vol dir complet, peró és molt lent
                     break
 
-        return video_games
+        return TaulaIds(video_games)
     
     def get_genres(self):
         """
@@ -827,6 +1283,6 @@ class DatasetVideoGames(Dataset):
             Llista amb els gèneres de cada videojoc.
         """
         llista_generes = []
-        for item in self._items.values(): 
+        for item in self.itera_items():
             llista_generes.append(item.get_genres())
         return llista_generes
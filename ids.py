@@ -0,0 +1,162 @@
+import numpy as np
+
+
+class TaulaIds:
+    """
+    Taula bidireccional entre identificadors (usuaris o ítems) i posicions (files o columnes).
+
+    Els identificadors es guarden una sola vegada: un array contigu en ordre de posició (posició -> id)
+    i un únic diccionari (id -> posició) que comparteix els mateixos objectes str.
+
+    Parameters
+    ----------
+    ids : iterable of str
+        Identificadors en ordre de posició.
+
+    Attributes
+    ----------
+    _ids : np.ndarray
+        Identificador de cada posició.
+    _index : dict[str, int]
+        Posició de cada identificador.
+
+    Raises
+    ------
+    ValueError
+        Si hi ha identificadors repetits.
+    """
+
+    def __init__(self, ids=()):
+        self._index = {}
+        for num, i in enumerate(ids):
+            if self._index.setdefault(i, num) != num:
+                raise ValueError(f"Identificador repetit: {i}")
+        self._ids = np.empty(len(self._index), dtype=object)
+        self._ids[:] = list(self._index)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, id) -> bool:
+        return id in self._index
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def row(self, id: str) -> int:
+        """
+        Retorna la posició d'un identificador.
+
+        Parameters
+        ----------
+        id : str
+            Identificador.
+
+        Returns
+        -------
+        int
+            Posició.
+
+        Raises
+        ------
+        KeyError
+            Si l'identificador no hi és.
+        """
+        return self._index[id]
+
+    def get(self, id: str, defecte=None):
+        """
+        Retorna la posició d'un identificador, o defecte si no hi és (com dict.get).
+
+        Parameters
+        ----------
+        id : str
+            Identificador.
+        defecte : optional
+            Valor si l'identificador no hi és (default és None).
+
+        Returns
+        -------
+        int or object
+            Posició o defecte.
+        """
+        return self._index.get(id, defecte)
+
+    def id(self, row: int) -> str:
+        """
+        Retorna l'identificador d'una posició.
+
+        Parameters
+        ----------
+        row : int
+            Posició.
+
+        Returns
+        -------
+        str
+            Identificador.
+
+        Raises
+        ------
+        KeyError
+            Si la posició no existeix.
+        """
+        if 0 <= row < len(self._ids):
+            return self._ids[row]
+        raise KeyError(row)
+
+    def rows_for(self, ids) -> np.ndarray:
+        """
+        Tradueix molts identificadors a posicions d'un sol cop.
+
+        Parameters
+        ----------
+        ids : iterable of str
+            Identificadors.
+
+        Returns
+        -------
+        np.ndarray
+            Posició (int64) de cada identificador, o -1 si no hi és.
+        """
+        index = self._index
+        return np.fromiter((index.get(i, -1) for i in ids), dtype=np.int64)
+
+    def ids_for(self, rows) -> np.ndarray:
+        """
+        Tradueix moltes posicions a identificadors d'un sol cop.
+
+        Parameters
+        ----------
+        rows : array_like of int
+            Posicions.
+
+        Returns
+        -------
+        np.ndarray
+            Identificador de cada posició.
+
+        Raises
+        ------
+        IndexError
+            Si alguna posició no existeix.
+        """
+        return self._ids[np.asarray(rows, dtype=np.int64)]
+
+    def ids(self) -> np.ndarray:
+        """
+        Retorna tots els identificadors en ordre de posició.
+
+        Returns
+        -------
+        np.ndarray
+            Identificadors (no s'ha de modificar).
+        """
+        return self._ids
+
+    def __getstate__(self):
+        # L'índex es reconstrueix en carregar, així el pickle només conté els ids
+        return {"_ids": self._ids.tolist()}
+
+    def __setstate__(self, estat):
+        self.__init__(estat["_ids"])
@@ -1,9 +1,11 @@
 # Projecte Programació Avançada 
 # Repositori públic: https://github.com/HectorBerger/Projecte_Programacion_Avanzada
 
-import argparse, os.path, pickle, logging, datetime
-from recomenador import Simple, Colaboratiu, BasatEnContinguts 
-from dataset import DatasetMovies, DatasetBooks, DatasetVideoGames
+import argparse, logging, datetime, json, sys, time
+from contextlib import nullcontext
+from recomenador import Recomenador, Simple, Colaboratiu, ColaboratiuItems, Factoritzacio, BasatEnContinguts 
+from snapshot import es_snapshot, COMPRESSIONS
+from dataset import DatasetMovies, DatasetBooks, DatasetVideoGames, MAX_ITEMS_DEFECTE, MAX_USERS_DEFECTE
 
 """
 Script principal per executar el sistema de recomanació.
@@ -12,9 +14,192 @@ Aquest script permet seleccionar el dataset i l'algorisme de recomanació, carre
 
 Usage
 -----
-python main.py {MovieLens100k, Books, VideoGames} {Simple, Col·laboratiu, Contingut}
+python main.py {MovieLens100k, Books, VideoGames} {Simple, Col·laboratiu, Col·laboratiu-ítems, Factorització, Contingut}
+python main.py <dataset> <method> (--all-users | --users-file FITXER) [--k K] [--min-vots M] [--top-n N] [--output recs.jsonl]
 """
 
+DATASETS = ["MovieLens100k", "Books", "VideoGames"]
+METODES = ["Simple", "Col·laboratiu", "Col·laboratiu-ítems", "Factorització", "Contingut"]
+
+
+def limit(valor: str):
+    """
+    Converteix un límit de la línia de comandes en enter (0 vol dir sense límit).
+
+    Parameters
+    ----------
+    valor : str
+        Valor de l'argument.
+
+    Returns
+    -------
+    int or None
+        Límit, o None si és 0.
+
+    Raises
+    ------
+    argparse.ArgumentTypeError
+        Si el valor no és un enter no negatiu.
+    """
+    try:
+        n = int(valor)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Límit no vàlid: {valor}")
+    if n < 0:
+        raise argparse.ArgumentTypeError(f"Límit no vàlid: {valor}")
+    return n or None
+
+
+def nom_snapshot(dataset: str, method: str, max_items: int = MAX_ITEMS_DEFECTE, max_users: int = MAX_USERS_DEFECTE) -> str:
+    """
+    Retorna el directori del snapshot d'un recomanador; els límits no per defecte formen part del nom.
+
+    Parameters
+    ----------
+    dataset : str
+        Nom del dataset.
+    method : str
+        Nom de l'algorisme.
+    max_items : int, optional
+        Nombre màxim d'ítems (None sense límit).
+    max_users : int, optional
+        Nombre màxim d'usuaris (None sense límit).
+
+    Returns
+    -------
+    str
+        Directori del snapshot.
+    """
+    nom = f"recommender_{dataset}_{method}"
+    if dataset != "MovieLens100k" and (max_items, max_users) != (MAX_ITEMS_DEFECTE, MAX_USERS_DEFECTE):
+        nom += f"_{max_items or 'tots'}x{max_users or 'tots'}"
+    return nom
+
+
+def carrega_recomanador(dataset: str, method: str, directori: str, mmap: bool = False,
+                        max_items: int = MAX_ITEMS_DEFECTE, max_users: int = MAX_USERS_DEFECTE):
+    """
+    Recupera el recomanador del snapshot o, si no existeix, carrega el dataset i el crea.
+
+    Parameters
+    ----------
+    dataset : str
+        Nom del dataset ('MovieLens100k', 'Books' o 'VideoGames').
+    method : str
+        Nom de l'algorisme ('Simple', 'Col·laboratiu', 'Col·laboratiu-ítems', 'Factorització' o 'Contingut').
+    directori : str
+        Directori del snapshot del recomanador (vegeu Recomenador.desa).
+    mmap : bool, optional
+        Si és True, la matriu de valoracions es mapa a memòria des de la cache del dataset (default és False).
+        La matriu d'un snapshot sempre es mapa, perquè obrir-lo no depengui de la seva mida.
+    max_items : int, optional
+        Nombre màxim d'ítems de Books i VideoGames; None vol dir sense límit (default és 10.000).
+    max_users : int, optional
+        Nombre màxim d'usuaris de Books i VideoGames; None vol dir sense límit (default és 10.000).
+
+    Returns
+    -------
+    Recomenador
+        Recomanador preparat per fer recomanacions.
+    """
+    if not es_snapshot(directori):
+        match dataset:
+            case "MovieLens100k":
+                d = DatasetMovies(mmap)
+            case "Books":
+                d = DatasetBooks(mmap, max_items=max_items, max_users=max_users)
+            case "VideoGames":
+                d = DatasetVideoGames(mmap, max_items=max_items, max_users=max_users) 
+        logging.info(f"Dataset {dataset} cargado desde zero")
+
+        match method:
+            case "Simple":
+                r = Simple(d) 
+            case "Col·laboratiu":
+                r = Colaboratiu(d)
+            case "Col·laboratiu-ítems":
+                r = ColaboratiuItems(d)
+                r.prepara_model(workers=None) # Les similituds entre ítems es calculen un sol cop i es desen amb el snapshot
+            case "Factorització":
+                r = Factoritzacio(d) # Els factors s'entrenen a main, un cop fixats el rang i les iteracions
+            case "Contingut":
+                r = BasatEnContinguts(d)
+        #càlculs generals
+        logging.info(f"Clase Recomendador {method} creada correctamente")
+
+    else:
+        r = Recomenador.carrega(directori, mmap=True)
+        logging.info(f"Snapshot cargado correctamente con Clase Recomendador {method} junto al dataset {dataset}")
+
+    return r
+
+
+def llegeix_usuaris(path: str) -> list:
+    """
+    Llegeix els identificadors d'usuari d'un fitxer de text, un per línia (les línies buides s'ignoren).
+
+    Parameters
+    ----------
+    path : str
+        Fitxer amb els identificadors ('-' per l'entrada estàndard).
+
+    Returns
+    -------
+    list of str
+        Identificadors en l'ordre del fitxer.
+    """
+    with (open(path, "r", encoding="utf-8") if path != "-" else nullcontext(sys.stdin)) as fitxer:  # sys.stdin no es tanca
+        return [linia.strip() for linia in fitxer if linia.strip()]
+
+
+def recomana_batch(r: Recomenador, user_ids: list, top_n: int = 5, sortida: str = "-") -> int:
+    """
+    Genera les recomanacions de molts usuaris sense demanar res per consola i les escriu en JSON lines.
+
+    Cada línia és {"user_id": ..., "recomanacions": [{"item_id": ..., "score": ...}, ...]}; les línies
+    s'escriuen a mesura que es calcula cada bloc d'usuaris. En acabar es mostra el temps total i el
+    rendiment en usuaris per segon (per la sortida d'errors, perquè no es barregi amb els resultats).
+
+    Parameters
+    ----------
+    r : Recomenador
+        Recomanador amb els paràmetres ja fixats.
+    user_ids : list of str
+        Usuaris a recomanar; els que no existeixen s'ometen.
+    top_n : int, optional
+        Recomanacions per usuari (default és 5).
+    sortida : str, optional
+        Fitxer de sortida, o '-' per la sortida estàndard (default és '-').
+
+    Returns
+    -------
+    int
+        Nombre d'usuaris escrits.
+
+    Raises
+    ------
+    ValueError
+        Si l'algoritme no es pot aplicar al dataset.
+    """
+    inici = time.perf_counter()
+    escrits = 0
+    with (open(sortida, "w", encoding="utf-8") if sortida != "-" else nullcontext(sys.stdout)) as fitxer:  # sys.stdout no es tanca
+        for bloc in r.recomanacions_per_blocs(user_ids, top_n):
+            if bloc is None:
+                raise ValueError("L'algoritme no es pot aplicar a aquest dataset.")
+            for user_id, recomanacions in bloc.items():
+                linia = {"user_id": user_id,
+                         "recomanacions": [{"item_id": item_id, "score": round(float(score), 4)} for item_id, score in recomanacions]}
+                fitxer.write(json.dumps(linia, ensure_ascii=False) + "\n")
+            fitxer.flush()
+            escrits += len(bloc)
+    temps = time.perf_counter() - inici
+
+    resum = f"{escrits} usuaris en {temps:.2f}s ({escrits / temps if temps > 0 else 0:.1f} usuaris/s)"
+    logging.info(f"Recomanació batch finalitzada: {resum}")
+    print(resum, file=sys.stderr)
+    return escrits
+
 
 def main():
     """
@@ -51,41 +236,56 @@ def main():
     logging.info(f"Execució inicialitzada")
 
     parser = argparse.ArgumentParser(description="Aplicar un algorisme de recomanació a un dataset per diferents usuaris a escollir.") #Hemos usado argparse para poder mostrar el help más fácilmente
-    parser.add_argument("dataset", choices=["MovieLens100k", "Books", "VideoGames"], help="Especifiqueu el conjunt de dades a utilitzar: 'MovieLens100k' per a pel·lícules, 'Books' per a recomanacions de llibres, o 'VideoGames' per a recomanacions de Videojocs que són productes a Amazon.") 
-    parser.add_argument("method", choices=["Simple", "Col·laboratiu", "Contingut"], help="Especifiqueu el algoritme de recomanació a utilitzar: 'Simple', 'Col·laboratiu' o 'BasatEnContingut'.")
+    parser.add_argument("dataset", choices=DATASETS, help="Especifiqueu el conjunt de dades a utilitzar: 'MovieLens100k' per a pel·lícules, 'Books' per a recomanacions de llibres, o 'VideoGames' per a recomanacions de Videojocs que són productes a Amazon.") 
+    parser.add_argument("method", choices=METODES, help="Especifiqueu el algoritme de recomanació a utilitzar: 'Simple', 'Col·laboratiu' (usuari-usuari), 'Col·laboratiu-ítems' (ítem-ítem), 'Factorització' (ALS) o 'BasatEnContingut'.")
+    parser.add_argument("--mmap", action="store_true", help="Mapar la matriu de valoracions a memòria des de la cache del dataset (compartida entre processos).")
+    parser.add_argument("--max-items", type=limit, default=MAX_ITEMS_DEFECTE, help="Nombre màxim d'ítems de Books i VideoGames (0 = sense límit).")
+    parser.add_argument("--max-usuaris", type=limit, default=MAX_USERS_DEFECTE, help="Nombre màxim d'usuaris de Books i VideoGames (0 = sense límit).")
+    parser.add_argument("--index-veins", type=int, default=None, metavar="K", help="Precalcular els K veïns més similars de cada usuari (Col·laboratiu); es desa amb el snapshot.")
+    parser.add_argument("--ann", type=int, default=None, metavar="N", help="Cerca aproximada de veïns (Col·laboratiu): només es comparen els usuaris de N usuaris com a molt per ítem valorat.")
+    parser.add_argument("--rang", type=int, default=None, help="Dimensió dels factors (Factorització); si canvia es torna a entrenar.")
+    parser.add_argument("--iteracions", type=int, default=None, help="Iteracions d'ALS (Factorització); si canvien es torna a entrenar.")
+    parser.add_argument("--compressio", choices=[c for c in COMPRESSIONS if c], default=None, help="Comprimir les seccions de metadades i model del snapshot en desar-lo.")
+    batch = parser.add_argument_group("mode batch", "Recomanar sense cap pregunta per consola i escriure els resultats en JSON lines.")
+    usuaris = batch.add_mutually_exclusive_group()
+    usuaris.add_argument("--all-users", action="store_true", help="Recomanar a tots els usuaris del dataset.")
+    usuaris.add_argument("--users-file", default=None, metavar="FITXER", help="Fitxer amb un ID d'usuari per línia ('-' per l'entrada estàndard).")
+    batch.add_argument("--k", type=int, default=None, help="Nombre de veïns (Col·laboratiu); per defecte 10.")
+    batch.add_argument("--min-vots", "--min-votes", type=int, default=None, help="Vots mínims (Simple); per defecte 10.")
+    batch.add_argument("--top-n", type=int, default=5, help="Recomanacions per usuari.")
+    batch.add_argument("--output", default="-", metavar="FITXER", help="Fitxer JSON lines de sortida ('-' per la sortida estàndard).")
 
     args = parser.parse_args()
     dataset = args.dataset
     method = args.method
-    filename = f"recommender_{dataset}_{method}.dat"
+    directori = nom_snapshot(dataset, method, args.max_items, args.max_usuaris)
 
     logging.info("Argumentos analizados. Inicio del proceso de carga de datos")
-    if not os.path.isfile(filename):
-        match dataset:
-            case "MovieLens100k":
-                d = DatasetMovies()
-            case "Books":
-                d = DatasetBooks()
-            case "VideoGames":
-                d = DatasetVideoGames() 
-        logging.info(f"Dataset {dataset} cargado desde zero")
-
-        match method:
-            case "Simple":
-                r = Simple(d) 
-            case "Col·laboratiu":
-                r = Colaboratiu(d)
-            case "Contingut":
-                r = BasatEnContinguts(d)
-        #càlculs generals
-        logging.info(f"Clase Recomendador {method} creada correctamente")
-
-    else:
-        # Per recuperar del fitxer la còpia de l’objecte
-        with open(filename, 'rb') as fitxer:
-            r = pickle.load(fitxer)
-        logging.info(f"Pickle cargado correctamente con Clase Recomendador {method} junto al dataset {dataset}")
+    r = carrega_recomanador(dataset, method, directori, args.mmap, args.max_items, args.max_usuaris)
+    if args.index_veins and isinstance(r, Colaboratiu):
+        r.construeix_index(args.index_veins)
+    if args.ann and isinstance(r, Colaboratiu):
+        r.construeix_ann(args.ann)
+    if isinstance(r, Factoritzacio):
+        r.configura(args.rang, args.iteracions)
+        r.get_factors()
 
+    if args.all_users or args.users_file:
+        if not es_snapshot(directori):
+            r.desa(directori, args.compressio)  # La propera execució ja no haurà de carregar el dataset
+        # Els paràmetres de la línia de comandes només valen per aquesta execució: no es desen al snapshot
+        overrides = {"_k": args.k, "_min_vots": args.min_vots}
+        parametres = tuple(valor if overrides.get(nom) is None else overrides[nom]
+                           for nom, valor in zip(r._NOMS_PARAMETRES, r.parametres(interactiu=False)))
+        user_ids = list(r._dataset.get_users()) if args.all_users else llegeix_usuaris(args.users_file)
+        try:
+            with r.parametres_fixats(parametres):
+                recomana_batch(r, user_ids, args.top_n, args.output)
+        except ValueError as e:
+            logging.error(str(e))
+            sys.exit(str(e))
+        logging.info(f"Execució finalitzada\n\n")
+        return
 
     loop = True
     while loop:
@@ -115,11 +315,10 @@ def main():
                 logging.info(f"Evaluació finalitzada")
             case "S":
                 print("Sortint...\n")
-                # Per guardar en un fitxer binari una còpia exacta de l’objecte
-                if not os.path.isfile(filename):
-                    with open(filename, 'wb') as fitxer:
-                        pickle.dump(r, fitxer)
-                    logging.info(f"Pickle guardat correctament amb recomenadaro {method} juntament amb el dataset {dataset}")
+                logging.info(f"Cache de resultats: {r.estadistiques_cache()}")
+                # Es desa sempre, així el snapshot inclou el model calculat durant la sessió (la cache de resultats no es desa)
+                r.desa(directori, args.compressio)
+                logging.info(f"Snapshot guardat correctament amb recomenadaro {method} juntament amb el dataset {dataset}")
 
                 loop = False
 
@@ -0,0 +1,546 @@
+import numpy as np
+import scipy.sparse as sp
+import os
+
+
+class MatriuRatings:
+    """
+    Emmagatzematge dispers (CSR) de la matriu de valoracions usuaris x ítems.
+
+    Només es guarden les valoracions existents, de manera que la memòria creix amb el nombre
+    de valoracions i no amb usuaris x ítems. Una valoració és present si la posició forma part
+    de l'estructura de la matriu, encara que el seu valor sigui 0 (per exemple als llibres).
+
+    Parameters
+    ----------
+    files : array_like
+        Fila (usuari) de cada valoració.
+    columnes : array_like
+        Columna (ítem) de cada valoració.
+    valors : array_like
+        Valor de cada valoració.
+    shape : tuple
+        Mida (usuaris, ítems) de la matriu.
+    dtype : np.dtype, optional
+        Tipus dels valors guardats (default és np.float32).
+
+    Attributes
+    ----------
+    _csr : scipy.sparse.csr_matrix
+        Valoracions per files (accés per usuari).
+    _csc : scipy.sparse.csc_matrix or None
+        Vista per columnes (accés per ítem), creada quan es necessita.
+    _estructura : scipy.sparse.csr_matrix or None
+        Matriu binària amb 1 a les posicions valorades, creada quan es necessita.
+    _quadrats : scipy.sparse.csr_matrix or None
+        Valoracions al quadrat amb la mateixa estructura, creada quan es necessita.
+    _centrada : scipy.sparse.csr_matrix or None
+        Valoracions menys la mitjana de l'usuari, creada quan es necessita.
+    _directori : str or None
+        Directori dels fitxers .npy si la matriu està mapada a memòria (np.memmap), o None.
+    """
+
+    def __init__(self, files, columnes, valors, shape: tuple, dtype=np.float32):
+        files = np.asarray(files, dtype=np.int32)
+        columnes = np.asarray(columnes, dtype=np.int32)
+        valors = np.asarray(valors, dtype=dtype)
+
+        self._csr = sp.csr_matrix((valors, (files, columnes)), shape=shape, dtype=dtype)
+
+        # scipy suma les valoracions repetides: només si n'hi ha (poc habitual) ens quedem amb l'última,
+        # com feia la matriu densa, sense ordenar claus de totes les valoracions en el cas normal
+        if self._csr.nnz < len(files):
+            claus = files.astype(np.int64) * shape[1] + columnes
+            _, ultims = np.unique(claus[::-1], return_index=True)
+            ultims = len(claus) - 1 - ultims
+            self._csr = sp.csr_matrix((valors[ultims], (files[ultims], columnes[ultims])), shape=shape, dtype=dtype)
+        self._csr.sort_indices()
+        self._csc = None
+        self._estructura = None
+        self._quadrats = None
+        self._centrada = None
+        self._directori = None
+
+    @classmethod
+    def des_de_csr(cls, data, indices, indptr, shape: tuple):
+        """
+        Crea la matriu directament a partir dels arrays CSR (sense reordenar ni copiar).
+
+        Parameters
+        ----------
+        data : np.ndarray
+            Valors de les valoracions.
+        indices : np.ndarray
+            Columna de cada valoració.
+        indptr : np.ndarray
+            Inici de cada fila dins de data i indices.
+        shape : tuple
+            Mida (usuaris, ítems) de la matriu.
+
+        Returns
+        -------
+        MatriuRatings
+            Matriu de valoracions.
+        """
+        matriu = cls.__new__(cls)
+        matriu._csr = sp.csr_matrix((data, indices, indptr), shape=tuple(shape), copy=False)
+        matriu._csr.has_sorted_indices = True
+        matriu._csc = None
+        matriu._estructura = None
+        matriu._quadrats = None
+        matriu._centrada = None
+        matriu._directori = None
+        return matriu
+
+    def desa(self, directori: str):
+        """
+        Desa els arrays CSR i CSC de la matriu com a fitxers .npy dins d'un directori.
+
+        Els fitxers es poden tornar a obrir amb carrega(), també mapats a memòria. Cada array s'escriu a
+        un fitxer temporal i es reanomena sobre l'anterior: els processos que ja tenen mapats els fitxers
+        antics continuen llegint-ne el contingut (el reanomenament no toca l'inode que tenen obert).
+
+        Parameters
+        ----------
+        directori : str
+            Directori on es desen els fitxers (es crea si no existeix).
+        """
+        os.makedirs(directori, exist_ok=True)
+        csc = self.csc()
+        arrays = {"shape": np.array(self.shape, dtype=np.int64),
+                  "csr_data": self._csr.data, "csr_indices": self._csr.indices, "csr_indptr": self._csr.indptr,
+                  "csc_data": csc.data, "csc_indices": csc.indices, "csc_indptr": csc.indptr}
+        for nom, array in arrays.items():
+            path = os.path.join(directori, nom + ".npy")
+            with open(path + ".tmp", "wb") as fitxer:
+                np.save(fitxer, array)
+            os.replace(path + ".tmp", path)
+
+    @classmethod
+    def carrega(cls, directori: str, mmap: bool = False):
+        """
+        Carrega una matriu desada amb desa().
+
+        Amb mmap=True els arrays es mapen a memòria només de lectura (np.memmap): l'obertura no
+        depèn de la mida del dataset i tots els processos que obren el mateix directori comparteixen
+        les mateixes pàgines. En fer pickle només es guarda el directori.
+
+        Parameters
+        ----------
+        directori : str
+            Directori amb els fitxers .npy.
+        mmap : bool, optional
+            Si és True, mapa els arrays a memòria en lloc de llegir-los (default és False).
+
+        Returns
+        -------
+        MatriuRatings
+            Matriu de valoracions.
+        """
+        mode = "r" if mmap else None
+        llegeix = lambda nom: np.load(os.path.join(directori, nom + ".npy"), mmap_mode=mode)
+        shape = tuple(int(x) for x in llegeix("shape"))
+
+        matriu = cls.des_de_csr(llegeix("csr_data"), llegeix("csr_indices"), llegeix("csr_indptr"), shape)
+        matriu._csc = sp.csc_matrix((llegeix("csc_data"), llegeix("csc_indices"), llegeix("csc_indptr")), shape=shape, copy=False)
+        matriu._csc.has_sorted_indices = True
+        if mmap:
+            matriu._directori = directori
+        return matriu
+
+    def es_mapada(self) -> bool:
+        """
+        Indica si la matriu està mapada a memòria des de fitxers.
+
+        Returns
+        -------
+        bool
+            True si els arrays són np.memmap compartibles entre processos.
+        """
+        return self._directori is not None
+
+    @property
+    def shape(self) -> tuple:
+        """
+        Retorna la mida (usuaris, ítems) de la matriu.
+
+        Returns
+        -------
+        tuple
+            Nombre de files i de columnes.
+        """
+        return self._csr.shape
+
+    @property
+    def nnz(self) -> int:
+        """
+        Retorna el nombre de valoracions guardades.
+
+        Returns
+        -------
+        int
+            Nombre de valoracions.
+        """
+        return self._csr.nnz
+
+    def __len__(self) -> int:
+        """
+        Retorna el nombre de files (usuaris) de la matriu.
+
+        Returns
+        -------
+        int
+            Nombre d'usuaris.
+        """
+        return self._csr.shape[0]
+
+    def csr(self) -> sp.csr_matrix:
+        """
+        Retorna la matriu en format CSR (accés per files).
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix
+            Valoracions per usuari.
+        """
+        return self._csr
+
+    def csc(self) -> sp.csc_matrix:
+        """
+        Retorna la vista CSC de la matriu (accés per columnes).
+
+        Returns
+        -------
+        scipy.sparse.csc_matrix
+            Valoracions per ítem.
+        """
+        if self._csc is None:
+            self._csc = self._csr.tocsc()
+            self._csc.sort_indices()
+        return self._csc
+
+    def estructura(self) -> sp.csr_matrix:
+        """
+        Retorna una matriu binària (float64) amb 1 a cada posició valorada.
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix
+            Màscara de valoracions existents.
+        """
+        if self._estructura is None:
+            csr = self._csr
+            self._estructura = sp.csr_matrix((np.ones(csr.nnz), csr.indices, csr.indptr), shape=csr.shape)
+        return self._estructura
+
+    def quadrats(self) -> sp.csr_matrix:
+        """
+        Retorna una matriu (float64) amb el quadrat de cada valoració i la mateixa estructura.
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix
+            Valoracions al quadrat.
+        """
+        if self._quadrats is None:
+            csr = self._csr
+            self._quadrats = sp.csr_matrix((np.square(csr.data, dtype=np.float64), csr.indices, csr.indptr), shape=csr.shape)
+        return self._quadrats
+
+    def mitjanes_usuaris(self) -> np.ndarray:
+        """
+        Retorna la mitjana de les valoracions de cada usuari.
+
+        Returns
+        -------
+        np.ndarray
+            Vector amb una posició per fila (0 pels usuaris sense valoracions).
+        """
+        csr = self._csr
+        num_vots = np.diff(csr.indptr)
+        files = np.repeat(np.arange(csr.shape[0]), num_vots)
+        sumes = np.bincount(files, weights=csr.data.astype(np.float64), minlength=csr.shape[0])
+        return np.divide(sumes, num_vots, out=np.zeros(csr.shape[0]), where=num_vots > 0)
+
+    def centrada(self) -> sp.csr_matrix:
+        """
+        Retorna una matriu (float64) amb cada valoració menys la mitjana del seu usuari.
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix
+            Valoracions centrades amb la mateixa estructura.
+        """
+        if self._centrada is None:
+            csr = self._csr
+            files = np.repeat(np.arange(csr.shape[0]), np.diff(csr.indptr))
+            dades = csr.data.astype(np.float64) - self.mitjanes_usuaris()[files]
+            self._centrada = sp.csr_matrix((dades, csr.indices, csr.indptr), shape=csr.shape)
+        return self._centrada
+
+    def valors(self) -> np.ndarray:
+        """
+        Retorna totes les valoracions existents.
+
+        Returns
+        -------
+        np.ndarray
+            Vector amb els valors de totes les valoracions.
+        """
+        return self._csr.data
+
+    def fila_sparse(self, fila: int):
+        """
+        Retorna les columnes valorades i els valors d'una fila.
+
+        Parameters
+        ----------
+        fila : int
+            Índex de l'usuari.
+
+        Returns
+        -------
+        tuple of np.ndarray
+            (columnes, valors) de les valoracions de l'usuari.
+        """
+        inici, fi = self._csr.indptr[fila], self._csr.indptr[fila + 1]
+        return self._csr.indices[inici:fi], self._csr.data[inici:fi]
+
+    def columna_sparse(self, col: int):
+        """
+        Retorna les files que han valorat un ítem i els seus valors.
+
+        Parameters
+        ----------
+        col : int
+            Índex de l'ítem.
+
+        Returns
+        -------
+        tuple of np.ndarray
+            (files, valors) de les valoracions de l'ítem.
+        """
+        csc = self.csc()
+        inici, fi = csc.indptr[col], csc.indptr[col + 1]
+        return csc.indices[inici:fi], csc.data[inici:fi]
+
+    def fila(self, fila: int) -> np.ndarray:
+        """
+        Retorna la fila densa d'un usuari, amb -1 on no hi ha valoració.
+
+        Parameters
+        ----------
+        fila : int
+            Índex de l'usuari.
+
+        Returns
+        -------
+        np.ndarray
+            Vector de mida igual al nombre d'ítems.
+        """
+        columnes, valors = self.fila_sparse(fila)
+        densa = np.full(self._csr.shape[1], -1, dtype=np.float64)
+        densa[columnes] = valors
+        return densa
+
+    def files(self, files) -> np.ndarray:
+        """
+        Retorna un bloc dens de files, amb -1 on no hi ha valoració.
+
+        Parameters
+        ----------
+        files : array_like
+            Índexs dels usuaris.
+
+        Returns
+        -------
+        np.ndarray
+            Matriu de mida (len(files), ítems).
+        """
+        bloc = self._csr[np.asarray(files, dtype=np.int64)]
+        densa = np.full(bloc.shape, -1, dtype=np.float64)
+        files_bloc = np.repeat(np.arange(bloc.shape[0]), np.diff(bloc.indptr))
+        densa[files_bloc, bloc.indices] = bloc.data
+        return densa
+
+    def num_vots_usuaris(self) -> np.ndarray:
+        """
+        Retorna el nombre de valoracions de cada usuari.
+
+        Returns
+        -------
+        np.ndarray
+            Vector amb una posició per fila.
+        """
+        return np.diff(self._csr.indptr)
+
+    def num_vots_items(self) -> np.ndarray:
+        """
+        Retorna el nombre de valoracions de cada ítem.
+
+        Returns
+        -------
+        np.ndarray
+            Vector amb una posició per columna.
+        """
+        return np.diff(self.csc().indptr)
+
+    def max(self):
+        """
+        Retorna la valoració màxima existent.
+
+        Returns
+        -------
+        float
+            Valoració màxima, o 0 si no hi ha cap valoració.
+        """
+        return self._csr.data.max() if self._csr.nnz > 0 else 0
+
+    def mean(self) -> float:
+        """
+        Retorna la mitjana de totes les valoracions existents.
+
+        Returns
+        -------
+        float
+            Mitjana global, o 0 si no hi ha cap valoració.
+        """
+        return float(np.mean(self._csr.data, dtype=np.float64)) if self._csr.nnz > 0 else 0
+
+    def toarray(self) -> np.ndarray:
+        """
+        Retorna la matriu densa amb -1 on no hi ha valoració (només per datasets petits).
+
+        Returns
+        -------
+        np.ndarray
+            Matriu densa usuaris x ítems.
+        """
+        return self.files(np.arange(self._csr.shape[0]))
+
+    def __getstate__(self):
+        # Una matriu mapada només guarda el directori: cada procés la torna a mapar sense copiar-la
+        if self.es_mapada():
+            return {"_directori": self._directori}
+        # Les vistes derivades es tornen a crear quan calen, no cal guardar-les al pickle
+        estat = self.__dict__.copy()
+        estat["_csc"] = None
+        estat["_estructura"] = None
+        estat["_quadrats"] = None
+        estat["_centrada"] = None
+        return estat
+
+    def __setstate__(self, estat):
+        if set(estat) == {"_directori"}:
+            self.__dict__.update(MatriuRatings.carrega(estat["_directori"], mmap=True).__dict__)
+        else:
+            estat.setdefault("_directori", None)
+            self.__dict__.update(estat)
+
+
+class AcumuladorValoracions:
+    """
+    Acumula valoracions (fila, columna, valor) llegides en streaming en trossos d'arrays tipats.
+
+    Les valoracions s'afegeixen a llistes de Python fins a mida_tros i llavors es converteixen en arrays
+    compactes (int32, int32, dtype): els objectes de Python queden acotats per la mida del tros, però
+    la memòria total creix amb el nombre de valoracions (uns pocs bytes per valoració). Els trossos
+    es filtren d'un en un en recuperar-los (vegeu arrays), així no es copien mai les valoracions descartades.
+
+    Parameters
+    ----------
+    dtype : np.dtype, optional
+        Tipus dels valors (default és np.float32).
+    mida_tros : int, optional
+        Valoracions per tros (default és 1.000.000).
+    """
+
+    def __init__(self, dtype=np.float32, mida_tros: int = 1_000_000):
+        self._dtype = dtype
+        self._mida_tros = mida_tros
+        self._files, self._columnes, self._valors = [], [], []
+        self._trossos = []
+        self._num = 0
+
+    def afegeix(self, fila: int, columna: int, valor):
+        """
+        Afegeix una valoració.
+
+        Parameters
+        ----------
+        fila : int
+            Fila (o codi d'usuari) de la valoració.
+        columna : int
+            Columna de la valoració.
+        valor : float
+            Valor de la valoració.
+        """
+        self._files.append(fila)
+        self._columnes.append(columna)
+        self._valors.append(valor)
+        self._num += 1
+        if len(self._files) >= self._mida_tros:
+            self._tanca_tros()
+
+    def _tanca_tros(self):
+        if self._files:
+            self._trossos.append((np.array(self._files, dtype=np.int32),
+                                  np.array(self._columnes, dtype=np.int32),
+                                  np.array(self._valors, dtype=self._dtype)))
+            self._files, self._columnes, self._valors = [], [], []
+
+    def __len__(self) -> int:
+        return self._num
+
+    def comptes(self, minlength: int = 0) -> np.ndarray:
+        """
+        Compta les valoracions de cada fila (o codi d'usuari), tros a tros.
+
+        Parameters
+        ----------
+        minlength : int, optional
+            Mida mínima del resultat (default és 0).
+
+        Returns
+        -------
+        np.ndarray
+            Nombre de valoracions de cada fila.
+        """
+        self._tanca_tros()
+        comptes = np.zeros(minlength, dtype=np.int64)
+        for files, _, _ in self._trossos:
+            tros = np.bincount(files, minlength=len(comptes))
+            comptes = np.pad(comptes, (0, len(tros) - len(comptes))) + tros
+        return comptes
+
+    def arrays(self, fila_codi: np.ndarray = None) -> tuple:
+        """
+        Retorna les valoracions acumulades, en ordre d'entrada, i buida l'acumulador.
+
+        Els trossos s'alliberen a mesura que es processen. Si es dona fila_codi, la primera columna es
+        tradueix a files i es descarten les valoracions amb fila negativa abans de concatenar, de manera
+        que el pic de memòria és el de les valoracions acumulades més les seleccionades.
+
+        Parameters
+        ----------
+        fila_codi : np.ndarray, optional
+            Fila de cada codi, o -1 per descartar-ne les valoracions (default és None, sense traduir).
+
+        Returns
+        -------
+        tuple of np.ndarray
+            (files int32, columnes int32, valors).
+        """
+        self._tanca_tros()
+        parts = []
+        while self._trossos:
+            files, columnes, valors = self._trossos.pop(0)
+            if fila_codi is not None:
+                files = fila_codi[files]
+                seleccionats = files >= 0
+                files, columnes, valors = files[seleccionats], columnes[seleccionats], valors[seleccionats]
+            parts.append((files.astype(np.int32, copy=False), columnes, valors))
+        self._num = 0
+        if not parts:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=self._dtype)
+        return tuple(parts[0]) if len(parts) == 1 else tuple(np.concatenate(columna) for columna in zip(*parts))
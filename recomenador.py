@@ -1,10 +1,28 @@
 from dataset import Dataset
+from ratings import MatriuRatings
 from avaluador import Avaluador
+from snapshot import escriu_seccio, llegeix_seccio, escriu_manifest, llegeix_manifest, DIRECTORI_MATRIU, COMPRESSIONS
+from ann import IndexInvertit, MAX_LLISTA_DEFECTE
+from cache_recomanacions import CacheLRU
 from sklearn.feature_extraction.text import TfidfVectorizer
 import numpy as np
-import math, random, logging
+import scipy.sparse as sp
+import copy, os, random, logging, time
+from contextlib import contextmanager
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
 from abc import ABC, abstractmethod
 
+#Valors per defecte dels paràmetres quan no es demanen per consola (batch)
+MIN_VOTS_DEFECTE = 10
+K_DEFECTE = 10
+K_INDEX_DEFECTE = 50 #Veïns guardats per usuari a l'índex precalculat de Colaboratiu
+K_ITEMS_DEFECTE = 50 #Veïns guardats per ítem a la matriu de similituds de ColaboratiuItems
+RANG_DEFECTE = 20 #Dimensió dels factors de Factoritzacio
+ITERACIONS_DEFECTE = 10 #Iteracions d'ALS de Factoritzacio
+REGULARITZACIO_DEFECTE = 0.1 #Regularització L2 de Factoritzacio (multiplicada pel nombre de valoracions)
+MIDA_BLOC = 128 #Usuaris processats alhora a recomenar_batch
+
 
 class Recomenador(ABC):
     """
@@ -20,14 +38,16 @@ class Recomenador(ABC):
     ----------
     _dataset : Dataset
         Dataset utilitzat per fer recomanacions.
-    _recomanacions : dict
-        Recomanacions generades per usuari.
-    _prediccions : dict
-        Totes les prediccions (valoracions esperades) per usuari.
-    _avaluacions : dict
-        Resultats d'avaluació (objectes Avaluador) per usuari.
+    _cache : CacheLRU
+        Resultats per (tipus, usuari, paràmetres[, num_r]): les recomanacions i prediccions d'una petició
+        com a tupla d'arrays (columnes, scores, columnes, scores) i les avaluacions (objectes Avaluador).
+        Vegeu invalida_cache.
+    _ultima_peticio : tuple or None
+        (user_id, paràmetres, resultats) de l'última recomanació, per imprimir-la sense tornar a consultar la cache.
     """
 
+    _NOMS_PARAMETRES = () #Atributs amb els paràmetres que es poden demanar per consola (vegeu parametres)
+
     def __init__(self, dataset: Dataset):
         """
         Inicialitza l'objecte Recomenador amb un dataset donat.
@@ -38,9 +58,129 @@ class Recomenador(ABC):
             Objecte dataset que conté usuaris, ítems i valoracions.
         """
         self._dataset = dataset
-        self._recomanacions = dict()
-        self._prediccions = dict()
-        self._avaluacions = dict()
+        self._cache = CacheLRU()
+        self._ultima_peticio = None
+
+    def __setstate__(self, estat):
+        # Els snapshots anteriors guardaven els resultats en diccionaris sense límit
+        for nom in ("_recomanacions", "_prediccions", "_avaluacions"):
+            estat.pop(nom, None)
+        estat.setdefault("_cache", CacheLRU())
+        estat["_ultima_peticio"] = None  # La cache es carrega buida
+        self.__dict__.update(estat)
+
+    def parametres(self, interactiu: bool = True) -> tuple:
+        """
+        Retorna els paràmetres de l'algoritme que canvien els resultats d'un usuari.
+
+        Formen part de la clau de la cache, de manera que canviar-los no retorna resultats antics.
+
+        Parameters
+        ----------
+        interactiu : bool, optional
+            Si és True, els paràmetres no fixats es demanen per consola (default és True).
+
+        Returns
+        -------
+        tuple
+            Valors dels paràmetres, en l'ordre de _NOMS_PARAMETRES.
+        """
+        return ()
+
+    @contextmanager
+    def parametres_fixats(self, parametres: tuple):
+        """
+        Fixa temporalment els paràmetres, perquè l'algoritme no els torni a demanar per consola.
+
+        Parameters
+        ----------
+        parametres : tuple
+            Valors retornats per parametres().
+        """
+        originals = [getattr(self, nom) for nom in self._NOMS_PARAMETRES]
+        for nom, valor in zip(self._NOMS_PARAMETRES, parametres):
+            setattr(self, nom, valor)
+        try:
+            yield
+        finally:
+            for nom, valor in zip(self._NOMS_PARAMETRES, originals):
+                setattr(self, nom, valor)
+
+    def assegura_model(self):
+        """
+        Calcula el model de l'algoritme si encara no existeix (similituds, factors, TF-IDF...).
+
+        Per defecte no fa res: els recomanadors que calculen el model a la primera recomanació el
+        sobreescriuen, perquè es pugui calcular abans de repartir el recomanador entre processos.
+        """
+        pass
+
+    def invalida_cache(self, user_id: str = None):
+        """
+        Esborra els resultats guardats d'un usuari, o de tots.
+
+        S'ha de cridar quan canvia el model (estadístiques, similituds, factors...); els mètodes que el
+        recalculen ja ho fan.
+
+        Parameters
+        ----------
+        user_id : str, optional
+            Usuari; si és None s'esborra tota la cache (default és None).
+        """
+        if user_id is None:
+            self._cache.neteja()
+        else:
+            self._cache.invalida_si(lambda clau: clau[1] == user_id)
+        if self._ultima_peticio is not None and user_id in (None, self._ultima_peticio[0]):
+            self._ultima_peticio = None
+
+    def estadistiques_cache(self) -> dict:
+        """
+        Retorna l'ocupació i els comptadors d'encerts i fallades de la cache de resultats.
+
+        Returns
+        -------
+        dict
+            Vegeu CacheLRU.estadistiques.
+        """
+        return self._cache.estadistiques()
+
+    def get_recomanacions(self, user_id: str):
+        """
+        Retorna les recomanacions de l'última petició, si és de l'usuari.
+
+        Parameters
+        ----------
+        user_id : str
+            Identificador de l'usuari.
+
+        Returns
+        -------
+        list of tuple or None
+            Llista de (item_id, score) ordenada de més gran a més petit, o None.
+        """
+        if self._ultima_peticio is None or self._ultima_peticio[0] != user_id:
+            return None
+        cols, scores = self._ultima_peticio[2][:2]
+        return list(zip(self._dataset.get_items().ids_for(cols), scores))
+
+    def get_prediccions(self, user_id: str):
+        """
+        Retorna les prediccions dels ítems valorats de l'última petició, si és de l'usuari.
+
+        Parameters
+        ----------
+        user_id : str
+            Identificador de l'usuari.
+
+        Returns
+        -------
+        tuple of np.ndarray or None
+            (columnes, scores) sense ordenar, o None.
+        """
+        if self._ultima_peticio is None or self._ultima_peticio[0] != user_id:
+            return None
+        return self._ultima_peticio[2][2:]
 
     def has_user(self, user_id: str):
         """
@@ -74,10 +214,102 @@ class Recomenador(ABC):
         """
         return random.sample(list(self._dataset.get_users()), k)
 
+    def desa(self, directori: str, compressio: str = None):
+        """
+        Desa el recomanador com a snapshot versionat dins d'un directori.
+
+        El snapshot té tres seccions: la matriu de valoracions com a arrays .npy (mapables),
+        el dataset sense la matriu (usuaris, ítems, metadades) i el model (paràmetres i dades
+        precalculades del recomanador; la cache de resultats es desa buida). Les dues últimes es poden comprimir amb zlib o lzma. El manifest
+        s'escriu l'últim, de manera que un snapshot a mitges no es pot carregar.
+
+        Parameters
+        ----------
+        directori : str
+            Directori del snapshot (es crea si no existeix; si ja n'hi ha un, es refresca).
+        compressio : str, optional
+            None, 'zlib' o 'lzma' (default és None).
+
+        Raises
+        ------
+        ValueError
+            Si la compressió no és vàlida.
+        """
+        if compressio not in COMPRESSIONS:
+            raise ValueError(f"Compressió no vàlida: {compressio}")
+        os.makedirs(directori, exist_ok=True)
+
+        # 1 Matriu: si ja està mapada des d'aquest snapshot no cal (ni es pot) sobreescriure-la
+        ratings = self._dataset.get_ratings()
+        directori_matriu = os.path.join(directori, DIRECTORI_MATRIU)
+        if not (ratings.es_mapada() and os.path.abspath(ratings._directori) == os.path.abspath(directori_matriu)):
+            ratings.desa(directori_matriu)
+
+        # 2 Dataset sense la matriu i 3 model sense el dataset (còpies superficials, no es modifica l'objecte)
+        dataset = copy.copy(self._dataset)
+        dataset._ratings = None
+        model = copy.copy(self)
+        model._dataset = None
+
+        mides = {
+            "dataset": escriu_seccio(os.path.join(directori, "dataset.bin"), dataset, compressio),
+            "model": escriu_seccio(os.path.join(directori, "model.bin"), model, compressio),
+        }
+        escriu_manifest(directori, {
+            "recomanador": type(self).__name__,
+            "dataset": type(self._dataset).__name__,
+            "compressio": compressio,
+            "seccions": {"matriu": DIRECTORI_MATRIU, "dataset": "dataset.bin", "model": "model.bin"},
+            "mides": mides,
+            "shape": list(ratings.shape),
+            "nnz": int(ratings.nnz),
+        })
+        logging.info(f"Snapshot desat a {directori}")
+
+    @staticmethod
+    def carrega(directori: str, mmap: bool = True):
+        """
+        Carrega un recomanador desat amb desa().
+
+        Parameters
+        ----------
+        directori : str
+            Directori del snapshot.
+        mmap : bool, optional
+            Si és True, la matriu es mapa a memòria en lloc de llegir-la; l'obertura no depèn
+            de la mida de la matriu (default és True).
+
+        Returns
+        -------
+        Recomenador
+            Recomanador (de la subclasse desada) amb el seu dataset.
+
+        Raises
+        ------
+        FileNotFoundError
+            Si el directori no conté cap snapshot complet.
+        ValueError
+            Si la versió del snapshot no és compatible.
+        """
+        manifest = llegeix_manifest(directori)
+        seccions = manifest["seccions"]
+
+        dataset = llegeix_seccio(os.path.join(directori, seccions["dataset"]), manifest["compressio"])
+        dataset._ratings = MatriuRatings.carrega(os.path.join(directori, seccions["matriu"]), mmap=mmap)
+        dataset._mmap = mmap
+
+        recomanador = llegeix_seccio(os.path.join(directori, seccions["model"]), manifest["compressio"])
+        recomanador._dataset = dataset
+        logging.info(f"Snapshot carregat de {directori} ({manifest['recomanador']} sobre {manifest['dataset']})")
+        return recomanador
+
     def recomenar(self, user_id: str, num_r: int = 5):
         """
         Genera recomanacions per a un usuari determinat.
 
+        Les recomanacions i les prediccions es guarden a la cache amb els paràmetres de l'algoritme, i
+        només es tornen a calcular si no hi són per aquests paràmetres (i num_r).
+
         Parameters
         ----------
         user_id : str
@@ -94,53 +326,222 @@ class Recomenador(ABC):
             print(f"Usuari {user_id} no trobat.")
             return False
 
-        if user_id in self._recomanacions and user_id in self._prediccions:
+        parametres = self.parametres()
+        clau = ("recomanacions", user_id, parametres, num_r)
+        resultats = self._cache.get(clau)
+        if resultats is not None:
+            self._ultima_peticio = (user_id, parametres, resultats)
             print(f"Prediccions i recomanacions ja fetes per {user_id}.")
             return True
 
         ratings = self._dataset.get_ratings()
 
         user_pos = self._dataset.get_row_user(user_id)
-        user_row = ratings[user_pos]
-
-        llista_prediccions = []
+        user_row = ratings.fila(user_pos)
 
-        if not self.algoritme(ratings, user_row, llista_prediccions):
+        with self.parametres_fixats(parametres):
+            scores = self.algoritme(ratings, user_row, user_pos)
+        if scores is None:
             return False
 
-        # Només guardem les tuples prediccio a la llista de recomenacions pertinents
-        llista_recomenacions = []
-        for prediccio in llista_prediccions.copy():
-            if user_row[self._dataset.get_col_item(prediccio[0])] == -1: #prediccio = tuple(id_item, score) per tant mirem que l'item no hagi estat valorat per l'usuari   
-                llista_recomenacions.append(prediccio)
-                llista_prediccions.remove(prediccio)
+        # Separem amb màscares: ítems no valorats -> recomanacions, ítems valorats -> prediccions
+        amb_prediccio = ~np.isnan(scores)
+        valorats = user_row != -1
+        cols_recomanacions = np.flatnonzero(amb_prediccio & ~valorats)
+        cols_prediccions = np.flatnonzero(amb_prediccio & valorats)
 
-        # Sort the scores and return the top 5 (or num_r) recommendations
-        llista_recomenacions = sorted(llista_recomenacions, key=lambda x: x[1], reverse=True )
-        llista_prediccions = sorted(llista_prediccions, key=lambda x: x[1], reverse=True )
-        self._recomanacions[user_id] = llista_recomenacions[:num_r]
-        self._prediccions[user_id] = llista_prediccions
+        # Només ordenem el top num_r de les recomanacions; les prediccions s'ordenen quan s'imprimeixen
+        top = cols_recomanacions[self.top_n(scores[cols_recomanacions], num_r)]
+        resultats = (top.astype(np.int32), scores[top], cols_prediccions.astype(np.int32), scores[cols_prediccions])
+        self._cache.put(clau, resultats)
+        self._ultima_peticio = (user_id, parametres, resultats)
 
         return True
 
+    @staticmethod
+    def top_n(scores: np.ndarray, n: int) -> np.ndarray:
+        """
+        Retorna les posicions dels n scores més alts, ordenades de més gran a més petit.
+
+        Utilitza argpartition per no haver d'ordenar tot el vector quan n és petit.
+
+        Parameters
+        ----------
+        scores : np.ndarray
+            Vector de puntuacions.
+        n : int
+            Nombre de posicions a retornar.
+
+        Returns
+        -------
+        np.ndarray
+            Índexs dins de scores.
+        """
+        n = min(max(n, 0), len(scores))
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+        if n < len(scores):
+            llindar = scores[np.argpartition(-scores, n - 1)[n - 1]]
+            # En cas d'empat al llindar ens quedem amb les primeres posicions, com un sort estable
+            superiors = np.flatnonzero(scores > llindar)
+            empats = np.flatnonzero(scores == llindar)[:n - len(superiors)]
+            candidats = np.concatenate([superiors, empats])
+        else:
+            candidats = np.arange(len(scores))
+        return candidats[np.argsort(-scores[candidats], kind="stable")]
+
+    def recomenar_batch(self, user_ids, num_r: int = 5, mida_bloc: int = MIDA_BLOC):
+        """
+        Genera recomanacions per a molts usuaris alhora, processant-los en blocs.
+
+        Cada bloc de usuaris es puntua amb operacions matriu-matriu (algoritme_batch), de manera
+        que la memòria queda limitada a mida_bloc x ítems. No es demana cap paràmetre per consola:
+        s'utilitzen els paràmetres del recomanador o els valors per defecte.
+
+        Parameters
+        ----------
+        user_ids : iterable of str
+            Identificadors dels usuaris. Els que no existeixen s'ometen.
+        num_r : int, optional
+            Nombre màxim de recomanacions per usuari (default és 5).
+        mida_bloc : int, optional
+            Nombre d'usuaris processats alhora (default és MIDA_BLOC).
+
+        Returns
+        -------
+        dict or None
+            Diccionari user_id -> llista de tuples (item_id, score) ordenades de més gran a més petit,
+            o None si l'algoritme no es pot aplicar al dataset.
+        """
+        resultat = dict()
+        for bloc in self.recomanacions_per_blocs(user_ids, num_r, mida_bloc):
+            if bloc is None:
+                return None
+            resultat.update(bloc)
+        return resultat
+
+    def recomanacions_per_blocs(self, user_ids, num_r: int = 5, mida_bloc: int = MIDA_BLOC):
+        """
+        Genera les recomanacions de recomenar_batch bloc a bloc, a mesura que es calculen.
+
+        Parameters
+        ----------
+        user_ids : iterable of str
+            Identificadors dels usuaris. Els que no existeixen s'ometen.
+        num_r : int, optional
+            Nombre màxim de recomanacions per usuari (default és 5).
+        mida_bloc : int, optional
+            Nombre d'usuaris processats alhora (default és MIDA_BLOC).
+
+        Yields
+        ------
+        dict or None
+            Recomanacions dels usuaris del bloc (user_id -> llista de tuples (item_id, score)), o un sol
+            None si l'algoritme no es pot aplicar al dataset.
+        """
+        ratings = self._dataset.get_ratings()
+
+        user_ids = list(user_ids)
+        files = self._dataset.get_users().rows_for(user_ids)
+        for user_id in np.asarray(user_ids, dtype=object)[files < 0]:
+            logging.warning(f"Usuari {user_id} no trobat, s'omet del batch.")
+        ids = [user_id for user_id, fila in zip(user_ids, files) if fila >= 0]
+        files = files[files >= 0]
+
+        for inici in range(0, len(ids), mida_bloc):
+            files_bloc = files[inici:inici + mida_bloc]
+            scores = self.algoritme_batch(ratings, files_bloc)
+            if scores is None:
+                yield None
+                return
+
+            # Els ítems ja valorats no es recomanen
+            scores[ratings.estructura()[files_bloc].toarray() > 0] = np.nan
+
+            bloc = dict()
+            for user_id, fila in zip(ids[inici:inici + mida_bloc], scores):
+                cols = np.flatnonzero(~np.isnan(fila))
+                top = cols[self.top_n(fila[cols], num_r)]
+                bloc[user_id] = list(zip(self._dataset.get_items().ids_for(top), fila[top]))
+            yield bloc
+
+    def errors_batch(self, files:np.ndarray):
+        """
+        Calcula els errors de predicció sobre els ítems valorats d'un bloc d'usuaris.
+
+        Parameters
+        ----------
+        files : np.ndarray
+            Files dels usuaris del bloc.
+
+        Returns
+        -------
+        tuple of np.ndarray or None
+            (nombre de prediccions, suma d'errors absoluts, suma d'errors quadràtics) per usuari,
+            o None si l'algoritme no es pot aplicar al dataset.
+        """
+        ratings = self._dataset.get_ratings()
+        scores = self.algoritme_batch(ratings, files)
+        if scores is None:
+            return None
+
+        bloc = ratings.csr()[files]
+        files_bloc = np.repeat(np.arange(len(files)), np.diff(bloc.indptr))
+        errors = scores[files_bloc, bloc.indices] - bloc.data
+        valids = ~np.isnan(errors)
+
+        num = np.bincount(files_bloc[valids], minlength=len(files))
+        suma_abs = np.bincount(files_bloc[valids], weights=np.abs(errors[valids]), minlength=len(files))
+        suma_quadrats = np.bincount(files_bloc[valids], weights=errors[valids] ** 2, minlength=len(files))
+        return num, suma_abs, suma_quadrats
+
+    def algoritme_batch(self, ratings:MatriuRatings, files:np.ndarray):
+        """
+        Calcula els scores d'un bloc d'usuaris.
+
+        Per defecte aplica algoritme() fila a fila; les subclasses el sobreescriuen amb una
+        versió matriu-matriu.
+
+        Parameters
+        ----------
+        ratings : MatriuRatings
+            Matriu dispersa de valoracions del dataset.
+        files : np.ndarray
+            Files dels usuaris del bloc.
+
+        Returns
+        -------
+        np.ndarray or None
+            Matriu (usuaris del bloc x ítems) de scores amb NaN on no hi ha predicció,
+            o None si no s'ha pogut calcular.
+        """
+        user_rows = ratings.files(files)
+        scores = np.full(user_rows.shape, np.nan)
+        for i, user_row in enumerate(user_rows):
+            fila = self.algoritme(ratings, user_row, files[i])
+            if fila is not None:
+                scores[i] = fila
+        return scores
+
     @abstractmethod
-    def algoritme(self, ratings:np.ndarray, user_row:np.ndarray, llista_prediccions:list, arg:int):
+    def algoritme(self, ratings:MatriuRatings, user_row:np.ndarray, user_pos:int = None):
         """
         Algoritme específic de recomanació implementat per subclasses.
 
         Parameters
         ----------
-        ratings : np.ndarray
-            Matriu de valoracions del dataset.
+        ratings : MatriuRatings
+            Matriu dispersa de valoracions del dataset.
         user_row : np.ndarray
-            Fila corresponent a l'usuari.
-        llista_prediccions : list
-            Llista on s'afegeixen tuples (item_id, score).
+            Fila densa corresponent a l'usuari (-1 on no hi ha valoració).
+        user_pos : int, optional
+            Fila de l'usuari a la matriu, si es coneix (permet fer servir dades precalculades per usuari).
 
         Returns
         -------
-        bool
-            True si s'ha pogut calcular correctament.
+        np.ndarray or None
+            Vector de scores amb una posició per columna (NaN si no hi ha predicció per l'ítem),
+            o None si no s'ha pogut calcular.
         """
         raise NotImplementedError
 
@@ -158,7 +559,8 @@ class Recomenador(ABC):
         bool
             True si hi ha recomanacions per imprimir.
         """
-        if user_id not in self._recomanacions:
+        recomanacions = self.get_recomanacions(user_id)
+        if recomanacions is None:
             print(
                 f"No hi ha recomanacions disponibles per a l'usuari {user_id}."
             )
@@ -166,14 +568,14 @@ class Recomenador(ABC):
         else:
             user = self._dataset.get_user_obj(user_id)
             print(f"Recomanació per a l'{user}:")
-            for i, tupla in enumerate(self._recomanacions[user_id]):  # tupla = item_id, score
+            for i, tupla in enumerate(recomanacions):  # tupla = item_id, score
                 item = self._dataset.get_item_obj(tupla[0])
                 print(f" {i+1}: {item} amb predicted score {tupla[1]:.3f}")
             return True
 
     def test(self, user_id: str):
         """
-        Avalua les prediccions d'un usuari si no s'han avaluat encara.
+        Avalua les prediccions d'un usuari si no s'han avaluat encara amb els paràmetres actuals.
 
         Parameters
         ----------
@@ -186,34 +588,25 @@ class Recomenador(ABC):
             Objecte amb mètriques d'avaluació o missatge d'error.
         """
 
-        if not user_id in self._avaluacions:
-            if self.recomenar(user_id):
+        if not self.recomenar(user_id) or self.get_prediccions(user_id) is None:
+            logging.error("Error al fer les prediccions de l'evaluació")
+            return "Error al fer les prediccions."
 
-                pred = []
-                reals = []
+        clau = ("avaluacions", user_id, self._ultima_peticio[1])
+        a = self._cache.get(clau)
+        if a is None:
+            user_pos = self._dataset.get_row_user(user_id)
+            user_row = self._dataset.get_ratings().fila(user_pos)
 
-                user_pos = self._dataset.get_row_user(user_id)
-                user_row = self._dataset.get_ratings()[user_pos]
+            cols, pred = self.get_prediccions(user_id)  # Només conté ítems valorats per l'usuari
+            reals = user_row[cols]
 
-                for item_id, score_pred in self._prediccions.get(user_id, []):
-                    try:
-                        col = self._dataset.get_col_item(item_id)
-                        valor_real = user_row[col]
-                        if valor_real != -1:
-                            pred.append(score_pred)
-                            reals.append(valor_real)
-                    except KeyError:
-                        continue
-
-                a = Avaluador(user_id)
-                a.mae(pred, reals)
-                a.rmse(pred, reals)
-                self._avaluacions[user_id] = a
-            else:
-                logging.error("Error al fer les prediccions de l'evaluació")
-                return "Error al fer les prediccions."
+            a = Avaluador(user_id)
+            a.mae(pred, reals)
+            a.rmse(pred, reals)
+            self._cache.put(clau, a)
 
-        return self._avaluacions[user_id]
+        return a
 
     def imprimir_prediccions(self, user_id: str) -> bool:
         """
@@ -234,15 +627,17 @@ class Recomenador(ABC):
         except:
             N = 5
 
-        if not user_id in self._prediccions:
+        prediccions = self.get_prediccions(user_id)
+        if prediccions is None:
             print(f"No hi ha prediccions disponibles per a l'usuari {user_id}.")
             return False
         else:
+            cols, scores = prediccions
             user = self._dataset.get_user_obj(user_id)
             print(f"Recomanació per a l'{user}:")
-            for i, tupla in enumerate(self._prediccions[user_id][:N]):  # tupla = item_id, score
-                item = self._dataset.get_item_obj(tupla[0])
-                print(f" {i+1}: {item} amb predicted score {tupla[1]:.3f}")
+            for i, pos in enumerate(self.top_n(scores, N)):
+                item = self._dataset.get_item(cols[pos])
+                print(f" {i+1}: {item} amb predicted score {scores[pos]:.3f}")
             return True
     
 class Simple(Recomenador):
@@ -253,9 +648,93 @@ class Simple(Recomenador):
     el nombre de valoracions rebudes, ponderant respecte a la mitjana global.
 
     Mètode ideal quan no hi ha informació personalitzada ni similituds disponibles.
+
+    Attributes
+    ----------
+    _num_vots : np.ndarray
+        Nombre de valoracions de cada ítem (per columna).
+    _mitjanes : np.ndarray
+        Mitjana de valoracions de cada ítem (0 si no en té cap).
+    _mitjana_global : float
+        Mitjana de totes les valoracions del dataset.
+    _min_vots : int or None
+        Vots mínims fixats; si és None es demanen per consola a cada recomanació.
     """
 
-    def get_num_vots(self, item_id: str, ratings):
+    _NOMS_PARAMETRES = ("_min_vots",)
+
+    def __init__(self, dataset: Dataset, min_vots: int = None):
+        """
+        Inicialitza el recomanador i precalcula les estadístiques de cada ítem.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Objecte dataset que conté usuaris, ítems i valoracions.
+        min_vots : int, optional
+            Vots mínims; si no es dona es demanen per consola (default és None).
+        """
+        super().__init__(dataset)
+        self._min_vots = min_vots
+        self.calcula_estadistiques()
+
+    def get_min_vots(self, interactiu: bool = True) -> int:
+        """
+        Retorna el paràmetre de vots mínims.
+
+        Parameters
+        ----------
+        interactiu : bool, optional
+            Si és True i no s'ha fixat, es demana per consola (default és True).
+
+        Returns
+        -------
+        int
+            Vots mínims a utilitzar.
+        """
+        if self._min_vots is not None:
+            return self._min_vots
+        if not interactiu:
+            return MIN_VOTS_DEFECTE
+        try:
+            return int(input("Introdueix el parametre vots mínims (Si no posses res el default serà 10): "))
+        except (ValueError, TypeError):
+            return MIN_VOTS_DEFECTE
+
+    def parametres(self, interactiu: bool = True) -> tuple:
+        """
+        Retorna els vots mínims, que formen part de la clau de la cache.
+
+        Parameters
+        ----------
+        interactiu : bool, optional
+            Si és True i no s'han fixat, es demanen per consola (default és True).
+
+        Returns
+        -------
+        tuple
+            (min_vots,)
+        """
+        return (self.get_min_vots(interactiu),)
+
+    def calcula_estadistiques(self):
+        """
+        Calcula en una sola passada el nombre de vots i la mitjana de cada ítem i la mitjana global.
+
+        Les estadístiques es guarden a l'objecte (i per tant al pickle) i només cal tornar-les a
+        calcular si canvien les valoracions del dataset.
+        """
+        csr = self._dataset.get_ratings().csr()
+        n_items = csr.shape[1]
+        num_vots = np.bincount(csr.indices, minlength=n_items)
+        sumes = np.bincount(csr.indices, weights=csr.data.astype(np.float64), minlength=n_items)
+
+        self._num_vots = num_vots
+        self._mitjanes = np.divide(sumes, num_vots, out=np.zeros(n_items), where=num_vots > 0)
+        self._mitjana_global = sumes.sum() / num_vots.sum() if num_vots.sum() > 0 else 0
+        self.invalida_cache()
+
+    def get_num_vots(self, item_id: str, ratings=None):
         """
         Retorna el nombre de valoracions que ha rebut un ítem.
 
@@ -263,19 +742,17 @@ class Simple(Recomenador):
         ----------
         item_id : str
             Identificador de l'ítem.
-        ratings : np.ndarray
-            Matriu de valoracions.
+        ratings : MatriuRatings, optional
+            No s'utilitza, es manté per compatibilitat (les estadístiques ja estan precalculades).
 
         Returns
         -------
         int
-            Nombre de valoracions diferents de -1.
+            Nombre de valoracions existents.
         """
-        col = self._dataset.get_col_item(item_id)
-        column_values = ratings[:, col]
-        return np.count_nonzero(column_values != -1)  # Retorna quantes valoracions són no-zero (valoracions reals)
+        return int(self._num_vots[self._dataset.get_col_item(item_id)])
 
-    def get_avg(self, item_id: str, ratings):
+    def get_avg(self, item_id: str, ratings=None):
         """
         Retorna la mitjana de valoracions d’un ítem.
 
@@ -283,18 +760,15 @@ class Simple(Recomenador):
         ----------
         item_id : str
             Identificador de l'ítem.
-        ratings : np.ndarray
-            Matriu de valoracions.
+        ratings : MatriuRatings, optional
+            No s'utilitza, es manté per compatibilitat (les estadístiques ja estan precalculades).
 
         Returns
         -------
         float
             Mitjana de les valoracions.
         """
-        col = self._dataset.get_col_item(item_id)
-        values = ratings[:, col]
-        avaluades = values[values != -1]
-        return np.mean(avaluades) if len(avaluades) > 0 else 0
+        return self._mitjanes[self._dataset.get_col_item(item_id)]
 
     def get_avg_global(self):
         """
@@ -305,52 +779,67 @@ class Simple(Recomenador):
         float
             Mitjana global.
         """
-        all_vals = self._dataset.get_ratings()
-        valid = all_vals[all_vals != -1]
-        return np.mean(valid) if len(valid) > 0 else 0
+        return self._mitjana_global
+
+    def puntuacions(self, min_vots: int) -> np.ndarray:
+        """
+        Calcula el score ponderat de tots els ítems a partir de les estadístiques precalculades.
+
+        Parameters
+        ----------
+        min_vots : int
+            Nombre mínim de vots perquè un ítem sigui fiable.
 
-    def algoritme(self, ratings:np.ndarray, user_row: np.ndarray, llista_prediccions: list) -> bool:
+        Returns
+        -------
+        np.ndarray
+            Vector amb una posició per columna; NaN als ítems amb menys de min_vots vots.
+        """
+        n = self._num_vots
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = (n / (n + min_vots)) * self._mitjanes + \
+                     (min_vots / (n + min_vots)) * self._mitjana_global
+        scores[n < min_vots] = np.nan  # No prou fiable
+        return scores
+
+    def algoritme(self, ratings:MatriuRatings, user_row: np.ndarray, user_pos:int = None) -> np.ndarray:
         """
         Implementa l'algoritme de recomanació simple basat en mitjanes ponderades.
 
         Parameters
         ----------
-        ratings : np.ndarray
-            Matriu de valoracions.
+        ratings : MatriuRatings
+            Matriu dispersa de valoracions.
         user_row : np.ndarray
             Vector de valoracions de l'usuari.
-        llista_prediccions : list
-            Llista on s'afegeixen tuples (item_id, score).
+        user_pos : int, optional
+            Fila de l'usuari (no es fa servir).
 
         Returns
         -------
-        bool
-            True si s'ha pogut calcular correctament.
+        np.ndarray
+            Scores de tots els ítems (NaN als ítems amb menys de min_vots vots).
         """
-        try:
-            min_vots = int(input("Introdueix el parametre vots mínims (Si no posses res el default serà 10): "))
-        except (ValueError, TypeError):
-            min_vots = 10
-
-        valid = ratings[ratings != -1]
-        avg_global = np.mean(valid) if len(valid) > 0 else 0
-
-        # Iterem per tots els ítems disponibles
-        for item_id in self._dataset.get_items(): #!#!# Respuesta: ya lo he cambiado yo, había aque crear un getter 
-            num_vots = self.get_num_vots(item_id,ratings)
-            if num_vots < min_vots:
-                continue  # No prou fiable
-
-            # Calculem la mitjana d’aquest ítem 
-            avg_item = self.get_avg(item_id,ratings)
+        return self.puntuacions(self.get_min_vots())
 
-            # Calculem el score ponderat segons la fórmula
-            score = (num_vots / (num_vots + min_vots)) * avg_item + \
-                    (min_vots / (num_vots + min_vots)) * avg_global            
+    def algoritme_batch(self, ratings:MatriuRatings, files:np.ndarray) -> np.ndarray:
+        """
+        Calcula els scores d'un bloc d'usuaris (el mateix vector per a tots).
 
-            llista_prediccions.append( (item_id, score) ) #Guardem predicció
+        Parameters
+        ----------
+        ratings : MatriuRatings
+            Matriu dispersa de valoracions.
+        files : np.ndarray
+            Files dels usuaris del bloc.
 
-        return True
+        Returns
+        -------
+        np.ndarray
+            Matriu (usuaris del bloc x ítems) de scores.
+        """
+        scores = self.puntuacions(self.get_min_vots(interactiu=False))
+        return np.tile(scores, (len(files), 1))
 
 
 class Colaboratiu(Recomenador):
@@ -359,162 +848,1042 @@ class Colaboratiu(Recomenador):
 
     Aquesta estratègia busca usuaris similars (veïns) i prediu la valoració que faria l'usuari
     observant les valoracions d'aquests veïns.
+
+    Attributes
+    ----------
+    _k : int or None
+        Nombre de veïns fixat; si és None es demana per consola a cada recomanació.
+    _index_veins : np.ndarray or None
+        Índex precalculat (usuaris x K) amb els K veïns més similars de cada usuari, ordenats
+        (-1 si n'hi ha menys de K), o None si no s'ha construït (vegeu construeix_index).
+    _index_similituds : np.ndarray or None
+        Similitud amb cada veí de l'índex (-inf a les posicions buides).
+    _ann : IndexInvertit or None
+        Índex aproximat; si hi és, els veïns es busquen només entre els seus candidats (vegeu construeix_ann).
     """
 
-    def algoritme(self, array_ratings:np.ndarray, user_row:np.ndarray, llista_prediccions:list):
+    _NOMS_PARAMETRES = ("_k",)
+
+    def __init__(self, dataset: Dataset, k: int = None):
+        """
+        Inicialitza el recomanador col·laboratiu.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Objecte dataset que conté usuaris, ítems i valoracions.
+        k : int, optional
+            Nombre de veïns; si no es dona es demana per consola (default és None).
+        """
+        super().__init__(dataset)
+        self._k = k
+        self._index_veins = None
+        self._index_similituds = None
+        self._ann = None
+
+    def get_k(self, interactiu: bool = True) -> int:
+        """
+        Retorna el nombre de veïns k.
+
+        Parameters
+        ----------
+        interactiu : bool, optional
+            Si és True i no s'ha fixat, es demana per consola (default és True).
+
+        Returns
+        -------
+        int
+            Nombre de veïns a utilitzar.
+        """
+        if self._k is not None:
+            return self._k
+        if not interactiu:
+            return K_DEFECTE
+        try:
+            return int(input("Introdueix el nombre de veïns k (Si no introdueixes res, el valor per defecte serà 10): "))
+        except (ValueError, TypeError):
+            return K_DEFECTE
+
+    def parametres(self, interactiu: bool = True) -> tuple:
+        """
+        Retorna el nombre de veïns, que forma part de la clau de la cache.
+
+        Parameters
+        ----------
+        interactiu : bool, optional
+            Si és True i no s'ha fixat, es demana per consola (default és True).
+
+        Returns
+        -------
+        tuple
+            (k,)
+        """
+        return (self.get_k(interactiu),)
+
+    def similituds_bloc(self, array_ratings:MatriuRatings, user_rows:np.ndarray, usuaris=slice(None)):
+        """
+        Calcula la similitud cosinus d'un bloc d'usuaris amb tots els usuaris del dataset (o una part).
+
+        Per a cada parella només es tenen en compte els ítems valorats pels dos usuaris. Tots els
+        productes es fan alhora amb operacions matriu-matriu sobre la matriu dispersa.
+
+        Parameters
+        ----------
+        array_ratings : MatriuRatings
+            Matriu dispersa de valoracions.
+        user_rows : np.ndarray
+            Files denses dels usuaris del bloc (-1 on no hi ha valoració).
+        usuaris : slice or np.ndarray, optional
+            Files dels usuaris amb qui es compara, en l'ordre de les columnes del resultat (default és tots).
+
+        Returns
+        -------
+        tuple of np.ndarray
+            (similituds, iguals), les dues de mida (usuaris del bloc x usuaris comparats). iguals és True pels
+            usuaris amb exactament les mateixes valoracions (inclòs el mateix usuari).
+        """
+        mask_users = user_rows != -1
+        valors_users = np.where(mask_users, user_rows, 0).astype(np.float64)
+        mask_users = mask_users.astype(np.float64)
+
+        estructura = array_ratings.estructura()[usuaris]
+        dot = (array_ratings.csr()[usuaris] @ valors_users.T).T                 # sum(user * veí) als ítems comuns
+        quadrats_veins = (array_ratings.quadrats()[usuaris] @ mask_users.T).T   # sum(veí^2) als ítems comuns
+        quadrats_user = (estructura @ (valors_users ** 2).T).T                  # sum(user^2) als ítems comuns
+        comuns = (estructura @ mask_users.T).T                                  # nombre d'ítems comuns
+
+        denominator = np.sqrt(quadrats_user) * np.sqrt(quadrats_veins)
+        similituds = np.zeros(dot.shape, dtype=np.float64)
+        valids = (comuns > 0) & (denominator != 0)
+        similituds[valids] = dot[valids] / denominator[valids]
+
+        # Files idèntiques a la de l'usuari: mateixos ítems valorats i cap diferència als valors
+        num_user = mask_users.sum(axis=1)[:, np.newaxis]
+        iguals = (array_ratings.num_vots_usuaris()[np.newaxis, usuaris] == num_user) & (comuns == num_user) & \
+                 (quadrats_veins + quadrats_user - 2 * dot == 0)
+
+        return similituds, iguals
+
+    def similituds(self, array_ratings:MatriuRatings, user_row:np.ndarray, candidats:np.ndarray = None):
+        """
+        Calcula la similitud cosinus de l'usuari amb tots els usuaris del dataset (o amb uns candidats).
+
+        Els usuaris amb exactament les mateixes valoracions (inclòs el mateix usuari) s'exclouen.
+
+        Parameters
+        ----------
+        array_ratings : MatriuRatings
+            Matriu dispersa de valoracions.
+        user_row : np.ndarray
+            Vector de valoracions de l'usuari (-1 on no hi ha valoració).
+        candidats : np.ndarray, optional
+            Files ordenades dels únics usuaris amb qui es compara (default és None, tots).
+
+        Returns
+        -------
+        tuple of np.ndarray
+            (files dels veïns candidats, similitud amb cadascun).
+        """
+        if candidats is None:
+            similituds, iguals = self.similituds_bloc(array_ratings, user_row[np.newaxis, :])
+            veins = np.flatnonzero(~iguals[0])
+            return veins, similituds[0, veins]
+        similituds, iguals = self.similituds_bloc(array_ratings, user_row[np.newaxis, :], candidats)
+        posicions = np.flatnonzero(~iguals[0])
+        return candidats[posicions], similituds[0, posicions]
+
+    def construeix_index(self, K: int = K_INDEX_DEFECTE, mida_bloc: int = MIDA_BLOC):
+        """
+        Precalcula i guarda els K veïns més similars de cada usuari.
+
+        Es recorren els usuaris per blocs i cada bloc només es compara amb ell mateix i amb els usuaris
+        posteriors: com que la similitud és simètrica, les mateixes similituds serveixen per actualitzar
+        el top-K dels usuaris posteriors, i cada parella es calcula una sola vegada. Un cop construït,
+        algoritme i algoritme_batch el fan servir sempre que k <= K.
+
+        Parameters
+        ----------
+        K : int, optional
+            Veïns guardats per usuari (default és K_INDEX_DEFECTE).
+        mida_bloc : int, optional
+            Usuaris per bloc (default és MIDA_BLOC).
+        """
+        ratings = self._dataset.get_ratings()
+        n_users = len(ratings)
+        K = min(K, max(n_users - 1, 0))
+        veins = np.full((n_users, K), -1, dtype=np.int64)
+        similituds = np.full((n_users, K), -np.inf)
+
+        for inici in range(0, n_users, mida_bloc):
+            fi = min(inici + mida_bloc, n_users)
+            files = np.arange(inici, fi)
+            sims, iguals = self.similituds_bloc(ratings, ratings.files(files), slice(inici, None))
+            sims[iguals] = -np.inf  # Ni el mateix usuari ni els usuaris idèntics són veïns
+
+            # Usuaris del bloc: candidats des d'inici (els anteriors ja hi són per simetria)
+            candidats = np.broadcast_to(np.arange(inici, n_users), sims.shape)
+            veins[inici:fi], similituds[inici:fi] = self._fusiona_top(veins[inici:fi], similituds[inici:fi], candidats, sims, K)
+
+            # Usuaris posteriors: el bloc és candidat seu (només cal fusionar si millora el seu top-K actual)
+            if fi < n_users and K > 0:
+                sims_t = sims[:, fi - inici:].T
+                millora = np.flatnonzero((sims_t > similituds[fi:, -1:]).any(axis=1)) + fi
+                if len(millora):
+                    candidats = np.broadcast_to(files, (len(millora), len(files)))
+                    veins[millora], similituds[millora] = self._fusiona_top(veins[millora], similituds[millora], candidats,
+                                                                            sims_t[millora - fi], K)
+
+        self._index_veins, self._index_similituds = veins, similituds
+        self.invalida_cache()
+        logging.info(f"Índex de {K} veïns construït per {n_users} usuaris")
+
+    @staticmethod
+    def _fusiona_top(veins: np.ndarray, similituds: np.ndarray, candidats: np.ndarray, sims_candidats: np.ndarray, K: int):
+        # Top-K per fila de la unió: més similitud primer i, en cas d'empat, el veí de fila més petita (com argsort estable)
+        tots_veins = np.concatenate([veins, candidats], axis=1)
+        totes_sims = np.concatenate([similituds, sims_candidats], axis=1)
+        ordre = np.lexsort((np.where(tots_veins < 0, np.iinfo(np.int64).max, tots_veins), -totes_sims), axis=-1)[:, :K]
+        return np.take_along_axis(tots_veins, ordre, axis=1), np.take_along_axis(totes_sims, ordre, axis=1)
+
+    def veins_index(self, files: np.ndarray, k: int):
+        """
+        Retorna els k primers veïns de l'índex precalculat per a unes files d'usuari.
+
+        Parameters
+        ----------
+        files : np.ndarray
+            Files dels usuaris.
+        k : int
+            Nombre de veïns.
+
+        Returns
+        -------
+        tuple of np.ndarray or None
+            (veïns, similituds) de mida (usuaris x k) amb -1 / -inf a les posicions buides,
+            o None si no hi ha índex o k és més gran que el K de l'índex.
+        """
+        index = getattr(self, "_index_veins", None) #Els snapshots anteriors a l'índex no tenen l'atribut
+        if index is None or k > index.shape[1]:
+            return None
+        return self._index_veins[files, :k], self._index_similituds[files, :k]
+
+    def construeix_ann(self, max_llista: int = MAX_LLISTA_DEFECTE, llavor: int = 0):
+        """
+        Activa la cerca aproximada de veïns amb un índex invertit ítem -> usuaris (vegeu IndexInvertit).
+
+        A partir d'aquí, quan no es pot fer servir l'índex exacte de veïns, cada usuari només es compara
+        amb els candidats de l'índex en comptes de tots els usuaris del dataset.
+
+        Parameters
+        ----------
+        max_llista : int, optional
+            Usuaris com a molt per ítem (default és MAX_LLISTA_DEFECTE).
+        llavor : int, optional
+            Llavor de la mostra d'usuaris de cada ítem (default és 0).
+        """
+        self._ann = IndexInvertit(self._dataset.get_ratings(), max_llista, llavor)
+        self.invalida_cache()  # Els veïns aproximats canvien els resultats
+        logging.info(f"Índex aproximat de veïns construït amb llistes de {max_llista} usuaris per ítem")
+
+    def get_ann(self):
+        """
+        Retorna l'índex aproximat de veïns.
+
+        Returns
+        -------
+        IndexInvertit or None
+            Índex aproximat, o None si la cerca és exacta.
+        """
+        return getattr(self, "_ann", None) #Els snapshots anteriors a l'índex aproximat no tenen l'atribut
+
+    def veins_bloc(self, array_ratings:MatriuRatings, files:np.ndarray, k:int, exacte:bool = False):
+        """
+        Busca els k veïns més similars de cada usuari d'un bloc.
+
+        Es fa servir l'índex precalculat si n'hi ha; si no, els candidats de l'índex aproximat si està activat, i si no
+        (o si exacte és True) es compara el bloc amb tots els usuaris.
+
+        Parameters
+        ----------
+        array_ratings : MatriuRatings
+            Matriu dispersa de valoracions.
+        files : np.ndarray
+            Files dels usuaris del bloc.
+        k : int
+            Nombre de veïns.
+        exacte : bool, optional
+            Si és True, es fa sempre la cerca exacta sobre tots els usuaris (default és False).
+
+        Returns
+        -------
+        tuple of np.ndarray
+            (veïns, similituds) de mida (usuaris del bloc x k o menys); -inf a les posicions sense veí vàlid.
+        """
+        if not exacte:
+            index = self.veins_index(files, k)
+            if index is not None:
+                return index
+
+        ann = None if exacte else self.get_ann()
+        if ann is not None:
+            # Cada usuari només es compara amb els seus candidats (la unió dels d'un bloc seria gairebé tothom)
+            veins = np.full((len(files), k), -1, dtype=np.int64)
+            pesos = np.full((len(files), k), -np.inf)
+            for i, fila in enumerate(files):
+                v, s = self.similituds(array_ratings, array_ratings.fila(fila), ann.candidats(array_ratings.fila_sparse(fila)[0]))
+                ordre = np.argsort(-s, kind="stable")[:k]
+                veins[i, :len(ordre)], pesos[i, :len(ordre)] = v[ordre], s[ordre]
+            return veins, pesos
+
+        similituds, iguals = self.similituds_bloc(array_ratings, array_ratings.files(files))
+        similituds[iguals] = -np.inf
+
+        # Top-k veïns per fila (estable, com a algoritme)
+        veins = np.argsort(-similituds, axis=1, kind="stable")[:, :k]
+        return veins, np.take_along_axis(similituds, veins, axis=1)
+
+    def recall_ann(self, files:np.ndarray, k:int = None, mida_bloc:int = MIDA_BLOC) -> dict:
+        """
+        Compara els veïns de l'índex aproximat amb els exactes per a uns usuaris.
+
+        Parameters
+        ----------
+        files : np.ndarray
+            Files dels usuaris.
+        k : int, optional
+            Nombre de veïns (default és el k del recomanador).
+        mida_bloc : int, optional
+            Usuaris per bloc (default és MIDA_BLOC).
+
+        Returns
+        -------
+        dict
+            'recall' (fracció dels k veïns exactes que troba l'índex aproximat), 'candidats' (mitjana de candidats per usuari),
+            'usuaris' (total d'usuaris del dataset) i els temps 'temps_exacte' i 'temps_ann' en segons. Un veí
+            aproximat compta com a trobat si la seva similitud és almenys la del k-èsim veí exacte: amb empats, quins
+            veïns exactes queden dins dels k és arbitrari.
+
+        Raises
+        ------
+        ValueError
+            Si la cerca aproximada no està activada.
+        """
+        ann = self.get_ann()
+        if ann is None:
+            raise ValueError("No hi ha cap índex aproximat de veïns (vegeu construeix_ann).")
+        k = self.get_k(interactiu=False) if k is None else k
+        ratings = self._dataset.get_ratings()
+        trobats = totals = candidats = 0
+        temps_exacte = temps_ann = 0.0
+        for i in range(0, len(files), mida_bloc):
+            bloc = files[i:i + mida_bloc]
+            inici = time.perf_counter()
+            exactes, sims_exactes = self.veins_bloc(ratings, bloc, k, exacte=True)
+            temps_exacte += time.perf_counter() - inici
+            inici = time.perf_counter()
+            aproximats, sims_aproximats = self.veins_bloc(ratings, bloc, k)
+            temps_ann += time.perf_counter() - inici
+            candidats += sum(len(ann.candidats(ratings.fila_sparse(fila)[0])) for fila in bloc)
+            for se, sa in zip(sims_exactes, sims_aproximats):
+                se = se[np.isfinite(se)]
+                if len(se):
+                    trobats += min(np.count_nonzero(sa >= se[-1]), len(se))
+                totals += len(se)
+        return {"recall": float(trobats / totals) if totals else 1.0,
+                "candidats": candidats / len(files) if len(files) else 0.0,
+                "usuaris": len(ratings), "temps_exacte": temps_exacte, "temps_ann": temps_ann}
+
+    def algoritme(self, array_ratings:MatriuRatings, user_row:np.ndarray, user_pos:int = None):
         """
         Implementa l'algoritme col·laboratiu (user-user) basat en similitud cosinus.
 
+        Si hi ha un índex de veïns precalculat amb k <= K, els veïns es llegeixen de l'índex i només
+        cal calcular les prediccions a partir dels k veïns. Si no, i la cerca aproximada està activada,
+        l'usuari només es compara amb els candidats de l'índex aproximat.
+
         Parameters
         ----------
-        array_ratings : np.ndarray
-            Matriu de valoracions.
+        array_ratings : MatriuRatings
+            Matriu dispersa de valoracions.
         user_row : np.ndarray
             Vector de valoracions de l'usuari.
-        llista_prediccions : list
-            Llista on s'afegeixen tuples (item_id, score).
+        user_pos : int, optional
+            Fila de l'usuari, necessària per fer servir l'índex de veïns.
 
         Returns
         -------
-        bool
-            True si l'algoritme s'ha executat correctament.
+        np.ndarray or None
+            Scores de tots els ítems, o None si no hi ha cap veí.
         """
-        try:
-            k = int(input("Introdueix el nombre de veïns k (Si no introdueixes res, el valor per defecte serà 10): "))
-        except (ValueError, TypeError):
-            k = 10
-
-        llista_similitud = []
-
-        # 1 Calcular similituds
-        for i,row in enumerate(array_ratings): #i = numero de fila del veï 
-            if not np.array_equal(row, user_row):
-                mask = (user_row != -1) & (row != -1)
-                if np.any(mask):
-                    denominator = (
-                        math.sqrt(np.sum(np.power(user_row[mask], 2))) *
-                        math.sqrt(np.sum(np.power(row[mask], 2)))
-                    )
-                    if denominator != 0:
-                        similitud = np.dot(user_row[mask], row[mask]) / denominator
-                    else:
-                        similitud = 0
-                else:
-                    similitud = 0
-
-                llista_similitud.append((i, similitud))
-
-        if not llista_similitud:
-            return False
+        k = self.get_k()
+
+        index = None if user_pos is None else self.veins_index(np.array([user_pos]), k)
+        ann = self.get_ann()
+        if index is not None:
+            # 1-2 Els k veïns més similars ja són a l'índex precalculat
+            veins, similituds = index[0][0], index[1][0]
+            valids = np.isfinite(similituds) #Posicions buides (-1 / -inf) quan hi ha menys de K candidats
+            veins, similituds = veins[valids], similituds[valids]
+            if len(veins) == 0:
+                return None
+        else:
+            # 1 Calcular similituds de l'usuari amb tots els usuaris alhora (o només amb els candidats de l'índex aproximat)
+            candidats = None if ann is None else ann.candidats(np.flatnonzero(user_row != -1))
+            veins, similituds = self.similituds(array_ratings, user_row, candidats)
 
-        # 2 Seleccionar els k veins més similars
-        llista_similitud = sorted(llista_similitud, key=lambda x: x[1], reverse=True)[:k] #Ordenem segons el score de més gran a més petit
+            if len(veins) == 0:
+                return None
 
-        # Step 3: Calculate scores for items not rated by the user
+            # 2 Seleccionar els k veins més similars
+            ordre = np.argsort(-similituds, kind="stable")[:k] #Ordenem segons el score de més gran a més petit (estable, com sorted)
+            veins, similituds = veins[ordre], similituds[ordre]
 
-        # Pre-càlculs per ser més eficients i l'array dels top-k veins 
+        # 3 Calcular la predicció per a tots els ítems alhora
         mitja_user = np.mean(user_row[user_row != -1]) #Esto lo podriamos hacer al iniciar en el pickle
-        veins_arrays = array_ratings[[sim[0] for sim in llista_similitud], :]
-        mitjas_veins = np.column_stack(np.array([np.mean(row[row != -1]) if np.any(row != -1) else 0 for row in veins_arrays]))  # Mean ratings of all neighbors
-        columna_similitud = np.column_stack(np.array([sim[1] for sim in llista_similitud])) # Similarities with top-k veins
+        return self.puntuacions(array_ratings, mitja_user, veins, similituds)
 
-        for item_id, col in self._dataset._pos_items.items(): #S'ha d'iterar per items no vists per l'user (columnes)
-            veins_col = np.column_stack(veins_arrays[:, col])  # Ratings of the current item by all neighbors
+    def puntuacions(self, array_ratings:MatriuRatings, mitja_user:float, veins:np.ndarray, similituds:np.ndarray) -> np.ndarray:
+        """
+        Calcula la predicció centrada en la mitjana per a tots els ítems a partir dels k veïns.
 
-            # Mask for neighbors who rated the item
-            veins_mask = veins_col != -1
+        Per a cada ítem: mitja_user + sum(sim * (r_veí - mitja_veí)) / sum(|sim|), sumant només
+        els veïns que l'han valorat. Si cap veí l'ha valorat la predicció és la mitjana de l'usuari.
 
-            # Calculate the numerator and denominator
-            numerator = np.sum( columna_similitud[veins_mask] * (veins_col[veins_mask] - mitjas_veins[veins_mask]) )
-            denominator = np.sum(np.abs(columna_similitud[veins_mask]))
+        Parameters
+        ----------
+        array_ratings : MatriuRatings
+            Matriu dispersa de valoracions.
+        mitja_user : float
+            Mitjana de les valoracions de l'usuari.
+        veins : np.ndarray
+            Files dels k veïns seleccionats.
+        similituds : np.ndarray
+            Similitud de l'usuari amb cada veí.
 
-            # Calculate the final score
-            if denominator != 0:
-                score = mitja_user + numerator / denominator
+        Returns
+        -------
+        np.ndarray
+            Vector de prediccions amb una posició per columna (ítem).
+        """
+        bloc = array_ratings.csr()[veins]  # k x ítems, només les valoracions existents
+        num_vots = np.diff(bloc.indptr)
+        sumes = np.asarray(bloc.sum(axis=1, dtype=np.float64)).ravel()
+        mitjas_veins = np.divide(sumes, num_vots, out=np.zeros(len(veins)), where=num_vots > 0)
+
+        # Valoracions centrades i màscara de valorats amb la mateixa estructura que el bloc
+        files_bloc = np.repeat(np.arange(len(veins)), num_vots)
+        centrades = bloc.data.astype(np.float64) - mitjas_veins[files_bloc]
+
+        n_items = bloc.shape[1]
+        numerator = np.bincount(bloc.indices, weights=similituds[files_bloc] * centrades, minlength=n_items)
+        denominator = np.bincount(bloc.indices, weights=np.abs(similituds)[files_bloc], minlength=n_items)
+
+        scores = np.full(n_items, mitja_user, dtype=np.float64)  # Per defecte la mitjana de l'usuari si cap veí ha valorat l'ítem
+        amb_veins = denominator != 0
+        scores[amb_veins] += numerator[amb_veins] / denominator[amb_veins]
+        return scores
+
+    def algoritme_batch(self, array_ratings:MatriuRatings, files:np.ndarray):
+        """
+        Calcula els scores d'un bloc d'usuaris amb operacions matriu-matriu.
+
+        Els k veïns de cada usuari es guarden en una matriu dispersa de pesos W (bloc x usuaris)
+        i les prediccions de tot el bloc són W @ (valoracions centrades) i |W| @ (màscara de valorats).
+
+        Parameters
+        ----------
+        array_ratings : MatriuRatings
+            Matriu dispersa de valoracions.
+        files : np.ndarray
+            Files dels usuaris del bloc.
+
+        Returns
+        -------
+        np.ndarray
+            Matriu (usuaris del bloc x ítems) de scores; NaN pels usuaris sense veïns o sense valoracions.
+        """
+        k = self.get_k(interactiu=False)
+        n_bloc, n_users = len(files), len(array_ratings)
+
+        # 1-2 Top-k veïns de cada usuari (índex precalculat, índex aproximat o similituds amb tots els usuaris)
+        veins, pesos = self.veins_bloc(array_ratings, files, k)
+        valids = np.isfinite(pesos)
+        files_w = np.nonzero(valids)[0]
+        W = sp.csr_matrix((pesos[valids], (files_w, veins[valids])), shape=(n_bloc, n_users))
+
+        # 3 Predicció centrada en la mitjana per a tots els usuaris i ítems del bloc
+        numerator = (W @ array_ratings.centrada()).toarray()
+        denominator = (abs(W) @ array_ratings.estructura()).toarray()
+
+        mitjanes = array_ratings.mitjanes_usuaris()[files]
+        mitjanes[array_ratings.num_vots_usuaris()[files] == 0] = np.nan
+        scores = np.repeat(mitjanes[:, np.newaxis], array_ratings.shape[1], axis=1)
+        amb_veins = denominator != 0
+        scores[amb_veins] += numerator[amb_veins] / denominator[amb_veins]
+        scores[~valids.any(axis=1)] = np.nan
+        return scores
+
+
+_CENTRADA_ITEMS = None  # (valoracions centrades per columnes, normes dels ítems, K) del procés que calcula similituds
+
+
+def _inicialitza_similituds_items(dades):
+    """
+    Inicialitza un procés que calcula blocs de la matriu de similituds entre ítems.
+
+    Parameters
+    ----------
+    dades : tuple or None
+        (valoracions centrades en CSC, normes dels ítems, K); None si ja s'ha heretat del procés pare (fork).
+    """
+    global _CENTRADA_ITEMS
+    if dades is not None:
+        _CENTRADA_ITEMS = dades
+
+
+def _top_k_items(bloc: tuple) -> tuple:
+    """
+    Calcula els K ítems més similars (cosinus ajustat) de cada ítem d'un bloc de columnes.
+
+    Parameters
+    ----------
+    bloc : tuple of int
+        (primera columna, última columna + 1) del bloc.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        (ítems, veïns, similituds) dels parells guardats; només es guarden similituds positives.
+    """
+    centrada, normes, K = _CENTRADA_ITEMS
+    inici, fi = bloc
+    productes = (centrada[:, inici:fi].T @ centrada).toarray()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        similituds = productes / (normes[inici:fi, np.newaxis] * normes[np.newaxis, :])
+    similituds[~np.isfinite(similituds)] = 0
+    similituds[np.arange(fi - inici), np.arange(inici, fi)] = 0  # Un ítem no és veí de si mateix
+
+    K = min(K, similituds.shape[1])
+    veins = np.argpartition(-similituds, K - 1, axis=1)[:, :K]
+    valors = np.take_along_axis(similituds, veins, axis=1)
+    positius = valors > 0
+    items = np.repeat(np.arange(inici, fi)[:, np.newaxis], K, axis=1)
+    return items[positius], veins[positius], valors[positius]
+
+
+class ColaboratiuItems(Recomenador):
+    """
+    Recomanador col·laboratiu ítem-ítem amb la matriu de similituds precalculada.
+
+    La similitud entre dos ítems és el cosinus ajustat (valoracions menys la mitjana de cada usuari) i
+    de cada ítem només es guarden els K veïns més similars amb similitud positiva, en una matriu
+    dispersa. La predicció d'un ítem és la mitjana de les valoracions de l'usuari als seus veïns,
+    ponderada per la similitud, i per a tots els ítems alhora és un producte dispers.
+
+    Attributes
+    ----------
+    _K : int
+        Veïns guardats per ítem.
+    _similituds : scipy.sparse.csr_matrix or None
+        Matriu (ítems x ítems) on la posició (j, i) és la similitud entre els ítems i i j si j és un dels K
+        veïns de i, o None si encara no s'ha calculat. Per files, així per predir només cal llegir les files
+        dels ítems valorats per l'usuari.
+    """
+
+    def __init__(self, dataset: Dataset, K: int = K_ITEMS_DEFECTE):
+        """
+        Inicialitza el recomanador; les similituds es calculen a la primera recomanació (vegeu prepara_model).
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Objecte dataset que conté usuaris, ítems i valoracions.
+        K : int, optional
+            Veïns guardats per ítem (default és K_ITEMS_DEFECTE).
+        """
+        super().__init__(dataset)
+        self._K = K
+        self._similituds = None
+
+    def prepara_model(self, workers: int = 1, mida_bloc: int = MIDA_BLOC):
+        """
+        Calcula la matriu dispersa amb els K veïns més similars de cada ítem.
+
+        Els ítems es processen per blocs de columnes, de manera que la memòria és (mida_bloc x ítems) i
+        no (ítems x ítems); els blocs es poden repartir entre processos.
+
+        Parameters
+        ----------
+        workers : int, optional
+            Processos per calcular els blocs; 1 ho fa tot en aquest procés i None fa servir tots els nuclis (default és 1).
+        mida_bloc : int, optional
+            Ítems per bloc (default és MIDA_BLOC).
+        """
+        global _CENTRADA_ITEMS
+        ratings = self._dataset.get_ratings()
+        centrada = ratings.centrada().tocsc()
+        normes = np.sqrt(np.asarray(centrada.multiply(centrada).sum(axis=0)).ravel())
+        n_items = ratings.shape[1]
+        blocs = [(i, min(i + mida_bloc, n_items)) for i in range(0, n_items, mida_bloc)]
+
+        workers = workers or os.cpu_count() or 1
+        _CENTRADA_ITEMS = (centrada, normes, self._K)
+        try:
+            if workers == 1:
+                resultats = [_top_k_items(bloc) for bloc in blocs]
             else:
-                score = mitja_user  # Default to the user's mean if no neighbors rated the item
-                
-            llista_prediccions.append((item_id, score)) # Guardem predicció
+                # Amb fork els processos hereten la matriu sense copiar-la; si no, es passa un cop a cada procés
+                heretat = mp.get_start_method() == "fork"
+                with ProcessPoolExecutor(max_workers=workers, initializer=_inicialitza_similituds_items,
+                                         initargs=(None if heretat else _CENTRADA_ITEMS,)) as pool:
+                    resultats = list(pool.map(_top_k_items, blocs))
+        finally:
+            _CENTRADA_ITEMS = None
+
+        items, veins, valors = (np.concatenate(parts) for parts in zip(*resultats)) if resultats else ([], [], [])
+        self._similituds = sp.csr_matrix((valors, (veins, items)), shape=(n_items, n_items))
+        self.invalida_cache()
+        logging.info(f"Similituds ítem-ítem calculades: {self._similituds.nnz} parells per {n_items} ítems")
+
+    def get_similituds(self) -> sp.csr_matrix:
+        """
+        Retorna la matriu de similituds entre ítems, calculant-la si encara no existeix.
 
-        return True
+        Returns
+        -------
+        scipy.sparse.csr_matrix
+            Similitud de cada veí (files) amb els ítems dels quals és veí (columnes).
+        """
+        if self._similituds is None:
+            self.prepara_model()
+        return self._similituds
 
+    def assegura_model(self):
+        """
+        Calcula les similituds entre ítems amb tots els nuclis si encara no existeixen.
+        """
+        if self._similituds is None:
+            self.prepara_model(workers=None)
 
-class BasatEnContinguts(Recomenador):
+    def algoritme(self, array_ratings:MatriuRatings, user_row:np.ndarray, user_pos:int = None):
+        """
+        Implementa l'algoritme col·laboratiu ítem-ítem.
+
+        Parameters
+        ----------
+        array_ratings : MatriuRatings
+            Matriu dispersa de valoracions.
+        user_row : np.ndarray
+            Vector de valoracions de l'usuari.
+        user_pos : int, optional
+            Fila de l'usuari (no es fa servir).
+
+        Returns
+        -------
+        np.ndarray or None
+            Scores de tots els ítems (NaN als ítems sense cap veí valorat per l'usuari), o None si l'usuari no ha valorat res.
+        """
+        valorats = np.flatnonzero(user_row != -1)
+        if len(valorats) == 0:
+            return None
+
+        # Només les files de la matriu de similituds dels ítems valorats per l'usuari
+        similituds = self.get_similituds()[valorats]
+        numerator = similituds.T @ user_row[valorats].astype(np.float64)
+        denominator = np.asarray(similituds.sum(axis=0)).ravel()
+
+        scores = np.full(len(user_row), np.nan)
+        amb_veins = denominator != 0
+        scores[amb_veins] = numerator[amb_veins] / denominator[amb_veins]
+        return scores
+
+    def algoritme_batch(self, array_ratings:MatriuRatings, files:np.ndarray):
+        """
+        Calcula els scores d'un bloc d'usuaris amb dos productes dispersos.
+
+        Parameters
+        ----------
+        array_ratings : MatriuRatings
+            Matriu dispersa de valoracions.
+        files : np.ndarray
+            Files dels usuaris del bloc.
+
+        Returns
+        -------
+        np.ndarray
+            Matriu (usuaris del bloc x ítems) de scores; NaN als ítems sense cap veí valorat.
+        """
+        similituds = self.get_similituds()
+        numerator = (array_ratings.csr()[files].astype(np.float64) @ similituds).toarray()
+        denominator = (array_ratings.estructura()[files] @ similituds).toarray()
+
+        scores = np.full(numerator.shape, np.nan)
+        amb_veins = denominator != 0
+        scores[amb_veins] = numerator[amb_veins] / denominator[amb_veins]
+        return scores
+
+
+class Factoritzacio(Recomenador):
     """
-    Recomanador basat en continguts.
+    Recomanador per factorització de la matriu de valoracions amb mínims quadrats alternats (ALS).
 
-    Utilitza les característiques dels ítems (com gèneres) per calcular un perfil de l'usuari
-    i recomanar ítems similars als que ja ha valorat positivament.
+    Cada usuari i cada ítem tenen un vector de factors de dimensió rang, i la predicció és la mitjana
+    global més el producte escalar dels dos vectors. Els factors s'ajusten només sobre les valoracions
+    existents, alternant: amb els factors dels ítems fixos, els de cada usuari són la solució d'un
+    problema de mínims quadrats regularitzat, i al revés.
+
+    Attributes
+    ----------
+    _rang : int
+        Dimensió dels factors.
+    _iteracions : int
+        Iteracions d'ALS.
+    _regularitzacio : float
+        Pes de la regularització L2 (per valoració).
+    _llavor : int
+        Llavor de la inicialització dels factors.
+    _mitjana : float
+        Mitjana global de les valoracions.
+    _factors_usuaris : np.ndarray or None
+        Factors de cada usuari (usuaris x rang), o None si el model no s'ha entrenat.
+    _factors_items : np.ndarray or None
+        Factors de cada ítem (ítems x rang).
+    _rang_valors : tuple
+        (mínim, màxim) de les valoracions, per limitar les prediccions.
     """
 
-    def algoritme(self, array_ratings:np.ndarray, user_row:np.ndarray, llista_prediccions:list):
+    def __init__(self, dataset: Dataset, rang: int = RANG_DEFECTE, iteracions: int = ITERACIONS_DEFECTE,
+                 regularitzacio: float = REGULARITZACIO_DEFECTE, llavor: int = 0):
         """
-        Implementa el filtratge basat en continguts utilitzant TF-IDF dels gèneres.
+        Inicialitza el recomanador; els factors s'entrenen a la primera recomanació (vegeu entrena).
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Objecte dataset que conté usuaris, ítems i valoracions.
+        rang : int, optional
+            Dimensió dels factors (default és RANG_DEFECTE).
+        iteracions : int, optional
+            Iteracions d'ALS (default és ITERACIONS_DEFECTE).
+        regularitzacio : float, optional
+            Pes de la regularització L2 (default és REGULARITZACIO_DEFECTE).
+        llavor : int, optional
+            Llavor de la inicialització dels factors (default és 0).
+        """
+        super().__init__(dataset)
+        self._rang = rang
+        self._iteracions = iteracions
+        self._regularitzacio = regularitzacio
+        self._llavor = llavor
+        self._mitjana = 0.0
+        self._factors_usuaris = None
+        self._factors_items = None
+        self._rang_valors = (0.0, 0.0)
+
+    def entrena(self):
+        """
+        Entrena els factors d'usuaris i ítems amb ALS sobre les valoracions existents.
+
+        Tots els sistemes d'un pas es resolen alhora (vegeu _resol_factors), de manera que el cost està en
+        productes de matrius i solucions per lots que fan servir BLAS/LAPACK amb diversos fils.
+        """
+        ratings = self._dataset.get_ratings()
+        valors = ratings.valors().astype(np.float64)
+        self._mitjana = float(valors.mean()) if len(valors) else 0.0
+        self._rang_valors = (float(valors.min()), float(valors.max())) if len(valors) else (0.0, 0.0)
+
+        csr = ratings.csr()
+        residus = sp.csr_matrix((valors - self._mitjana, csr.indices, csr.indptr), shape=csr.shape)
+        residus_t = residus.T.tocsr()
+        estructura, estructura_t = ratings.estructura(), ratings.estructura().T.tocsr()
+
+        rng = np.random.default_rng(self._llavor)
+        usuaris = rng.normal(0, 0.1, (csr.shape[0], self._rang))
+        items = rng.normal(0, 0.1, (csr.shape[1], self._rang))
+        files = np.repeat(np.arange(csr.shape[0]), np.diff(csr.indptr))
+        for iteracio in range(self._iteracions):
+            usuaris = self._resol_factors(residus, estructura, items)
+            items = self._resol_factors(residus_t, estructura_t, usuaris)
+            errors = np.einsum("ij,ij->i", usuaris[files], items[csr.indices]) - residus.data
+            logging.info(f"ALS iteració {iteracio + 1}/{self._iteracions}: RMSE d'entrenament {np.sqrt(np.mean(errors ** 2)):.4f}")
+
+        self._factors_usuaris = usuaris
+        self._factors_items = items
+        self.invalida_cache()
+
+    def _resol_factors(self, valors: sp.csr_matrix, estructura: sp.csr_matrix, fixos: np.ndarray, mida_bloc: int = 4096) -> np.ndarray:
+        # Per a cada fila u: (sum_i f_i f_i^T + reg * n_u * I) x_u = sum_i r_ui f_i, sobre els i valorats.
+        # Les sumes de f_i f_i^T de totes les files alhora són estructura @ (productes externs aplanats);
+        # com que són simètriques només es calcula el triangle superior.
+        rang = fixos.shape[1]
+        sup_i, sup_j = np.triu_indices(rang)
+        externs = fixos[:, sup_i] * fixos[:, sup_j]
+        num_vots = np.diff(estructura.indptr)
+        resultat = np.empty((valors.shape[0], rang))
+        for inici in range(0, valors.shape[0], mida_bloc):
+            fi = min(inici + mida_bloc, valors.shape[0])
+            triangle = estructura[inici:fi] @ externs
+            grams = np.empty((fi - inici, rang, rang))
+            grams[:, sup_i, sup_j] = triangle
+            grams[:, sup_j, sup_i] = triangle
+            grams += (self._regularitzacio * np.maximum(num_vots[inici:fi], 1))[:, np.newaxis, np.newaxis] * np.eye(rang)
+            termes = valors[inici:fi] @ fixos
+            resultat[inici:fi] = np.linalg.solve(grams, termes[:, :, np.newaxis])[:, :, 0]
+        return resultat
+
+    def configura(self, rang: int = None, iteracions: int = None):
+        """
+        Canvia el rang o les iteracions; si canvien, els factors s'hauran de tornar a entrenar.
 
         Parameters
         ----------
-        array_ratings : np.ndarray
-            Matriu de valoracions.
+        rang : int, optional
+            Nova dimensió dels factors (None no la canvia).
+        iteracions : int, optional
+            Noves iteracions d'ALS (None no les canvia).
+        """
+        nou_rang = self._rang if rang is None else rang
+        noves_iteracions = self._iteracions if iteracions is None else iteracions
+        if (nou_rang, noves_iteracions) != (self._rang, self._iteracions):
+            self._rang, self._iteracions = nou_rang, noves_iteracions
+            self._factors_usuaris = self._factors_items = None
+            self.invalida_cache()
+
+    def get_factors(self) -> tuple:
+        """
+        Retorna els factors entrenats, entrenant el model si encara no s'ha fet.
+
+        Returns
+        -------
+        tuple of np.ndarray
+            (factors dels usuaris, factors dels ítems).
+        """
+        if self._factors_usuaris is None:
+            self.entrena()
+        return self._factors_usuaris, self._factors_items
+
+    def assegura_model(self):
+        """
+        Entrena els factors si encara no s'han entrenat.
+        """
+        self.get_factors()
+
+    def algoritme(self, array_ratings:MatriuRatings, user_row:np.ndarray, user_pos:int = None):
+        """
+        Prediu tots els ítems d'un usuari amb un sol producte matriu-vector.
+
+        Parameters
+        ----------
+        array_ratings : MatriuRatings
+            Matriu dispersa de valoracions.
         user_row : np.ndarray
             Vector de valoracions de l'usuari.
-        llista_prediccions : list
-            Llista on s'afegeixen tuples (item_id, score).
+        user_pos : int, optional
+            Fila de l'usuari; si no es dona, els seus factors es calculen a partir de user_row amb els factors dels ítems.
 
         Returns
         -------
-        bool
-            True si l'algoritme s'ha executat correctament.
+        np.ndarray
+            Scores de tots els ítems.
+        """
+        factors_usuaris, factors_items = self.get_factors()
+        if user_pos is not None:
+            factors = factors_usuaris[user_pos]
+        else:
+            valorats = user_row != -1
+            fila = sp.csr_matrix(np.where(valorats, user_row - self._mitjana, 0))
+            estructura = sp.csr_matrix(valorats.astype(np.float64))
+            factors = self._resol_factors(fila, estructura, factors_items)[0]
+        return np.clip(self._mitjana + factors_items @ factors, *self._rang_valors)
+
+    def algoritme_batch(self, array_ratings:MatriuRatings, files:np.ndarray):
+        """
+        Calcula els scores d'un bloc d'usuaris amb un producte de matrius.
+
+        Parameters
+        ----------
+        array_ratings : MatriuRatings
+            Matriu dispersa de valoracions.
+        files : np.ndarray
+            Files dels usuaris del bloc.
+
+        Returns
+        -------
+        np.ndarray
+            Matriu (usuaris del bloc x ítems) de scores.
+        """
+        factors_usuaris, factors_items = self.get_factors()
+        return np.clip(self._mitjana + factors_usuaris[files] @ factors_items.T, *self._rang_valors)
+
+
+class BasatEnContinguts(Recomenador):
+    """
+    Recomanador basat en continguts.
+
+    Utilitza les característiques dels ítems (com gèneres) per calcular un perfil de l'usuari
+    i recomanar ítems similars als que ja ha valorat positivament.
+
+    Attributes
+    ----------
+    _tfidf : TfidfVectorizer or None
+        Vectoritzador ajustat sobre els gèneres dels ítems vàlids.
+    _tfidf_matrix : scipy.sparse.csr_matrix or None
+        Matriu TF-IDF dispersa (ítems vàlids x vocabulari).
+    _idx_valids : np.ndarray or None
+        Columnes dels ítems amb gèneres vàlids, en el mateix ordre que les files de _tfidf_matrix.
+    _normes_items : np.ndarray or None
+        Norma de cada fila de _tfidf_matrix.
+    """
+
+    def __init__(self, dataset: Dataset):
+        """
+        Inicialitza el recomanador; el model TF-IDF es construeix a la primera recomanació.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Objecte dataset que conté usuaris, ítems i valoracions.
+        """
+        super().__init__(dataset)
+        self._tfidf = None
+        self._tfidf_matrix = None
+        self._idx_valids = None
+        self._normes_items = None
+
+    def prepara_model(self):
+        """
+        Ajusta el TF-IDF sobre els gèneres dels ítems vàlids una sola vegada i en guarda el resultat.
+
+        Raises
+        ------
+        NotImplementedError
+            Si el dataset no té gèneres (Books).
+        ValueError
+            Si cap ítem té gèneres vàlids.
         """
         # 1. Obtenir els gèneres (característiques dels ítems)
-        try:
-            item_features = self._dataset.get_genres()
-        except:
-            print("No es pot utilitzar l'algoritme basat en continguts amb el dataset Books ja que els items manquen els generes o categories.")
-            return False
+        item_features = self._dataset.get_genres()
 
         # 1.1 Filtrar ítems que tinguin gèneres vàlids
         idx_valids = [i for i, g in enumerate(item_features) if g.strip().lower() != "(no genres listed)"]
         if not idx_valids:
             raise ValueError("Cap ítem té gèneres vàlids.")
 
-        # 1.2 Filtrar els arrays corresponents
-        item_features_filtrats = [item_features[i] for i in idx_valids]
-        user_row_filtrat = user_row[idx_valids]
-
-        # 1.3 Crear matriu TF-IDF només amb els ítems vàlids
+        # 1.2 Crear matriu TF-IDF (dispersa) només amb els ítems vàlids
         tfidf = TfidfVectorizer(stop_words='english')
-        tfidf_matrix = tfidf.fit_transform(item_features_filtrats).toarray()
+        tfidf_matrix = tfidf.fit_transform([item_features[i] for i in idx_valids]).tocsr()
+
+        self._tfidf = tfidf
+        self._tfidf_matrix = tfidf_matrix
+        self._idx_valids = np.array(idx_valids)
+        self._normes_items = np.sqrt(np.asarray(tfidf_matrix.multiply(tfidf_matrix).sum(axis=1)).ravel())
+        self.invalida_cache()
+
+    def assegura_model(self):
+        """
+        Ajusta el TF-IDF si encara no s'ha ajustat; si el dataset no té gèneres no fa res.
+        """
+        if self._tfidf_matrix is None:
+            try:
+                self.prepara_model()
+            except NotImplementedError:
+                logging.warning("El dataset no té gèneres: no es pot preparar el model basat en continguts")
+
+    def algoritme(self, array_ratings:MatriuRatings, user_row:np.ndarray, user_pos:int = None):
+        """
+        Implementa el filtratge basat en continguts utilitzant TF-IDF dels gèneres.
 
-        # 1.4 Filtrar les valoracions reals de l’usuari (no -1)
+        Parameters
+        ----------
+        array_ratings : MatriuRatings
+            Matriu dispersa de valoracions.
+        user_row : np.ndarray
+            Vector de valoracions de l'usuari.
+        user_pos : int, optional
+            Fila de l'usuari (no es fa servir).
+
+        Returns
+        -------
+        np.ndarray or None
+            Scores de tots els ítems (NaN als ítems sense gèneres vàlids), o None si el dataset no té gèneres.
+        """
+        # 1. Model TF-IDF (es calcula només la primera vegada)
+        if self._tfidf_matrix is None:
+            try:
+                self.prepara_model()
+            except NotImplementedError:
+                print("No es pot utilitzar l'algoritme basat en continguts amb el dataset Books ja que els items manquen els generes o categories.")
+                return None
+
+        # 1.1 Filtrar les valoracions reals de l’usuari (no -1) als ítems vàlids
+        user_row_filtrat = user_row[self._idx_valids]
         mask_valorats = user_row_filtrat != -1
         if not np.any(mask_valorats):
             raise ValueError("L'usuari no ha valorat cap ítem vàlid.")
 
-        user_row_valorats = user_row_filtrat[mask_valorats]
-        tfidf_valorats = tfidf_matrix[mask_valorats]
-
-        # 2.  Calcular el perfil
-        denominator = np.sum(np.abs(user_row_valorats))
+        # 2.  Calcular el perfil (producte dispers: valoracions x TF-IDF)
+        valoracions = np.where(mask_valorats, user_row_filtrat, 0)
+        denominator = np.sum(np.abs(valoracions))
         if denominator == 0:
             raise ZeroDivisionError("Valoracions del usuari totes zero.")
-        perfil = np.sum(user_row_valorats[:, np.newaxis] * tfidf_valorats, axis=0) / denominator
+        perfil = (self._tfidf_matrix.T @ valoracions) / denominator
 
         # 3. Similitud cosinus
-        numerador = np.dot(tfidf_matrix, perfil.T)
-        normes_items = np.linalg.norm(tfidf_matrix, axis=1)
+        numerador = self._tfidf_matrix @ perfil
         norma_perfil = np.linalg.norm(perfil)
 
-        if norma_perfil == 0 or np.any(normes_items == 0):
+        if norma_perfil == 0 or np.any(self._normes_items == 0):
             raise ValueError("Perfil buit o hi ha ítems amb vector nul.")
 
-        S = numerador / (normes_items * norma_perfil)
+        S = numerador / (self._normes_items * norma_perfil)
 
         # 4. Escalar per obtenir puntuació final
         pfinal = S * self._dataset.get_pmax()
 
-        # 5. Afegir les prediccions
-        for i, idx in enumerate(idx_valids):
-            score = pfinal[i]
-            llista_prediccions.append((self._dataset.get_item_id(idx), score))
+        # 5. Retornar les prediccions en ordre de columnes
+        scores = np.full(len(user_row), np.nan)
+        scores[self._idx_valids] = pfinal
+        return scores
 
-        return True
+    def algoritme_batch(self, array_ratings:MatriuRatings, files:np.ndarray):
+        """
+        Calcula els scores d'un bloc d'usuaris amb operacions matriu-matriu.
+
+        Els perfils de tot el bloc es calculen amb un sol producte dispers i la similitud cosinus
+        amb un segon producte. Els usuaris sense valoracions vàlides reben NaN en lloc d'una excepció.
+
+        Parameters
+        ----------
+        array_ratings : MatriuRatings
+            Matriu dispersa de valoracions.
+        files : np.ndarray
+            Files dels usuaris del bloc.
+
+        Returns
+        -------
+        np.ndarray or None
+            Matriu (usuaris del bloc x ítems) de scores, o None si el dataset no té gèneres.
+        """
+        if self._tfidf_matrix is None:
+            try:
+                self.prepara_model()
+            except NotImplementedError:
+                print("No es pot utilitzar l'algoritme basat en continguts amb el dataset Books ja que els items manquen els generes o categories.")
+                return None
+        if np.any(self._normes_items == 0):
+            raise ValueError("Hi ha ítems amb vector nul.")
+
+        user_rows = array_ratings.files(files)[:, self._idx_valids]
+        valoracions = np.where(user_rows != -1, user_rows, 0)
+        denominator = np.sum(np.abs(valoracions), axis=1)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            perfils = (self._tfidf_matrix.T @ valoracions.T).T / denominator[:, np.newaxis]
+            numerador = (self._tfidf_matrix @ perfils.T).T
+            normes_perfils = np.linalg.norm(perfils, axis=1)
+            S = numerador / (self._normes_items[np.newaxis, :] * normes_perfils[:, np.newaxis])
+        S[(denominator == 0) | (normes_perfils == 0)] = np.nan
+
+        scores = np.full((len(files), array_ratings.shape[1]), np.nan)
+        scores[:, self._idx_valids] = S * self._dataset.get_pmax()
+        return scores
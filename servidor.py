@@ -0,0 +1,294 @@
+# Servei HTTP local de recomanacions (només llibreria estàndard) que manté el recomanador carregat
+
+import argparse, asyncio, json, logging, os, time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+import multiprocessing as mp
+from main import DATASETS, METODES, carrega_recomanador, limit, nom_snapshot
+from recomenador import Colaboratiu
+from dataset import MAX_ITEMS_DEFECTE, MAX_USERS_DEFECTE
+
+"""
+Servidor HTTP asíncron que carrega un recomanador una sola vegada i respon peticions concurrents.
+
+El bucle d'esdeveniments només llegeix les peticions i escriu les respostes; el càlcul dels scores
+es fa en un pool de processos que comparteixen el recomanador (com a avaluacio.py), de manera que
+una petició lenta no bloqueja les altres. Cada petició s'escriu al log amb la seva latència.
+
+Endpoints
+---------
+GET /recommend?user=ID&n=N
+    Les N millors recomanacions de l'usuari (per defecte 5).
+GET /predict?user=ID&item=ID[&item=ID...]
+    La predicció de l'usuari per a cada ítem (null si l'algoritme no en pot fer).
+
+Usage
+-----
+python servidor.py {MovieLens100k, Books, VideoGames} {Simple, Col·laboratiu, Col·laboratiu-ítems, Factorització, Contingut} [--port P] [--workers W]
+"""
+
+MAX_CAPCALERES = 100  # Línies de capçalera com a molt per petició
+
+_RECOMANADOR = None  # Recomanador del procés (heretat amb fork o rebut a l'inicialitzador)
+
+
+def _inicialitza_worker(recomanador):
+    """
+    Inicialitza un procés treballador amb el recomanador compartit.
+
+    Parameters
+    ----------
+    recomanador : Recomenador or None
+        Recomanador a utilitzar; None si ja s'ha heretat del procés pare (fork).
+    """
+    global _RECOMANADOR
+    if recomanador is not None:
+        _RECOMANADOR = recomanador
+
+
+def _recomana(user_id: str, n: int):
+    """
+    Calcula les recomanacions d'un usuari dins d'un procés treballador.
+
+    Parameters
+    ----------
+    user_id : str
+        Identificador de l'usuari (ha d'existir).
+    n : int
+        Nombre de recomanacions.
+
+    Returns
+    -------
+    list of tuple or None
+        Llista de (item_id, score), o None si l'algoritme no es pot aplicar al dataset.
+    """
+    bloc = next(_RECOMANADOR.recomanacions_per_blocs([user_id], n))
+    return None if bloc is None else [(str(item_id), float(score)) for item_id, score in bloc[user_id]]
+
+
+def _prediu(user_id: str, item_ids: list):
+    """
+    Calcula la predicció d'un usuari per a uns ítems dins d'un procés treballador.
+
+    Parameters
+    ----------
+    user_id : str
+        Identificador de l'usuari (ha d'existir).
+    item_ids : list of str
+        Identificadors dels ítems.
+
+    Returns
+    -------
+    list of float or None
+        Predicció de cada ítem (None si no n'hi ha o l'ítem no existeix), o None si l'algoritme no es pot aplicar.
+    """
+    dataset = _RECOMANADOR._dataset
+    fila = dataset.get_row_user(user_id)
+    scores = _RECOMANADOR.algoritme_batch(dataset.get_ratings(), np.array([fila]))
+    if scores is None:
+        return None
+    cols = dataset.get_items().rows_for(item_ids)
+    return [None if col < 0 or np.isnan(scores[0, col]) else float(scores[0, col]) for col in cols]
+
+
+class ErrorPeticio(Exception):
+    """
+    Error d'una petició que es respon al client amb un codi HTTP.
+
+    Parameters
+    ----------
+    estat : HTTPStatus
+        Codi de la resposta.
+    missatge : str
+        Descripció de l'error.
+    """
+
+    def __init__(self, estat: HTTPStatus, missatge: str):
+        super().__init__(missatge)
+        self.estat = estat
+
+
+class Servidor:
+    """
+    Servidor HTTP asíncron de recomanacions.
+
+    Parameters
+    ----------
+    recomanador : Recomenador
+        Recomanador ja carregat, amb els paràmetres fixats.
+    workers : int, optional
+        Processos del pool de càlcul (default és os.cpu_count()).
+
+    Attributes
+    ----------
+    _recomanador : Recomenador
+        Recomanador que respon les peticions.
+    _pool : ProcessPoolExecutor
+        Pool on es calculen els scores.
+    """
+
+    def __init__(self, recomanador, workers: int = None):
+        global _RECOMANADOR
+        self._recomanador = recomanador
+        # Amb fork els processos hereten el recomanador sense copiar-lo; si no, es passa un cop a cada procés
+        _RECOMANADOR = recomanador
+        heretat = mp.get_start_method() == "fork"
+        self._pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=_inicialitza_worker,
+                                         initargs=(None if heretat else recomanador,))
+
+    async def serveix(self, host: str = "127.0.0.1", port: int = 8000):
+        """
+        Escolta peticions fins que s'atura el procés.
+
+        Parameters
+        ----------
+        host : str, optional
+            Adreça on escoltar (default és '127.0.0.1').
+        port : int, optional
+            Port on escoltar (default és 8000).
+        """
+        servidor = await asyncio.start_server(self.atendre, host, port)
+        logging.info(f"Servidor escoltant a http://{host}:{port}")
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            self._pool.shutdown(cancel_futures=True)
+
+    async def atendre(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Llegeix una petició HTTP, la respon i escriu la latència al log.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            Flux d'entrada de la connexió.
+        writer : asyncio.StreamWriter
+            Flux de sortida de la connexió.
+        """
+        inici = time.perf_counter()
+        metode, ruta = "-", "-"
+        try:
+            linia = (await reader.readline()).decode("latin-1").strip()
+            for _ in range(MAX_CAPCALERES):  # Les capçaleres no es fan servir
+                if (await reader.readline()) in (b"\r\n", b"\n", b""):
+                    break
+            parts = linia.split(" ")
+            if len(parts) != 3:
+                raise ErrorPeticio(HTTPStatus.BAD_REQUEST, "Línia de petició no vàlida.")
+            metode, ruta = parts[0], parts[1]
+            estat, cos = HTTPStatus.OK, await self.resposta(metode, ruta)
+        except ErrorPeticio as e:
+            estat, cos = e.estat, {"error": str(e)}
+        except Exception as e:
+            logging.exception(f"Error responent {metode} {ruta}")
+            estat, cos = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+        dades = json.dumps(cos, ensure_ascii=False).encode("utf-8")
+        writer.write(f"HTTP/1.1 {estat.value} {estat.phrase}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(dades)}\r\nConnection: close\r\n\r\n".encode("latin-1") + dades)
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+        logging.info(f"{metode} {ruta} {estat.value} {(time.perf_counter() - inici) * 1000:.1f}ms")
+
+    async def resposta(self, metode: str, ruta: str) -> dict:
+        """
+        Calcula el cos de la resposta d'una petició.
+
+        Parameters
+        ----------
+        metode : str
+            Mètode HTTP.
+        ruta : str
+            Ruta amb els paràmetres de la petició.
+
+        Returns
+        -------
+        dict
+            Cos de la resposta (es retorna en JSON).
+
+        Raises
+        ------
+        ErrorPeticio
+            Si el mètode, la ruta o els paràmetres no són vàlids, o l'usuari no existeix.
+        """
+        if metode != "GET":
+            raise ErrorPeticio(HTTPStatus.METHOD_NOT_ALLOWED, f"Mètode no permès: {metode}")
+        url = urlsplit(ruta)
+        parametres = parse_qs(url.query)
+        if url.path not in ("/recommend", "/predict"):
+            raise ErrorPeticio(HTTPStatus.NOT_FOUND, f"Ruta no trobada: {url.path}")
+
+        user_id = parametres.get("user", [None])[0]
+        if user_id is None:
+            raise ErrorPeticio(HTTPStatus.BAD_REQUEST, "Falta el paràmetre user.")
+        if not self._recomanador.has_user(user_id):
+            raise ErrorPeticio(HTTPStatus.NOT_FOUND, f"Usuari no trobat: {user_id}")
+
+        loop = asyncio.get_running_loop()
+        if url.path == "/recommend":
+            try:
+                n = int(parametres.get("n", ["5"])[0])
+            except ValueError:
+                n = 0
+            if n <= 0:
+                raise ErrorPeticio(HTTPStatus.BAD_REQUEST, "El paràmetre n ha de ser un enter positiu.")
+            recomanacions = await loop.run_in_executor(self._pool, _recomana, user_id, n)
+            if recomanacions is None:
+                raise ErrorPeticio(HTTPStatus.UNPROCESSABLE_ENTITY, "L'algoritme no es pot aplicar a aquest dataset.")
+            return {"user_id": user_id, "recomanacions": [{"item_id": i, "score": s} for i, s in recomanacions]}
+
+        item_ids = parametres.get("item", [])
+        if not item_ids:
+            raise ErrorPeticio(HTTPStatus.BAD_REQUEST, "Falta el paràmetre item.")
+        prediccions = await loop.run_in_executor(self._pool, _prediu, user_id, item_ids)
+        if prediccions is None:
+            raise ErrorPeticio(HTTPStatus.UNPROCESSABLE_ENTITY, "L'algoritme no es pot aplicar a aquest dataset.")
+        return {"user_id": user_id, "prediccions": [{"item_id": i, "score": s} for i, s in zip(item_ids, prediccions)]}
+
+
+def main():
+    """
+    Carrega el recomanador i engega el servidor des de la línia de comandes.
+    """
+    parser = argparse.ArgumentParser(description="Servei HTTP local de recomanacions que manté el recomanador carregat.")
+    parser.add_argument("dataset", choices=DATASETS, help="Conjunt de dades a utilitzar.")
+    parser.add_argument("method", choices=METODES, help="Algoritme de recomanació.")
+    parser.add_argument("--host", default="127.0.0.1", help="Adreça on escoltar.")
+    parser.add_argument("--port", type=int, default=8000, help="Port on escoltar.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processos que calculen els scores.")
+    parser.add_argument("--k", type=int, default=None, help="Nombre de veïns (Col·laboratiu).")
+    parser.add_argument("--min-vots", type=int, default=None, help="Vots mínims (Simple).")
+    parser.add_argument("--mmap", action="store_true", help="Mapar la matriu de valoracions a memòria.")
+    parser.add_argument("--max-items", type=limit, default=MAX_ITEMS_DEFECTE, help="Nombre màxim d'ítems de Books i VideoGames (0 = sense límit).")
+    parser.add_argument("--max-usuaris", type=limit, default=MAX_USERS_DEFECTE, help="Nombre màxim d'usuaris de Books i VideoGames (0 = sense límit).")
+    parser.add_argument("--index-veins", type=int, default=None, metavar="K", help="Precalcular els K veïns més similars de cada usuari (Col·laboratiu).")
+    parser.add_argument("--log", default=None, help="Fitxer del log de peticions (per defecte la sortida d'errors).")
+    args = parser.parse_args()
+
+    logging.basicConfig(filename=args.log, level=logging.INFO, format='%(asctime)s | %(name)s | %(levelname)s | %(message)s')
+
+    r = carrega_recomanador(args.dataset, args.method, nom_snapshot(args.dataset, args.method, args.max_items, args.max_usuaris),
+                            args.mmap, args.max_items, args.max_usuaris)
+    if args.k is not None:
+        r._k = args.k
+    if args.min_vots is not None:
+        r._min_vots = args.min_vots
+    if args.index_veins and isinstance(r, Colaboratiu):
+        r.construeix_index(args.index_veins)
+    r.assegura_model()  # Abans de crear el pool, així els processos hereten el model en lloc d'ajustar-lo cadascun
+
+    try:
+        asyncio.run(Servidor(r, args.workers).serveix(args.host, args.port))
+    except KeyboardInterrupt:
+        logging.info("Servidor aturat")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+import json, os, pickle, zlib, lzma, datetime
+
+#Versió del format de snapshot; carrega() rebutja les versions que no coneix
+VERSIO_SNAPSHOT = 1
+COMPRESSIONS = (None, "zlib", "lzma")
+
+NOM_MANIFEST = "manifest.json"
+DIRECTORI_MATRIU = "matriu"
+
+
+def escriu_seccio(path: str, objecte, compressio: str = None) -> int:
+    """
+    Escriu un objecte com a secció del snapshot (pickle, opcionalment comprimit).
+
+    Parameters
+    ----------
+    path : str
+        Fitxer de la secció.
+    objecte : object
+        Objecte a desar.
+    compressio : str, optional
+        None, 'zlib' o 'lzma' (default és None).
+
+    Returns
+    -------
+    int
+        Mida en bytes de la secció escrita.
+
+    Raises
+    ------
+    ValueError
+        Si la compressió no és vàlida.
+    """
+    dades = pickle.dumps(objecte, protocol=pickle.HIGHEST_PROTOCOL)
+    match compressio:
+        case None:
+            pass
+        case "zlib":
+            dades = zlib.compress(dades)
+        case "lzma":
+            dades = lzma.compress(dades)
+        case _:
+            raise ValueError(f"Compressió no vàlida: {compressio}")
+    temporal = path + ".tmp"
+    with open(temporal, "wb") as fitxer:
+        fitxer.write(dades)
+    os.replace(temporal, path)
+    return len(dades)
+
+
+def llegeix_seccio(path: str, compressio: str = None):
+    """
+    Llegeix una secció escrita amb escriu_seccio.
+
+    Parameters
+    ----------
+    path : str
+        Fitxer de la secció.
+    compressio : str, optional
+        Compressió amb què es va escriure (default és None).
+
+    Returns
+    -------
+    object
+        Objecte desat.
+    """
+    with open(path, "rb") as fitxer:
+        dades = fitxer.read()
+    match compressio:
+        case "zlib":
+            dades = zlib.decompress(dades)
+        case "lzma":
+            dades = lzma.decompress(dades)
+    return pickle.loads(dades)
+
+
+def escriu_manifest(directori: str, manifest: dict):
+    """
+    Escriu el manifest del snapshot; s'escriu l'últim i marca el snapshot com a complet.
+
+    Parameters
+    ----------
+    directori : str
+        Directori del snapshot.
+    manifest : dict
+        Contingut del manifest (seccions, classes, compressió...).
+    """
+    manifest = dict(manifest, versio=VERSIO_SNAPSHOT, creat=datetime.datetime.now().isoformat(timespec="seconds"))
+    path = os.path.join(directori, NOM_MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf-8") as fitxer:
+        json.dump(manifest, fitxer, indent=2, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+def llegeix_manifest(directori: str) -> dict:
+    """
+    Llegeix i valida el manifest d'un snapshot.
+
+    Parameters
+    ----------
+    directori : str
+        Directori del snapshot.
+
+    Returns
+    -------
+    dict
+        Contingut del manifest.
+
+    Raises
+    ------
+    FileNotFoundError
+        Si el directori no conté cap snapshot complet.
+    ValueError
+        Si la versió del snapshot no és compatible.
+    """
+    path = os.path.join(directori, NOM_MANIFEST)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"No es troba cap snapshot a: {directori}")
+    with open(path, "r", encoding="utf-8") as fitxer:
+        manifest = json.load(fitxer)
+    if manifest.get("versio") != VERSIO_SNAPSHOT:
+        raise ValueError(f"Versió de snapshot no compatible: {manifest.get('versio')} (s'esperava {VERSIO_SNAPSHOT})")
+    return manifest
+
+
+def es_snapshot(directori: str) -> bool:
+    """
+    Indica si un directori conté un snapshot complet.
+
+    Parameters
+    ----------
+    directori : str
+        Directori a comprovar.
+
+    Returns
+    -------
+    bool
+        True si hi ha un manifest.
+    """
+    return os.path.isfile(os.path.join(directori, NOM_MANIFEST))
@@ -0,0 +1,88 @@
+import numpy as np
+from dataset import Dataset
+from ratings import MatriuRatings
+from ids import TaulaIds
+from Items import Movie
+from User import User
+from recomenador import Colaboratiu
+
+
+class DatasetMemoria(Dataset):
+    """
+    Dataset petit en memòria per a les proves (sense fitxers font ni cache).
+
+    Parameters
+    ----------
+    matriu : np.ndarray
+        Valoracions (usuaris x ítems), amb 0 on no hi ha valoració.
+    """
+
+    def __init__(self, matriu: np.ndarray):
+        self._matriu = np.asarray(matriu, dtype=np.float32)
+        super().__init__()
+
+    def carrega_ratings(self) -> MatriuRatings:
+        self._ids_users = self.carrega_users()
+        self._ids_items = self.carrega_items()
+        files, columnes = np.nonzero(self._matriu)
+        ratings = MatriuRatings(files, columnes, self._matriu[files, columnes], self._matriu.shape)
+        self.set_pmax(ratings.max())
+        return ratings
+
+    def carrega_users(self) -> TaulaIds:
+        self._users = [User(f"U{i}") for i in range(self._matriu.shape[0])]
+        return TaulaIds(user.get_id() for user in self._users)
+
+    def carrega_items(self) -> TaulaIds:
+        self._items = [Movie(f"I{j}", f"Pel·lícula {j}", "2000", "Drama") for j in range(self._matriu.shape[1])]
+        return TaulaIds(item.get_id() for item in self._items)
+
+
+# U0 i U1 són idèntics (no són veïns entre ells): amb K=3 a U0 només li queden 2 candidats reals
+MATRIU_DUPLICATS = [[5, 3, 0, 0, 0],
+                    [5, 3, 0, 0, 0],
+                    [4, 2, 4, 5, 3],
+                    [5, 4, 5, 4, 0]]
+
+
+def test_index_amb_menys_candidats_que_k():
+    exacte = Colaboratiu(DatasetMemoria(MATRIU_DUPLICATS), k=3)
+    amb_index = Colaboratiu(DatasetMemoria(MATRIU_DUPLICATS), k=3)
+    amb_index.construeix_index(3)
+    ratings = amb_index._dataset.get_ratings()
+
+    esperat = exacte.algoritme(ratings, ratings.fila(0), 0)
+    individual = amb_index.algoritme(ratings, ratings.fila(0), 0)
+    batch = amb_index.algoritme_batch(ratings, np.array([0]))[0]
+
+    assert not np.isnan(individual[2:]).any()
+    np.testing.assert_allclose(individual, esperat)
+    np.testing.assert_allclose(batch, esperat)
+
+
+def test_construeix_index_invalida_cache():
+    r = Colaboratiu(DatasetMemoria(MATRIU_DUPLICATS), k=3)
+    r.recomenar("U0", 3)
+    assert r.get_recomanacions("U0") is not None
+
+    r.construeix_index(3)
+    assert r.get_recomanacions("U0") is None
+    assert r.estadistiques_cache()["entrades"] == 0
+
+
+def test_cache_una_consulta_per_peticio():
+    r = Colaboratiu(DatasetMemoria(MATRIU_DUPLICATS), k=3)
+    r.recomenar("U2", 5)
+    r.recomenar("U2", 5)
+    r.imprimir_recomanacions("U2")
+    r.test("U2")
+    r.test("U2")
+    r.imprimir_prediccions("U2")
+
+    estadistiques = r.estadistiques_cache()
+    assert (estadistiques["encerts"], estadistiques["fallades"]) == (4, 2)
+    assert estadistiques["entrades"] == 2
+
+    r._k = 2  # Uns altres paràmetres són una altra entrada
+    r.recomenar("U2", 5)
+    assert r.estadistiques_cache()["fallades"] == 3
@@ -2,6 +2,9 @@ from tqdm import tqdm
 import threading
 import time
 import gzip, json, os, re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 
 def parse(path):
@@ -9,6 +12,61 @@ def parse(path):
     for l in g:
         yield json.loads(l)
 
+def extreu_camps(linies, camps):
+    # Descodifica un lot de línies JSON i retorna només els camps demanats (tuples petites, barates de passar entre processos)
+    return [tuple(obj.get(camp) for camp in camps) for obj in map(json.loads, linies)]
+
+def parse_camps(path, camps, workers=None, mida_lot=2000):
+    """
+    Llegeix un fitxer JSON-lines comprimit (.gz) i retorna, en ordre, una tupla amb els camps demanats de cada línia.
+
+    Un sol fil descomprimeix el fitxer i reparteix lots de línies a un pool de processos que fan la
+    descodificació JSON; com a molt hi ha 2 lots per procés pendents, així la memòria queda acotada.
+
+    Parameters
+    ----------
+    path : str
+        Path del fitxer .gz.
+    camps : tuple of str
+        Camps a extreure de cada objecte (None si no hi són).
+    workers : int, optional
+        Processos per descodificar; None fa servir tots els nuclis i 1 ho fa tot en aquest procés (default és None).
+    mida_lot : int, optional
+        Línies per lot (default és 2000).
+
+    Yields
+    ------
+    tuple
+        Valors dels camps de cada línia.
+    """
+    workers = workers or os.cpu_count() or 1
+    lots = _lots_linies(path, mida_lot)
+    if workers == 1:
+        for lot in lots:
+            yield from extreu_camps(lot, camps)
+        return
+
+    extreu = partial(extreu_camps, camps=camps)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pendents = deque()
+        for lot in lots:
+            pendents.append(executor.submit(extreu, lot))
+            if len(pendents) >= 2 * workers:
+                yield from pendents.popleft().result()
+        while pendents:
+            yield from pendents.popleft().result()
+
+def _lots_linies(path, mida_lot):
+    with gzip.open(path, 'r') as g:
+        lot = []
+        for l in g:
+            lot.append(l)
+            if len(lot) == mida_lot:
+                yield lot
+                lot = []
+        if lot:
+            yield lot
+
 def clean_price(price):
     if not price or isinstance(price, list):
         return None